@@ -18,7 +18,9 @@ import app.admin.keyboards.admin_kb as kb
 from app.message_utils import replace_or_send_message
 from app.logger import logger
 from app.helpers import save_msg
-from database.export_queries import get_tickets_for_export
+from app.utils.export import Rows, aiter_rows, write_xlsx_stream
+from database.export_queries import stream_tickets_for_export
+from database.read_models import TicketRow
 
 export_tickets_router = Router(name="export_tickets_router")
 export_tickets_router.message.filter(AdminFilter())
@@ -212,8 +214,8 @@ async def export_generate_file(callback: CallbackQuery, callback_data: AdminCb,
     )
 
     try:
-        # Получаем данные
-        tickets = await get_tickets_for_export(
+        # Строки из БД идут порциями прямо в файл
+        tickets = stream_tickets_for_export(
             period=period,
             month=month,
             year=year,
@@ -221,15 +223,6 @@ async def export_generate_file(callback: CallbackQuery, callback_data: AdminCb,
             date_to=date_to
         )
 
-        if not tickets:
-            await callback.message.edit_text(
-                "📭 Нет заявок за выбранный период.",
-                reply_markup=kb.tickets_export_period_menu()
-            )
-            await state.clear()
-            await callback.answer()
-            return
-
         # Генерируем файл
         filename = f"tickets_{period}"
         if month and year:
@@ -238,18 +231,31 @@ async def export_generate_file(callback: CallbackQuery, callback_data: AdminCb,
             filename = f"tickets_{date_from.strftime('%d%m%y')}_{date_to.strftime('%d%m%y')}"
 
         if file_format == "csv":
-            file_path = await _generate_tickets_csv(tickets, filename)
+            file_path, count = await _generate_tickets_csv(tickets, filename)
         else:
-            file_path = await _generate_tickets_xlsx(tickets, filename)
+            file_path, count = await _generate_tickets_xlsx(tickets, filename)
 
         if not file_path:
             raise Exception("Не удалось создать файл")
 
+        if not count:
+            try:
+                os.unlink(file_path)
+            except OSError:
+                pass
+            await callback.message.edit_text(
+                "📭 Нет заявок за выбранный период.",
+                reply_markup=kb.tickets_export_period_menu()
+            )
+            await state.clear()
+            await callback.answer()
+            return
+
         # Отправляем файл
         document = FSInputFile(file_path)
         await callback.message.answer_document(
             document=document,
-            caption=f"📊 Выгрузка заявок\nЗаписей: {len(tickets)}"
+            caption=f"📊 Выгрузка заявок\nЗаписей: {count}"
         )
 
         logger.info(f"Tickets export sent: {file_path}")
@@ -293,11 +299,21 @@ async def export_back(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-async def _generate_tickets_csv(tickets: list[dict], filename: str) -> str:
-    """Генерация CSV файла с заявками."""
+def _ticket_created(ticket: TicketRow) -> str:
+    return ticket.created_at.strftime('%d.%m.%Y %H:%M') if ticket.created_at else ''
+
+
+def _short_text(text: str | None) -> str:
+    text = text or '—'
+    return text[:100] + '...' if len(text) > 100 else text
+
+
+async def _generate_tickets_csv(tickets: Rows, filename: str) -> tuple[str, int]:
+    """Генерация CSV файла с заявками. Возвращает (путь, записей)."""
     temp_dir = tempfile.gettempdir()
     filepath = os.path.join(temp_dir, f"{filename}.csv")
 
+    count = 0
     with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
         writer = csv.writer(csvfile, delimiter=';')
 
@@ -307,25 +323,24 @@ async def _generate_tickets_csv(tickets: list[dict], filename: str) -> str:
         ])
 
         # Данные
-        for ticket in tickets:
-            created = ticket['created_at'].strftime('%d.%m.%Y %H:%M') if ticket['created_at'] else ''
+        async for ticket in aiter_rows(tickets):
             writer.writerow([
-                created,
-                ticket['id'],
-                ticket['address'],
-                ticket['phone'],
-                ticket['text'][:100] + '...' if len(ticket['text']) > 100 else ticket['text'],
-                ticket['status']
+                _ticket_created(ticket),
+                ticket.id,
+                ticket.address,
+                ticket.phone or '—',
+                _short_text(ticket.text),
+                ticket.status_label
             ])
+            count += 1
 
-    return filepath
+    return filepath, count
 
 
-async def _generate_tickets_xlsx(tickets: list[dict], filename: str) -> str:
-    """Генерация Excel файла с заявками."""
+async def _generate_tickets_xlsx(tickets: Rows, filename: str) -> tuple[str, int]:
+    """Генерация Excel файла с заявками (потоково, write_only). Возвращает (путь, записей)."""
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment
+        import openpyxl  # noqa: F401
     except ImportError:
         logger.error("openpyxl not installed, falling back to CSV")
         return await _generate_tickets_csv(tickets, filename)
@@ -333,43 +348,17 @@ async def _generate_tickets_xlsx(tickets: list[dict], filename: str) -> str:
     temp_dir = tempfile.gettempdir()
     filepath = os.path.join(temp_dir, f"{filename}.xlsx")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Заявки"
-
-    # Заголовки
     headers = ['Дата', 'Номер заявки', 'Адрес', 'Телефон', 'Вид работ', 'Статус']
-    ws.append(headers)
-
-    # Стиль заголовков
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
-
-    # Данные
-    for ticket in tickets:
-        created = ticket['created_at'].strftime('%d.%m.%Y %H:%M') if ticket['created_at'] else ''
-        ws.append([
-            created,
-            ticket['id'],
-            ticket['address'],
-            ticket['phone'],
-            ticket['text'],
-            ticket['status']
-        ])
-
-    # Автоширина столбцов
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    wb.save(filepath)
-    return filepath
\ No newline at end of file
+    rows = (
+        [
+            _ticket_created(ticket),
+            ticket.id,
+            ticket.address,
+            ticket.phone or '—',
+            ticket.text or '—',
+            ticket.status_label
+        ]
+        async for ticket in aiter_rows(tickets)
+    )
+    count = await write_xlsx_stream(filepath, "Заявки", headers, rows)
+    return filepath, count
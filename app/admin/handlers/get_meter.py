@@ -8,6 +8,7 @@ import csv
 import json
 import tempfile
 import os
+from contextlib import suppress
 from pathlib import Path
 
 from app.admin.filters import AdminFilter
@@ -15,7 +16,9 @@ import app.admin.keyboards.admin_kb as kb
 from app.admin.keyboards.admin_kb import AdminCb
 from app.message_utils import replace_or_send_message
 from app.logger import logger
-from database.requests import get_all_meter_readings_by_type_and_period
+from app.utils.export import Rows, aiter_rows, write_xlsx_stream
+from database.read_models import MeterRow, format_address
+from database.requests import stream_meter_readings_by_type_and_period
 
 get_meter_router = Router(name="get_meter_router")
 get_meter_router.message.filter(AdminFilter())
@@ -250,26 +253,14 @@ async def export_generate_file(callback: CallbackQuery, callback_data: AdminCb,
     )
 
     try:
-        # Получаем данные из БД
-        data = await get_all_meter_readings_by_type_and_period(
+        # Строки из БД идут порциями прямо в файл
+        data = stream_meter_readings_by_type_and_period(
             meter_type=meter_type,
             period=period,
             month=month,
             year=year
         )
 
-        if not data:
-            logger.warning(f"No data found for export: type={meter_type}, period={period}")
-            await callback.message.edit_text(
-                "📭 Нет данных для выгрузки за выбранный период.",
-                reply_markup=kb.export_menu_keyboard()
-            )
-            await state.clear()
-            await callback.answer()
-            return
-
-        logger.info(f"Found {len(data)} records for export")
-
         # Генерируем файл
         file_path = None
         filename = f"meters_{meter_type}_{period}"
@@ -279,22 +270,31 @@ async def export_generate_file(callback: CallbackQuery, callback_data: AdminCb,
         elif year:
             filename = f"meters_{meter_type}_{year}"
 
-        if file_format == "csv":
-            file_path = await generate_csv(data, filename)
-        elif file_format == "xlsx":
-            file_path = await generate_xlsx(data, filename)
-        elif file_format == "json":
-            file_path = await generate_json(data, filename)
-
-        if not file_path:
+        generators = {"csv": generate_csv, "xlsx": generate_xlsx, "json": generate_json}
+        if file_format not in generators:
             raise Exception("Failed to generate file")
+        file_path, count = await generators[file_format](data, filename)
+
+        if not count:
+            logger.warning(f"No data found for export: type={meter_type}, period={period}")
+            with suppress(OSError):
+                os.unlink(file_path)
+            await callback.message.edit_text(
+                "📭 Нет данных для выгрузки за выбранный период.",
+                reply_markup=kb.export_menu_keyboard()
+            )
+            await state.clear()
+            await callback.answer()
+            return
+
+        logger.info(f"Exported {count} records")
 
         # Отправляем файл
         document = FSInputFile(file_path)
         await callback.message.answer_document(
             document=document,
             caption=f"📊 Показания счётчика: {TYPE_NAMES[meter_type]}\n"
-                   f"Записей: {len(data)}"
+                   f"Записей: {count}"
         )
 
         logger.info(f"Export file sent successfully: {file_path}")
@@ -360,14 +360,27 @@ async def export_back_to_period(callback: CallbackQuery, callback_data: AdminCb,
 
 # Функции генерации файлов
 
-async def generate_csv(data: list, filename: str) -> str:
-    """Генерация CSV файла"""
+def _meter_row(row: MeterRow) -> list:
+    return [
+        row.id,
+        row.name or '',
+        format_address(row.street, row.house, row.apartment),
+        row.phone or '',
+        _get_meter_title(row.meter_number),
+        row.value if row.value is not None else '',
+        _format_date_ddmmyy(row.reading_date),
+    ]
+
+
+async def generate_csv(data: Rows, filename: str) -> tuple[str, int]:
+    """Генерация CSV файла. data — список или async-генератор строк; возвращает (путь, записей)."""
     # Создаём временный файл в системной временной директории
     temp_dir = tempfile.gettempdir()
     filepath = os.path.join(temp_dir, f"{filename}.csv")
 
     logger.info(f"Creating CSV file: {filepath}")
 
+    count = 0
     with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
         writer = csv.writer(csvfile, delimiter=';')
 
@@ -384,36 +397,18 @@ async def generate_csv(data: list, filename: str) -> str:
         ])
 
         # 🔹 Данные
-        for row in data:
-            address = f"{row.get('street', '')}, д. {row.get('house', '')}"
-            if row.get('apartment'):
-                address += f", кв. {row['apartment']}"
-
-            meter_title = _get_meter_title(row.get('meter_number'))
+        async for row in aiter_rows(data):
+            writer.writerow(_meter_row(row) + [_format_date_ddmmyy(row.created_at)])
+            count += 1
 
-            reading_date = _format_date_ddmmyy(row.get('reading_date'))
-            created_at = _format_date_ddmmyy(row.get('created_at'))
+    return filepath, count
 
-            writer.writerow([
-                row.get('id', ''),
-                row.get('name', ''),
-                address,
-                row.get('phone', ''),
-                meter_title,
-                row.get('value', ''),
-                reading_date,
-                created_at,
-            ])
 
-    return filepath
 
-
-
-async def generate_xlsx(data: list, filename: str) -> str:
-    """Генерация Excel файла"""
+async def generate_xlsx(data: Rows, filename: str) -> tuple[str, int]:
+    """Генерация Excel файла (потоково, write_only). Возвращает (путь, записей)."""
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment
+        import openpyxl  # noqa: F401
     except ImportError:
         logger.error("openpyxl not installed, falling back to CSV")
         return await generate_csv(data, filename)
@@ -423,10 +418,6 @@ async def generate_xlsx(data: list, filename: str) -> str:
 
     logger.info(f"Creating XLSX file: {filepath}")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Показания"
-
     # 🔹 Заголовки (добавили колонку счётчика)
     headers = [
         'ID',
@@ -437,68 +428,30 @@ async def generate_xlsx(data: list, filename: str) -> str:
         'Показания (м³)',
         'Дата'
     ]
-    ws.append(headers)
-
-    # Стиль заголовков
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
-
-    # 🔹 Данные
-    for row in data:
-        address = f"{row.get('street', '')}, д. {row.get('house', '')}"
-        if row.get('apartment'):
-            address += f", кв. {row['apartment']}"
-
-        meter_title = _get_meter_title(row.get('meter_number'))
-
-        reading_date = _format_date_ddmmyy(row.get('reading_date'))
-
-        ws.append([
-            row.get('id', ''),
-            row.get('name', ''),
-            address,
-            row.get('phone', ''),
-            meter_title,
-            row.get('value', ''),
-            reading_date,
-        ])
+    rows = (_meter_row(row) async for row in aiter_rows(data))
+    count = await write_xlsx_stream(filepath, "Показания", headers, rows)
+    return filepath, count
 
-    # Автоширина столбцов
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if cell.value is not None and len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except Exception:  # noqa: E722
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
 
-    wb.save(filepath)
-    return filepath
 
-
-
-async def generate_json(data: list, filename: str) -> str:
-    """Генерация JSON файла"""
+async def generate_json(data: Rows, filename: str) -> tuple[str, int]:
+    """Генерация JSON файла (массив пишется по одному объекту). Возвращает (путь, записей)."""
     temp_dir = tempfile.gettempdir()
     filepath = os.path.join(temp_dir, f"{filename}.json")
 
     logger.info(f"Creating JSON file: {filepath}")
 
-    # Преобразуем даты в строки для JSON
-    json_data = []
-    for row in data:
-        json_row = dict(row)
-        for key, value in json_row.items():
-            if isinstance(value, (datetime, date)):
-                json_row[key] = value.isoformat()
-        json_data.append(json_row)
-
+    count = 0
     with open(filepath, 'w', encoding='utf-8') as jsonfile:
-        json.dump(json_data, jsonfile, ensure_ascii=False, indent=2)
-
-    return filepath
\ No newline at end of file
+        async for row in aiter_rows(data):
+            # Преобразуем даты в строки для JSON
+            json_row = {
+                key: value.isoformat() if isinstance(value, (datetime, date)) else value
+                for key, value in row.as_dict().items()
+            }
+            item = json.dumps(json_row, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            jsonfile.write(("[\n  " if count == 0 else ",\n  ") + item)
+            count += 1
+        jsonfile.write("\n]" if count else "[]")
+
+    return filepath, count
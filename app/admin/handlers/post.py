@@ -9,6 +9,7 @@ import app.admin.keyboards.admin_kb as kb
 from app.admin.keyboards.admin_kb import AdminCb
 from config.settings import GROUP_ID
 from app.logger import logger
+from app.middlewares.send_scheduler import send_lane, BULK
 
 from app.helpers import clear_chat_history, save_msg, ask_and_track
 
@@ -27,7 +28,10 @@ class PostCreation(StatesGroup):
 @post_router.callback_query(AdminCb.filter(F.a == "admin_create_post"))
 async def create_post(callback: CallbackQuery, state: FSMContext):
     """Начало создания поста"""
-    await clear_chat_history(callback.bot, callback.message.chat.id, state)
+    # Меню сейчас будет отредактировано — не удаляем его
+    await clear_chat_history(
+        callback.bot, callback.message.chat.id, state, keep=(callback.message.message_id,)
+    )
     await ask_and_track(
         callback,
         state,
@@ -208,12 +212,13 @@ async def handle_confirm(callback: CallbackQuery, state: FSMContext, callback_da
         ])
 
     try:
-        await callback.bot.copy_message(
-            chat_id=GROUP_ID,
-            from_chat_id=chat_id,
-            message_id=message_id,
-            reply_markup=reply_markup
-        )
+        with send_lane(BULK):
+            await callback.bot.copy_message(
+                chat_id=GROUP_ID,
+                from_chat_id=chat_id,
+                message_id=message_id,
+                reply_markup=reply_markup
+            )
 
         # ПОТОМ очищаем историю
         await clear_chat_history(callback.bot, callback.message.chat.id, state)
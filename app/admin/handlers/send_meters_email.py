@@ -12,7 +12,7 @@ from app.admin.keyboards.admin_kb import AdminCb
 from app.message_utils import replace_or_send_message
 from app.logger import logger
 from app.admin.handlers.get_meter import generate_xlsx, MONTHS, TYPE_NAMES
-from database.requests import get_all_meter_readings_by_type_and_period
+from database.requests import stream_meter_readings_by_type_and_period
 from app.services.email_service import send_email
 from config.settings import ACCOUNTANT_EMAIL
 
@@ -116,16 +116,21 @@ async def email_send_confirm(callback: CallbackQuery, callback_data: AdminCb, st
     )
 
     try:
-        # Получаем данные
-        data = await get_all_meter_readings_by_type_and_period(
-            meter_type=meter_type,
-            period="select_month",
-            month=month,
-            year=year,
+        # Генерируем файл (строки из БД идут порциями прямо в XLSX)
+        filename = f"meters_{meter_type}_{year}_{month:02d}"
+        file_path, count = await generate_xlsx(
+            stream_meter_readings_by_type_and_period(
+                meter_type=meter_type,
+                period="select_month",
+                month=month,
+                year=year,
+            ),
+            filename,
         )
 
-        if not data:
+        if not count:
             logger.warning(f"No data for email: type={meter_type}, month={month}/{year}")
+            Path(file_path).unlink(missing_ok=True)
             await callback.message.edit_text(
                 "📭 Нет данных за выбранный период.",
                 reply_markup=kb.email_back_to_menu(),
@@ -134,17 +139,13 @@ async def email_send_confirm(callback: CallbackQuery, callback_data: AdminCb, st
             await state.clear()
             return
 
-        # Генерируем файл
-        filename = f"meters_{meter_type}_{year}_{month:02d}"
-        file_path = await generate_xlsx(data, filename)
-
         # Формируем письмо
         subject = f"Показания счётчиков: {TYPE_NAMES[meter_type]} - {MONTHS[month]} {year}"
         body = (
             f"Показания счётчиков\n\n"
             f"Тип: {TYPE_NAMES[meter_type]}\n"
             f"Период: {MONTHS[month]} {year}\n"
-            f"Записей: {len(data)}\n\n"
+            f"Записей: {count}\n\n"
             f"Отправлено автоматически через Telegram-бота."
         )
 
@@ -169,7 +170,7 @@ async def email_send_confirm(callback: CallbackQuery, callback_data: AdminCb, st
                     f"✅ <b>Email успешно отправлен!</b>\n\n"
                     f"Тип: {TYPE_NAMES[meter_type]}\n"
                     f"Период: {MONTHS[month]} {year}\n"
-                    f"Записей: {len(data)}"
+                    f"Записей: {count}"
                 ),
                 reply_markup=kb.email_back_to_menu(),
                 parse_mode="HTML",
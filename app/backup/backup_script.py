@@ -2,7 +2,7 @@
 import os
 import boto3
 from datetime import datetime
-import shutil
+import sqlite3
 import logging
 
 # Настройка логирования
@@ -34,7 +34,16 @@ def backup_database():
         temp_backup = f"/tmp/database_backup_{timestamp}.db"
 
         logger.info(f"Creating backup: {temp_backup}")
-        shutil.copy2(DB_PATH, temp_backup)
+        # БД работает в режиме WAL: простое копирование файла может не
+        # захватить свежие данные из -wal, поэтому используем backup API
+        src = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+        dst = sqlite3.connect(temp_backup)
+        try:
+            with dst:
+                src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
 
         # Получаем размер файла
         file_size = os.path.getsize(temp_backup)
@@ -0,0 +1,23 @@
+# app/group/channel_members.py
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from app.services.membership import membership_cache
+from app.logger import logger
+
+channel_members_router = Router(name="channel_members_router")
+
+
+@channel_members_router.chat_member()
+async def on_channel_member(event: ChatMemberUpdated):
+    """
+    Вступление/выход/бан в обязательном канале (бот — админ канала):
+    обновляем индекс подписчиков, чтобы проверка подписки не ходила в API.
+    """
+    if not membership_cache.is_tracked_chat(event.chat.id):
+        return
+    user_id = event.new_chat_member.user.id
+    try:
+        await membership_cache.apply(event.chat.id, user_id, event.new_chat_member.status)
+    except Exception as e:
+        logger.error(f"[membership] Не удалось записать {event.chat.id}/{user_id}: {e}")
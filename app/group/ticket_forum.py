@@ -7,7 +7,7 @@ from aiogram.exceptions import TelegramBadRequest
 
 from config.settings import NOTIFICATION_CHANNEL_ID
 from database.models import TicketStatus
-from database.requests import get_ticket_by_thread, set_ticket_status
+from database.requests import find_ticket_by_thread, set_ticket_status
 from app.admin.acl import is_admin
 from app.admin.keyboards.admin_kb import status_panel_kb as _status_panel_kb
 from app.user.keyboards.user_kb import reply_to_dispatcher_kb
@@ -122,7 +122,7 @@ async def send_status_panel(msg: Message):
     if not thread_id:
         await msg.reply("Эта команда работает только внутри топика.")
         return
-    ticket = await get_ticket_by_thread(msg.chat.id, thread_id)
+    ticket = await find_ticket_by_thread(msg.chat.id, thread_id)
     if not ticket:
         await msg.reply("Заявка для этого топика не найдена.")
         return
@@ -162,7 +162,7 @@ async def on_status_panel_click(call: CallbackQuery):
         return
 
     thread_id = getattr(call.message, "message_thread_id", None)
-    ticket = await get_ticket_by_thread(call.message.chat.id, thread_id) if thread_id else None
+    ticket = await find_ticket_by_thread(call.message.chat.id, thread_id) if thread_id else None
     if not ticket or ticket["id"] != ticket_id:
         await call.answer("Заявка не найдена в этом топике.", show_alert=True)
         return
@@ -245,7 +245,7 @@ async def debug_all_group_messages(msg: Message):
         logger.debug("Skip system/bot message")
         return
 
-    ticket = await get_ticket_by_thread(msg.chat.id, thread_id)
+    ticket = await find_ticket_by_thread(msg.chat.id, thread_id)
     if not ticket:
         logger.warning(f"❌ No ticket found for thread {thread_id} in chat {msg.chat.id}")
         return
@@ -256,7 +256,7 @@ async def debug_all_group_messages(msg: Message):
 # ==== Совместимость со слэш-командами статусов ====
 async def handle_status_command(msg: Message, cmd: str):
     thread_id = msg.message_thread_id
-    ticket = await get_ticket_by_thread(msg.chat.id, thread_id)
+    ticket = await find_ticket_by_thread(msg.chat.id, thread_id)
     if not ticket:
         await msg.reply("⚠️ Заявка для этого топика не найдена.")
         return
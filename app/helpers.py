@@ -1,25 +1,58 @@
+import asyncio
+from typing import Iterable, Set
+
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from app.message_utils import replace_or_send_message
+from app.logger import logger
 
+# deleteMessages принимает до 100 id за вызов
+_DELETE_BATCH = 100
+# Сколько последних id хранить для очистки (старые просто останутся в чате)
+_TRACK_MAX = 300
 
-async def clear_chat_history(bot, chat_id: int, state: FSMContext):
-    """Удаляет все сообщения, сохранённые в состоянии"""
-    data = await state.get_data()
-    msg_ids: list[int] = data.get("msg_ids", [])
-    for mid in msg_ids:
+# Ссылки на фоновые задачи очистки, чтобы их не собрал GC
+_cleanup_tasks: Set[asyncio.Task] = set()
+
+
+async def _delete_messages(bot, chat_id: int, msg_ids: list[int]) -> None:
+    for i in range(0, len(msg_ids), _DELETE_BATCH):
+        chunk = msg_ids[i:i + _DELETE_BATCH]
         try:
-            await bot.delete_message(chat_id, mid)
-        except Exception:
-            pass
+            await bot.delete_messages(chat_id, chunk)
+        except Exception as e:
+            # Старше 48 ч, уже удалены и т.п. — не критично
+            logger.debug(f"delete_messages chat={chat_id} ({len(chunk)} шт.): {e}")
+
+
+async def clear_chat_history(bot, chat_id: int, state: FSMContext, keep: Iterable[int] = ()):
+    """
+    Удаляет все сообщения, сохранённые в состоянии, и очищает состояние.
+    Удаление идёт в фоне пачками по 100 (deleteMessages) — ответ
+    пользователю не ждёт очистки. keep — id, которые удалять не нужно
+    (например, сообщение, которое сейчас будет отредактировано).
+    """
+    data = await state.get_data()
+    skip = set(keep)
+    # dict.fromkeys — без повторов (отредактированное сообщение сохраняется дважды)
+    msg_ids = [mid for mid in dict.fromkeys(data.get("msg_ids", ())) if mid not in skip]
     await state.clear()
+    if msg_ids:
+        task = asyncio.create_task(_delete_messages(bot, chat_id, msg_ids))
+        _cleanup_tasks.add(task)
+        task.add_done_callback(_cleanup_tasks.discard)
+
+def track_msg_ids(data: dict, msg_ids: Iterable[int]) -> None:
+    """Дописывает id в data["msg_ids"] (последние _TRACK_MAX) — для хендлеров, пишущих data сами."""
+    # Обычный list[int]: хранилища FSM сериализуют data, лишние типы им ни к чему
+    tracked = [*data.get("msg_ids", ()), *msg_ids]
+    data["msg_ids"] = tracked[-_TRACK_MAX:]
 
 async def save_msg(msg: Message, state: FSMContext):
-    """Сохраняем ID сообщений для последующего удаления"""
+    """Сохраняем ID сообщений для последующего удаления (последние _TRACK_MAX)"""
     data = await state.get_data()
-    msg_ids = data.get("msg_ids", [])
-    msg_ids.append(msg.message_id)
-    await state.update_data(msg_ids=msg_ids)
+    track_msg_ids(data, (msg.message_id,))
+    await state.set_data(data)
 
 async def ask_and_track(msg_or_call, state: FSMContext, text: str, next_state=None, **kwargs):
     if isinstance(msg_or_call, CallbackQuery):
@@ -1,7 +1,18 @@
+from typing import Any, NamedTuple, Sequence, TypeVar
+
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramAPIError
-from aiogram.types import Message
+from aiogram.types import (
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+    MessageEntity,
+)
 from app.logger import logger
 
+T = TypeVar("T")
+
 async def replace_or_send_message(
     bot,
     chat_id: int,
@@ -44,3 +55,97 @@ async def replace_or_send_message(
     except TelegramAPIError as e:
         logger.error("send_message API error: %s", e)
         return None
+
+
+# ========= Вложения альбомами (sendMediaGroup) =========
+# В одном альбоме Telegram допускает до 10 файлов: фото и видео вместе,
+# документы и аудио — только с однотипными; голосовые в альбом не входят
+MEDIA_GROUP_MAX = 10
+_MEDIA_GROUP_KIND = {"photo": "visual", "video": "visual", "document": "document", "audio": "audio"}
+_INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "audio": InputMediaAudio,
+}
+
+
+class MediaItem(NamedTuple):
+    """Файл для отправки: тип (photo/video/document/audio/voice), file_id, подпись."""
+    type: str
+    file_id: str
+    caption: str | None = None
+    caption_entities: list[MessageEntity] | None = None
+
+
+def media_item_from_message(msg: Message) -> MediaItem | None:
+    """MediaItem из сообщения пользователя; None — не файл (текст, стикер и т.п.)."""
+    entities = msg.caption_entities or None
+    if msg.photo:
+        return MediaItem("photo", msg.photo[-1].file_id, msg.caption, entities)
+    if msg.video:
+        return MediaItem("video", msg.video.file_id, msg.caption, entities)
+    if msg.document:
+        return MediaItem("document", msg.document.file_id, msg.caption, entities)
+    if msg.audio:
+        return MediaItem("audio", msg.audio.file_id, msg.caption, entities)
+    if msg.voice:
+        return MediaItem("voice", msg.voice.file_id, msg.caption, entities)
+    return None
+
+
+def _type_str(item: Any) -> str:
+    # AttachmentType — str-enum
+    return str(getattr(item.type, "value", item.type))
+
+
+def plan_media_batches(items: Sequence[T]) -> list[list[T]]:
+    """
+    Разбивает файлы (всё, у чего есть type/file_id/caption) на отправки:
+    совместимые типы — пачками до MEDIA_GROUP_MAX в порядке первого
+    появления, голосовые и одиночки — по одному. Пачка из одного
+    элемента отправляется обычным send_*.
+    """
+    groups: dict[str, list[T]] = {}
+    singles: list[list[T]] = []
+    for item in items:
+        kind = _MEDIA_GROUP_KIND.get(_type_str(item))
+        if kind is None:
+            singles.append([item])
+        else:
+            groups.setdefault(kind, []).append(item)
+    batches = [
+        group[i:i + MEDIA_GROUP_MAX]
+        for group in groups.values()
+        for i in range(0, len(group), MEDIA_GROUP_MAX)
+    ]
+    return batches + singles
+
+
+def _caption_kwargs(item: Any) -> dict:
+    # Подпись — текст пользователя как есть (разметка — только через entities):
+    # parse_mode=HTML по умолчанию сломал бы отправку на первом «<»
+    entities = getattr(item, "caption_entities", None)
+    return {"caption": item.caption, "caption_entities": entities or None, "parse_mode": None}
+
+
+async def send_media_batch(bot, chat_id: int, batch: Sequence[Any], message_thread_id: int | None = None) -> None:
+    """Отправляет пачку из plan_media_batches: альбомом (sendMediaGroup) или одиночным send_*."""
+    if len(batch) > 1:
+        media = [
+            _INPUT_MEDIA[_type_str(item)](media=item.file_id, **_caption_kwargs(item))
+            for item in batch
+        ]
+        await bot.send_media_group(chat_id=chat_id, media=media, message_thread_id=message_thread_id)
+        return
+
+    item = batch[0]
+    kind = _type_str(item)
+    send = {
+        "photo": bot.send_photo,
+        "video": bot.send_video,
+        "document": bot.send_document,
+        "audio": bot.send_audio,
+        "voice": bot.send_voice,
+    }[kind]
+    await send(chat_id, item.file_id, message_thread_id=message_thread_id, **_caption_kwargs(item))
@@ -0,0 +1 @@
+# app/middlewares/__init__.py
\ No newline at end of file
@@ -0,0 +1,30 @@
+# app/middlewares/db_session.py
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.requests import db_session_scope
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт: все @connection-функции, вызванные из
+    хендлера (и внутренних middleware), берут одно соединение. Сессия
+    открывается лениво — апдейты без обращений к БД соединение не берут.
+
+    Пишущая функция коммитится сразу по выходу: блокировка записи SQLite
+    не переживает исходящие вызовы Telegram (очередь send_scheduler может
+    ждать секунды), и соседние апдейты не получают «database is locked».
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with db_session_scope():
+            return await handler(event, data)
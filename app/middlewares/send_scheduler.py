@@ -0,0 +1,318 @@
+# app/middlewares/send_scheduler.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType, Response
+
+from app.logger import logger
+from config.settings import (
+    SEND_GLOBAL_PER_SEC,
+    SEND_PRIVATE_PER_SEC,
+    SEND_PRIVATE_BURST,
+    SEND_GROUP_PER_MIN,
+    SEND_MAX_RETRY_AFTER,
+    SEND_WEIGHT_INTERACTIVE,
+    SEND_WEIGHT_OPERATIONAL,
+    SEND_WEIGHT_BULK,
+)
+from database.metrics import LatencyHistogram
+
+# Методы, которые Telegram считает отправкой сообщения
+_SEND_PREFIXES = ("send", "copyMessage", "forwardMessage")
+_NOT_THROTTLED = frozenset({"sendChatAction"})
+
+# ========= Полосы приоритета =========
+# interactive — ответы жителю в хендлерах (по умолчанию),
+# operational — топики форума, ЛС админам (outbox),
+# bulk — напоминания и посты.
+INTERACTIVE = "interactive"
+OPERATIONAL = "operational"
+BULK = "bulk"
+LANES = (INTERACTIVE, OPERATIONAL, BULK)
+
+send_lane_var: ContextVar[str] = ContextVar("send_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def send_lane(lane: str) -> Iterator[None]:
+    """
+    Запросы к Bot API внутри блока (и в задачах, созданных в нём)
+    идут по полосе lane:
+        with send_lane(BULK):
+            await bot.send_message(...)
+    """
+    token = send_lane_var.set(lane)
+    try:
+        yield
+    finally:
+        send_lane_var.reset(token)
+
+
+# Сколько корзин чатов держать, прежде чем чистить простаивающие
+_BUCKETS_SWEEP_AT = 10_000
+
+
+class TokenBucket:
+    """
+    Корзина токенов с резервированием: reserve() сразу списывает токены
+    (баланс может уйти в минус) и возвращает, сколько ждать своей
+    очереди. Так вызовы обслуживаются строго в порядке обращения.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available_in(self, cost: float = 1.0) -> float:
+        """Через сколько секунд наберётся cost токенов (без списания)."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = (cost - self.tokens) / self.rate if self.tokens < cost else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def take(self, cost: float = 1.0) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= cost
+
+    def reserve(self, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= cost
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float) -> None:
+        """429 от Telegram: никаких отправок в эту корзину seconds секунд."""
+        now = time.monotonic()
+        self._refill(now)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        # Накопленный запас после паузы не должен дать новый всплеск
+        self.tokens = min(self.tokens, 0.0)
+
+    def idle(self, now: float) -> bool:
+        return now >= self.blocked_until and self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+def _is_group(chat_id: Union[int, str]) -> bool:
+    # Группы/каналы — отрицательные id или @username
+    return isinstance(chat_id, str) or chat_id < 0
+
+
+class LaneGate:
+    """
+    Общий лимит бота с полосами приоритета. Пока очередей нет, токен
+    берётся сразу. Иначе ожидающие встают в очередь своей полосы, а
+    одна корутина-раздатчик, дождавшись токена, выбирает полосу
+    взвешенным round-robin (smooth WRR) — interactive не стоит за
+    тысячами bulk-сообщений, но и bulk не голодает.
+    """
+
+    def __init__(self, bucket: TokenBucket, weights: Dict[str, int]):
+        self.bucket = bucket
+        self.weights = {lane: max(1, int(weights.get(lane, 1))) for lane in LANES}
+        self.queues: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {lane: deque() for lane in LANES}
+        self._current = {lane: 0 for lane in LANES}
+        self._pump: Optional[asyncio.Task] = None
+
+    def depth(self, lane: Optional[str] = None) -> int:
+        if lane is not None:
+            return len(self.queues[lane])
+        return sum(len(q) for q in self.queues.values())
+
+    async def acquire(self, lane: str, cost: float) -> None:
+        if not self.depth() and self.bucket.available_in(cost) <= 0:
+            self.bucket.take(cost)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self.queues[lane].append((fut, cost))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+        await fut
+
+    def _next_lane(self) -> str:
+        total = 0
+        best = None
+        for lane in LANES:
+            if not self.queues[lane]:
+                continue
+            self._current[lane] += self.weights[lane]
+            total += self.weights[lane]
+            if best is None or self._current[lane] > self._current[best]:
+                best = lane
+        self._current[best] -= total
+        return best
+
+    async def _run(self) -> None:
+        while self.depth():
+            # Сначала ждём токен, потом выбираем полосу: пришедший за
+            # время ожидания interactive-запрос успевает в этот слот
+            wait = self.bucket.available_in(1.0)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            lane = self._next_lane()
+            fut, cost = self.queues[lane].popleft()
+            if fut.done():  # ожидающий отменён
+                continue
+            self.bucket.take(cost)
+            fut.set_result(None)
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов Bot API (middleware сессии бота).
+
+    Для методов отправки сообщений (send*, copy*, forward*):
+      - общий лимит бота — SEND_GLOBAL_PER_SEC сообщений в секунду;
+      - в личный чат — SEND_PRIVATE_PER_SEC в секунду с запасом
+        SEND_PRIVATE_BURST (ответ + меню уходят без паузы);
+      - в группу/канал — SEND_GROUP_PER_MIN в минуту;
+      - sendMediaGroup списывает из общего лимита по токену на каждый
+        элемент альбома, из корзины чата — один токен (альбом — одно
+        сообщение в ленте чата).
+    Сначала ждём очереди в корзине чата, потом общего лимита — медленный
+    чат не держит общий лимит. Общий лимит раздаётся по полосам
+    interactive / operational / bulk (LaneGate, полоса — send_lane_var).
+    На TelegramRetryAfter корзина чата (для личных чатов и общая)
+    блокируется на retry_after, запрос повторяется до
+    SEND_MAX_RETRY_AFTER раз.
+
+    Остальные методы (answerCallbackQuery, edit*, delete* и т.д.)
+    проходят без ожидания. Метрики — snapshot().
+    """
+
+    def __init__(
+        self,
+        global_per_sec: float = SEND_GLOBAL_PER_SEC,
+        private_per_sec: float = SEND_PRIVATE_PER_SEC,
+        private_burst: float = SEND_PRIVATE_BURST,
+        group_per_min: float = SEND_GROUP_PER_MIN,
+        max_retry_after: int = SEND_MAX_RETRY_AFTER,
+        weights: Optional[Dict[str, int]] = None,
+    ):
+        self.global_bucket = TokenBucket(global_per_sec, global_per_sec)
+        self.gate = LaneGate(
+            self.global_bucket,
+            weights or {
+                INTERACTIVE: SEND_WEIGHT_INTERACTIVE,
+                OPERATIONAL: SEND_WEIGHT_OPERATIONAL,
+                BULK: SEND_WEIGHT_BULK,
+            },
+        )
+        self.private_per_sec = private_per_sec
+        self.private_burst = max(1.0, private_burst)
+        self.group_per_sec = group_per_min / 60.0
+        self.group_burst = max(1.0, min(group_per_min, 3.0))
+        self.max_retry_after = max_retry_after
+        self.chats: Dict[Union[int, str], TokenBucket] = {}
+
+        # Метрики
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_ms = {lane: LatencyHistogram() for lane in LANES}
+        self.sent = 0
+        self.retry_after_hits = 0
+        self.retry_after_gave_up = 0
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            if len(self.chats) >= _BUCKETS_SWEEP_AT:
+                now = time.monotonic()
+                self.chats = {k: b for k, b in self.chats.items() if not b.idle(now)}
+            if _is_group(chat_id):
+                bucket = TokenBucket(self.group_per_sec, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_per_sec, self.private_burst)
+            self.chats[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, lane: str, chat_bucket: Optional[TokenBucket], cost: float) -> None:
+        # cost — для общего лимита; корзина чата всегда платит один токен
+        started = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            if chat_bucket is not None:
+                wait = chat_bucket.reserve(1.0)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await self.gate.acquire(lane, cost)
+        finally:
+            self.waiting -= 1
+            self.wait_ms[lane].observe((time.perf_counter() - started) * 1000)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        if not api_method.startswith(_SEND_PREFIXES) or api_method in _NOT_THROTTLED:
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+        media = getattr(method, "media", None)
+        cost = float(len(media)) if api_method == "sendMediaGroup" and media else 1.0
+
+        lane = send_lane_var.get()
+        retries = 0
+        while True:
+            await self._acquire(lane, chat_bucket, cost)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retry_after_hits += 1
+                if chat_bucket is not None:
+                    chat_bucket.block(e.retry_after)
+                if chat_bucket is None or not _is_group(chat_id):
+                    # Для личных чатов 429 обычно означает общий лимит бота
+                    self.global_bucket.block(e.retry_after)
+                if retries >= self.max_retry_after:
+                    self.retry_after_gave_up += 1
+                    raise
+                retries += 1
+                logger.warning(
+                    f"[send] {api_method} chat={chat_id}: flood control, "
+                    f"пауза {e.retry_after} с (повтор {retries}/{self.max_retry_after})"
+                )
+                continue
+            self.sent += 1
+            return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "sent": self.sent,
+            "retry_after_hits": self.retry_after_hits,
+            "retry_after_gave_up": self.retry_after_gave_up,
+            "chat_buckets": len(self.chats),
+            "lanes": {
+                lane: {"queued": self.gate.depth(lane), "wait": self.wait_ms[lane].snapshot()}
+                for lane in LANES
+            },
+        }
+
+
+send_scheduler = SendScheduler()
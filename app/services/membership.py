@@ -0,0 +1,319 @@
+# app/services/membership.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from aiogram import Bot
+
+from app.logger import logger
+from config.settings import (
+    SUBS_CACHE_TTL_S,
+    SUBS_CACHE_NEGATIVE_TTL_S,
+    SUBS_CACHE_MAX_SIZE,
+    CHANNEL_RECONCILE_INTERVAL_S,
+    CHANNEL_RECONCILE_PER_SEC,
+)
+from database.requests import (
+    load_channel_members,
+    list_channel_member_ids,
+    upsert_channel_members,
+)
+
+Channel = Union[str, int]
+_Key = Tuple[Channel, int]
+
+# Статусы ChatMember, при которых пользователь не считается подписанным
+NOT_SUBSCRIBED = frozenset({"left", "kicked"})
+
+
+def is_subscribed_status(status: str) -> bool:
+    return status not in NOT_SUBSCRIBED
+
+
+def _status_str(status: Any) -> str:
+    # ChatMemberStatus — str-enum; в БД и кеш кладём обычную строку
+    return str(getattr(status, "value", status))
+
+
+class MembershipCache:
+    """
+    Статусы пользователей в обязательных каналах, два уровня:
+
+    1. Индекс (chat_id, telegram_id) -> статус без TTL. Зеркало таблицы
+       channel_members: загружается при старте, обновляется апдейтами
+       chat_member (app/group/channel_members.py), результатами
+       get_chat_member и периодической сверкой (reconcile_loop).
+       Работает для каналов, чей chat_id известен (bind).
+    2. LRU-кеш (канал, пользователь) -> статус с TTL — для каналов, чей
+       chat_id узнать не удалось. Подписка живёт SUBS_CACHE_TTL_S,
+       отсутствие подписки — короткий SUBS_CACHE_NEGATIVE_TTL_S.
+
+    get_chat_member вызывается только для пользователей, которых индекс
+    ещё не видел. Ошибки API не кешируются. Одновременные запросы одного
+    и того же (канал, пользователь) ждут один get_chat_member (singleflight).
+    """
+
+    def __init__(
+        self,
+        ttl: float = SUBS_CACHE_TTL_S,
+        negative_ttl: float = SUBS_CACHE_NEGATIVE_TTL_S,
+        max_size: int = SUBS_CACHE_MAX_SIZE,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, int(max_size))
+        self._items: "OrderedDict[_Key, Tuple[str, float]]" = OrderedDict()
+        self._inflight: Dict[_Key, asyncio.Future] = {}
+        self._chat_ids: Dict[Channel, int] = {}
+        self._index: Dict[Tuple[int, int], str] = {}
+
+        # Метрики
+        self.index_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.api_calls = 0
+        self.api_ms = 0.0
+        self.pushed = 0
+
+    # ----- индекс -----
+    def bind(self, channel: Channel, chat_id: int) -> None:
+        """Канал из настроек (@username или id) -> числовой chat_id."""
+        self._chat_ids[channel] = int(chat_id)
+
+    def is_tracked_chat(self, chat_id: int) -> bool:
+        return chat_id in self._chat_ids.values()
+
+    @property
+    def chat_ids(self) -> List[int]:
+        return sorted(set(self._chat_ids.values()))
+
+    def load_index(self, rows: Iterable[Tuple[int, int, str]]) -> None:
+        self._index = {(chat_id, user_id): status for chat_id, user_id, status in rows}
+
+    def record(self, chat_id: int, user_id: int, status: Any) -> None:
+        """Обновить индекс в памяти (запись в БД — на вызывающем)."""
+        self._index[(int(chat_id), int(user_id))] = _status_str(status)
+
+    async def apply(self, chat_id: int, user_id: int, status: Any) -> None:
+        """Статус из апдейта chat_member: в индекс и в channel_members."""
+        status = _status_str(status)
+        self.pushed += 1
+        self.record(chat_id, user_id, status)
+        await upsert_channel_members([(int(chat_id), int(user_id), status)])
+
+    # ----- TTL-кеш -----
+    def get(self, channel: Channel, user_id: int) -> Optional[str]:
+        key = (channel, user_id)
+        item = self._items.get(key)
+        if item is None:
+            return None
+        status, expires = item
+        if expires <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return status
+
+    def put(self, channel: Channel, user_id: int, status: str) -> None:
+        key = (channel, user_id)
+        ttl = self.ttl if is_subscribed_status(status) else self.negative_ttl
+        self._items[key] = (status, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, channel: Channel, user_id: int) -> None:
+        self._items.pop((channel, user_id), None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    # ----- запросы -----
+    async def _fetch(self, bot: Bot, channel: Channel, user_id: int) -> str:
+        started = time.perf_counter()
+        self.api_calls += 1
+        try:
+            member = await bot.get_chat_member(channel, user_id)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.api_ms += (time.perf_counter() - started) * 1000
+        status = _status_str(member.status)
+        chat_id = self._chat_ids.get(channel)
+        if chat_id is None:
+            self.put(channel, user_id, status)
+            return status
+        self.record(chat_id, user_id, status)
+        try:
+            await upsert_channel_members([(chat_id, user_id, status)])
+        except Exception as e:
+            # Индекс в памяти уже обновлён; после рестарта спросим заново
+            logger.error(f"[membership] Не удалось сохранить статус {chat_id}/{user_id}: {e}")
+        return status
+
+    async def status(self, bot: Bot, channel: Channel, user_id: int, refresh: bool = False) -> str:
+        """
+        Статус пользователя в канале: из индекса, кеша или через get_chat_member.
+        refresh=True — всегда спросить Telegram (результат попадёт в индекс/кеш).
+        Ошибки API пробрасываются.
+        """
+        if not refresh:
+            chat_id = self._chat_ids.get(channel)
+            if chat_id is not None:
+                indexed = self._index.get((chat_id, user_id))
+                if indexed is not None:
+                    self.index_hits += 1
+                    return indexed
+            else:
+                cached = self.get(channel, user_id)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+        self.misses += 1
+
+        key = (channel, user_id)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            status = await self._fetch(bot, channel, user_id)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Ожидающих может не быть — не ругаемся на «never retrieved»
+            fut.exception()
+            raise
+        else:
+            fut.set_result(status)
+            return status
+        finally:
+            self._inflight.pop(key, None)
+
+    async def first_missing(self, bot: Bot, channels: Iterable[Channel], user_id: int) -> Optional[Channel]:
+        """
+        Первый (в порядке channels) канал, где пользователь не подписан
+        или статус не удалось узнать; None — подписан везде.
+        Каналы проверяются параллельно.
+        """
+        channels = tuple(channels)
+        if not channels:
+            return None
+        results = await asyncio.gather(
+            *(self.status(bot, ch, user_id) for ch in channels),
+            return_exceptions=True,
+        )
+        for ch, res in zip(channels, results):
+            if isinstance(res, BaseException) or not is_subscribed_status(res):
+                return ch
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.index_hits + self.hits + self.misses
+        avg_api_ms = self.api_ms / self.api_calls if self.api_calls else 0.0
+        return {
+            "channels": len(self._chat_ids),
+            "index_size": len(self._index),
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "index_hits": self.index_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round((self.index_hits + self.hits) / total, 4) if total else 0.0,
+            "coalesced": self.coalesced,
+            "pushed": self.pushed,
+            "api_calls": self.api_calls,
+            "api_errors": self.errors,
+            "avg_api_ms": round(avg_api_ms, 1),
+            # Оценка: каждое попадание сэкономило средний запрос к API
+            "saved_s": round((self.index_hits + self.hits + self.coalesced) * avg_api_ms / 1000, 1),
+        }
+
+
+membership_cache = MembershipCache()
+
+
+async def init_membership_index(bot: Bot, channels: Iterable[Channel]) -> int:
+    """
+    Узнать chat_id обязательных каналов (для @username — через get_chat)
+    и загрузить индекс channel_members. Канал, который не удалось
+    разрешить, проверяется по TTL-кешу.
+    """
+    for ch in channels:
+        if isinstance(ch, int):
+            membership_cache.bind(ch, ch)
+            continue
+        try:
+            chat = await bot.get_chat(ch)
+            membership_cache.bind(ch, chat.id)
+        except Exception as e:
+            logger.error(f"[membership] Не удалось получить chat_id канала {ch}: {e}")
+    rows = await load_channel_members(membership_cache.chat_ids)
+    membership_cache.load_index(rows)
+    return len(rows)
+
+
+async def reconcile_members(bot: Bot, page_size: int = 500) -> Dict[str, int]:
+    """
+    Сверка индекса с Telegram: get_chat_member для каждого известного
+    пользователя (не быстрее CHANNEL_RECONCILE_PER_SEC), расхождения
+    записываются. Ловит пропущенные апдейты (бот был выключен и т.п.).
+    """
+    pause = 1.0 / CHANNEL_RECONCILE_PER_SEC if CHANNEL_RECONCILE_PER_SEC > 0 else 0.0
+    checked = drift = errors = 0
+    for chat_id in membership_cache.chat_ids:
+        after = 0
+        while True:
+            page = await list_channel_member_ids(chat_id, after, page_size)
+            changed: List[Tuple[int, int, str]] = []
+            for user_id, old_status in page:
+                try:
+                    member = await bot.get_chat_member(chat_id, user_id)
+                except Exception as e:
+                    errors += 1
+                    logger.warning(f"[membership] Сверка {chat_id}/{user_id}: {e}")
+                else:
+                    checked += 1
+                    status = _status_str(member.status)
+                    if status != old_status:
+                        membership_cache.record(chat_id, user_id, status)
+                        changed.append((chat_id, user_id, status))
+                if pause:
+                    await asyncio.sleep(pause)
+            if changed:
+                drift += len(changed)
+                await upsert_channel_members(changed)
+            if len(page) < page_size:
+                break
+            after = page[-1][0]
+    return {"checked": checked, "drift": drift, "errors": errors}
+
+
+async def reconcile_loop(bot: Bot, interval: float = CHANNEL_RECONCILE_INTERVAL_S) -> None:
+    """Периодическая сверка индекса подписчиков."""
+    logger.info(f"[membership] Фоновая сверка запущена (каждые {interval:.0f} с)")
+    while True:
+        try:
+            await asyncio.sleep(interval)
+            started = time.monotonic()
+            res = await reconcile_members(bot)
+            logger.info(
+                f"[membership] Сверка: проверено {res['checked']}, расхождений {res['drift']}, "
+                f"ошибок {res['errors']}, за {time.monotonic() - started:.0f} с"
+            )
+        except asyncio.CancelledError:
+            logger.info("[membership] Сверка отменена")
+            raise
+        except Exception as e:
+            logger.exception(f"[membership] Ошибка сверки: {e}")
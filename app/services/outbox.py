@@ -0,0 +1,148 @@
+# app/services/outbox.py
+from __future__ import annotations
+
+import asyncio
+import random
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from app.logger import logger
+from app.middlewares.send_scheduler import send_lane, OPERATIONAL
+from config.settings import (
+    OUTBOX_WORKERS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BASE_S,
+    OUTBOX_RETRY_MAX_S,
+    OUTBOX_POLL_S,
+)
+from database.requests import (
+    outbox_ready,
+    claim_outbox_batch,
+    complete_outbox,
+    fail_outbox,
+    reset_stale_outbox,
+    next_outbox_due,
+)
+
+OutboxHandler = Callable[[Bot, Dict[str, Any]], Awaitable[None]]
+
+_handlers: Dict[str, OutboxHandler] = {}
+
+
+class OutboxPermanentError(Exception):
+    """Повтор не поможет — задание сразу помечается failed."""
+
+
+def outbox_handler(kind: str) -> Callable[[OutboxHandler], OutboxHandler]:
+    """
+    Регистрирует обработчик заданий вида kind.
+
+    Обработчик получает payload (dict) и может записывать в него
+    прогресс — при неудаче payload сохраняется, и повтор продолжит
+    с того же места.
+    """
+    def decorator(func: OutboxHandler) -> OutboxHandler:
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def _retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка с джиттером: base * 2^n, не больше max."""
+    delay = min(OUTBOX_RETRY_MAX_S, OUTBOX_RETRY_BASE_S * (2 ** attempts))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def _process(bot: Bot, job: Dict[str, Any]) -> None:
+    job_id, kind, payload = job["id"], job["kind"], job["payload"]
+    try:
+        handler = _handlers.get(kind)
+        if handler is None:
+            raise OutboxPermanentError(f"нет обработчика для {kind!r}")
+        await handler(bot, payload)
+    except TelegramRetryAfter as e:
+        logger.warning(f"[outbox] #{job_id} {kind}: flood control, повтор через {e.retry_after} с")
+        await fail_outbox(job_id, str(e), float(e.retry_after), payload)
+    except (OutboxPermanentError, TelegramForbiddenError, TelegramBadRequest) as e:
+        logger.error(f"[outbox] #{job_id} {kind}: отказ без повтора: {e}")
+        await fail_outbox(job_id, repr(e), None, payload)
+    except Exception as e:
+        attempts = job["attempts"] + 1
+        retry_in = _retry_delay(job["attempts"]) if attempts < OUTBOX_MAX_ATTEMPTS else None
+        if retry_in is None:
+            logger.error(f"[outbox] #{job_id} {kind}: попытки исчерпаны ({attempts}): {e}")
+        else:
+            logger.warning(f"[outbox] #{job_id} {kind}: ошибка (попытка {attempts}), повтор через {retry_in:.0f} с: {e}")
+        await fail_outbox(job_id, repr(e), retry_in, payload)
+    else:
+        await complete_outbox(job_id)
+        return
+    # Повтор запланирован — пусть диспетчер пересчитает время сна
+    outbox_ready.set()
+
+
+async def _worker(bot: Bot, queue: "asyncio.Queue[Dict[str, Any]]") -> None:
+    while True:
+        job = await queue.get()
+        try:
+            await _process(bot, job)
+        except Exception as e:
+            # Сбой записи результата: задание останется processing
+            # и вернётся в очередь при следующем старте
+            logger.exception(f"[outbox] #{job['id']}: не удалось сохранить результат: {e}")
+        finally:
+            queue.task_done()
+
+
+async def _idle_timeout() -> float:
+    due = await next_outbox_due()
+    if due is None:
+        return OUTBOX_POLL_S
+    return min(OUTBOX_POLL_S, max(0.0, (due - datetime.utcnow()).total_seconds()))
+
+
+async def outbox_loop(bot: Bot, workers: int = OUTBOX_WORKERS) -> None:
+    """
+    Фоновая доставка outbox: диспетчер забирает готовые задания
+    пачками, пул из workers корутин их выполняет. Просыпается по
+    outbox_ready (новое задание закоммичено / запланирован повтор)
+    или к ближайшему next_attempt_at.
+    """
+    workers = max(1, workers)
+    stale = await reset_stale_outbox()
+    logger.info(f"[outbox] Фоновая задача запущена (воркеров: {workers}, возвращено в очередь: {stale})")
+
+    queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=workers)
+    # Воркеры наследуют полосу отправки: топики и ЛС админам — operational
+    with send_lane(OPERATIONAL):
+        pool = [asyncio.create_task(_worker(bot, queue)) for _ in range(workers)]
+    try:
+        while True:
+            try:
+                outbox_ready.clear()
+                jobs = await claim_outbox_batch(workers)
+                for job in jobs:
+                    await queue.put(job)
+                if len(jobs) == workers:
+                    # Возможно, готово ещё — забираем следующую пачку
+                    continue
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(outbox_ready.wait(), await _idle_timeout())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[outbox] Ошибка цикла: {e}")
+                await asyncio.sleep(5)
+    except asyncio.CancelledError:
+        logger.info("[outbox] Задача отменена")
+        raise
+    finally:
+        for task in pool:
+            task.cancel()
+        for task in pool:
+            with suppress(asyncio.CancelledError):
+                await task
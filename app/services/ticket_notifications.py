@@ -1,8 +1,29 @@
 from __future__ import annotations
 
+from html import escape
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
 from app.logger import logger
+from app.message_utils import plan_media_batches, send_media_batch
+from app.admin.keyboards.admin_kb import admin_open_button, status_panel_kb
 from app.services.email_service import send_email, EmailNetworkError, EmailConfigurationError
-from config.settings import ENGINEER_EMAIL
+from app.services.outbox import outbox_handler
+from config.settings import ENGINEER_EMAIL, NOTIFICATION_CHANNEL_ID
+from database.models import TicketStatus
+from database.read_models import TicketRow
+from database.requests import (
+    get_ticket_full,
+    get_ticket_thread_info,
+    get_ticket_attachments,
+    set_ticket_thread,
+)
+
+# Виды заданий outbox для новой заявки (пишутся в create_ticket_with_attachments)
+TICKET_TOPIC = "ticket_topic"        # топик форума + панель статуса + вложения
+TICKET_ADMIN_DM = "ticket_admin_dm"  # ЛС одному админу, payload: admin_id
+TICKET_EMAIL = "ticket_email"        # письмо инженеру
 
 
 async def send_ticket_email_notification(
@@ -81,4 +102,151 @@ async def send_ticket_email_notification(
             f"❌ Unexpected error sending email for ticket #{ticket_id}: {e}",
             exc_info=True
         )
-        return False
\ No newline at end of file
+        return False
+
+# ========= Доставка через outbox =========
+def _ticket_created_str(t: TicketRow) -> str:
+    return t.created_at.strftime("%d.%m.%Y %H:%M") if t.created_at else "—"
+
+
+def _ticket_summary(t: TicketRow) -> str:
+    # Поля — ввод пользователя: без экранирования «<» в имени или адресе
+    # Telegram отклонит сообщение целиком
+    return (
+        f"<b>Новая заявка №{t.id}</b>\n\n"
+        f"<blockquote><b>Заявитель:</b> {escape(t.user_name or '—')}"
+        f"{' (@' + escape(t.username) + ')' if t.username else ''}\n"
+        f"<b>Телефон:</b> {escape(t.phone or '—')}\n"
+        f"<b>Адрес:</b> {escape(t.address or '—')}\n"
+        f"<b>Создано:</b> {_ticket_created_str(t)}\n"
+        f"</blockquote>"
+    )
+
+
+async def _send_panel(bot: Bot, t: TicketRow, chat_id: int, thread_id: int) -> None:
+    commands = "Установить статус:\nОткрыта: /open\nВ работе: /work\nЗавершена: /done"
+    try:
+        await bot.send_message(
+            chat_id=chat_id,
+            message_thread_id=thread_id,
+            text=(
+                f"{_ticket_summary(t)}\n\n"
+                f"<b>Текст:</b>\n<blockquote>{escape(t.text)}</blockquote>\n\n"
+                f"{commands}"
+            ),
+            parse_mode="HTML",
+            reply_markup=status_panel_kb(t.id),
+        )
+    except TelegramBadRequest as e:
+        # Например, текст длиннее лимита — без панели статусов топик бесполезен,
+        # поэтому шлём её в минимальном виде
+        logger.error(f"Panel for ticket #{t.id} rejected, sending short version: {e}")
+        await bot.send_message(
+            chat_id=chat_id,
+            message_thread_id=thread_id,
+            text=f"Новая заявка №{t.id} (текст — в карточке заявки)\n\n{commands}",
+            parse_mode=None,
+            reply_markup=status_panel_kb(t.id),
+        )
+
+
+async def _send_attachments(bot: Bot, batch: list, chat_id: int, thread_id: int, payload: dict) -> None:
+    """
+    Пачка вложений; отклонённый Telegram альбом досылается по одному,
+    отклонённый файл пропускается (id — в attachments_failed), чтобы
+    один битый file_id не лишил топик остальных вложений.
+    """
+    try:
+        await send_media_batch(bot, chat_id, batch, message_thread_id=thread_id)
+        return
+    except TelegramBadRequest as e:
+        if len(batch) == 1:
+            logger.error(f"Attachment {batch[0].id} of ticket #{batch[0].ticket_id} rejected: {e}")
+            payload["attachments_failed"] = [*payload.get("attachments_failed", ()), batch[0].id]
+            return
+        logger.warning(f"Album of {len(batch)} attachments rejected, sending one by one: {e}")
+    for a in batch:
+        await _send_attachments(bot, [a], chat_id, thread_id, payload)
+
+
+@outbox_handler(TICKET_TOPIC)
+async def deliver_ticket_topic(bot: Bot, payload: dict) -> None:
+    """
+    Топик форума, панель статуса и вложения. Шаги идемпотентны по
+    прогрессу в payload: повтор не создаст второй топик и не отправит
+    заново уже ушедшие вложения. Отказ Telegram по отдельному шагу
+    (TelegramBadRequest) логируется и не мешает остальным; сбои сети
+    и flood control уходят в повтор всего задания.
+    """
+    t = await get_ticket_full(payload["ticket_id"])
+    if not t:
+        return
+
+    thread = await get_ticket_thread_info(t.id)
+    if thread is None and payload.get("topic"):
+        # Топик создан прошлой попыткой, но привязка к заявке не записалась
+        thread = tuple(payload["topic"])
+        await set_ticket_thread(t.id, *thread)
+    if thread is None:
+        # Без топика дальше некуда слать: ошибка здесь — ошибка задания.
+        # Шаг «не меньше одного раза»: id топика сразу идёт в payload
+        # (сохраняется при неудаче задания), так что сбой записи
+        # set_ticket_thread второго топика не создаст; падение процесса
+        # между create_forum_topic и коммитом — создаст (Telegram не даёт
+        # найти топик по имени), лишний топик останется пустым
+        topic = await bot.create_forum_topic(
+            chat_id=NOTIFICATION_CHANNEL_ID,
+            name=f"{TicketStatus.emoji(t.status)} Заявка №{t.id}",
+        )
+        thread = (NOTIFICATION_CHANNEL_ID, topic.message_thread_id)
+        payload["topic"] = list(thread)
+        await set_ticket_thread(t.id, *thread)
+        logger.info(f"Forum topic created for ticket #{t.id}")
+    group_chat_id, thread_id = thread
+
+    if not payload.get("panel_sent"):
+        await _send_panel(bot, t, group_chat_id, thread_id)
+        payload["panel_sent"] = True
+
+    # Вложения — альбомами до 10 файлов. Прогресс — id отправленных
+    # (attachments_sent — число первых отправленных, из старых заданий)
+    attachments = await get_ticket_attachments(t.id)
+    done = set(payload.get("attachments_done", ()))
+    pending = [a for a in attachments[payload.get("attachments_sent", 0):] if a.id not in done]
+    for batch in plan_media_batches(pending):
+        await _send_attachments(bot, batch, group_chat_id, thread_id, payload)
+        done.update(a.id for a in batch)
+        payload["attachments_done"] = sorted(done)
+
+
+@outbox_handler(TICKET_ADMIN_DM)
+async def deliver_ticket_admin_dm(bot: Bot, payload: dict) -> None:
+    t = await get_ticket_full(payload["ticket_id"])
+    if not t:
+        return
+    await bot.send_message(
+        payload["admin_id"],
+        f"{_ticket_summary(t)}\n<b>Текст:</b>\n<blockquote>{escape(t.text)}</blockquote>\n\n",
+        parse_mode="HTML",
+        reply_markup=admin_open_button(t.user_telegram_id),
+    )
+
+
+@outbox_handler(TICKET_EMAIL)
+async def deliver_ticket_email(bot: Bot, payload: dict) -> None:
+    if not ENGINEER_EMAIL:
+        return
+    t = await get_ticket_full(payload["ticket_id"])
+    if not t:
+        return
+    ok = await send_ticket_email_notification(
+        ticket_id=t.id,
+        user_name=t.user_name or "—",
+        user_phone=t.phone or "—",
+        address=t.address or "—",
+        text=t.text,
+        created_at=_ticket_created_str(t),
+    )
+    if not ok:
+        # send_email уже залогировал причину; повторит outbox
+        raise RuntimeError(f"email for ticket #{t.id} not sent")
@@ -0,0 +1 @@
+# app/storage/__init__.py
@@ -0,0 +1,218 @@
+# app/storage/memory.py
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from copy import copy
+from sys import getsizeof
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.logger import logger
+from config.settings import FSM_MEMORY_MAX_KEYS, FSM_MEMORY_IDLE_TTL_S, FSM_DATA_MAX_ITEMS
+
+
+class _Entry:
+    __slots__ = ("state", "data", "touched")
+
+    def __init__(self, now: float):
+        self.state: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self.touched = now
+
+
+# Сколько элементов длинного списка смотреть при оценке размера
+_SAMPLE = 4
+# Как часто (с) искать ключи, простоявшие дольше idle_ttl
+_SWEEP_EVERY_S = 1.0
+# Списки, которые можно урезать при превышении лимита: только id
+# сообщений для очистки чата и защиты от дублей
+_TRIMMABLE = ("msg_ids", "handled_msg_ids")
+
+
+def _value_size(value: Any, depth: int = 0) -> int:
+    size = getsizeof(value)
+    if depth >= 2 or type(value) in _SCALARS:
+        return size
+    if isinstance(value, (list, tuple)) and value:
+        # Элементы одного списка обычно однотипны: оцениваем по выборке,
+        # чтобы не обходить длинные msg_ids на каждой записи
+        half = _SAMPLE // 2
+        sample = value if len(value) <= _SAMPLE else [*value[:half], *value[-half:]]
+        size += len(value) * sum(_value_size(v, depth + 1) for v in sample) // len(sample)
+    elif isinstance(value, dict):
+        size += sum(getsizeof(k) + _value_size(v, depth + 1) for k, v in value.items())
+    return size
+
+
+_SCALARS = frozenset({int, str, float, bool, bytes, type(None)})
+
+
+def _data_size(data: Dict[str, Any]) -> int:
+    """Примерный объём data в памяти (sys.getsizeof, списки — по выборке)."""
+    return _value_size(data) if data else 0
+
+
+def _items_count(data: Dict[str, Any]) -> int:
+    """Ключи data плюс элементы вложенных коллекций — дешёвая мера размера на каждую запись."""
+    count = len(data)
+    for value in data.values():
+        if isinstance(value, (list, tuple, set, dict)):
+            count += len(value)
+    return count
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    FSM в памяти с ограничениями (замена MemoryStorage, которая хранит
+    данные каждого, кто когда-либо писал боту):
+
+    - не больше FSM_MEMORY_MAX_KEYS ключей — дольше всех не тронутые
+      вытесняются (LRU);
+    - ключ, к которому не обращались FSM_MEMORY_IDLE_TTL_S, удаляется;
+    - data одного ключа не больше FSM_DATA_MAX_ITEMS элементов (ключи +
+      элементы списков/словарей) — иначе у служебных списков id
+      (_TRIMMABLE: msg_ids, handled_msg_ids) отбрасывается старшая
+      половина. Данные пользователя (attachments, текст заявки ...) не
+      урезаются никогда: если служебных списков не хватило, data
+      сохраняется как есть, с предупреждением в логе;
+    - state.clear() удаляет ключ целиком.
+
+    Метрики — stats().
+    """
+
+    def __init__(
+        self,
+        max_keys: int = FSM_MEMORY_MAX_KEYS,
+        idle_ttl: float = FSM_MEMORY_IDLE_TTL_S,
+        max_data_items: int = FSM_DATA_MAX_ITEMS,
+    ):
+        self.max_keys = max(1, int(max_keys))
+        self.idle_ttl = idle_ttl
+        self.max_data_items = max(0, int(max_data_items))
+        self._items: "OrderedDict[StorageKey, _Entry]" = OrderedDict()
+        self._last_sweep = 0.0
+
+        # Метрики
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+        self.trimmed = 0
+        self.oversized = 0
+
+    # ----- служебное -----
+    def _drop(self, key: StorageKey) -> None:
+        self._items.pop(key, None)
+
+    def _sweep(self, now: float) -> None:
+        # Порядок OrderedDict = порядок обращений: истёкшие — в начале
+        if now - self._last_sweep < _SWEEP_EVERY_S:
+            return
+        self._last_sweep = now
+        while self._items:
+            key, entry = next(iter(self._items.items()))
+            if now - entry.touched <= self.idle_ttl:
+                break
+            self._drop(key)
+            self.evicted_idle += 1
+
+    def _get(self, key: StorageKey) -> Optional[_Entry]:
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        if now - entry.touched > self.idle_ttl:
+            self._drop(key)
+            self.evicted_idle += 1
+            return None
+        entry.touched = now
+        self._items.move_to_end(key)
+        return entry
+
+    def _get_or_create(self, key: StorageKey) -> _Entry:
+        entry = self._get(key)
+        if entry is None:
+            entry = self._items[key] = _Entry(time.monotonic())
+            while len(self._items) > self.max_keys:
+                self._drop(next(iter(self._items)))
+                self.evicted_lru += 1
+        return entry
+
+    def _cap(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        count = _items_count(data)
+        if not self.max_data_items or count <= self.max_data_items:
+            return data
+        before = count
+        while count > self.max_data_items:
+            lists = [(len(data[k]), k) for k in _TRIMMABLE if len(data.get(k) or ()) > 1]
+            if not lists:
+                break
+            _, longest = max(lists)
+            items = data[longest]
+            data[longest] = items[len(items) // 2:]
+            count = _items_count(data)
+        if count < before:
+            self.trimmed += 1
+        if count > self.max_data_items:
+            self.oversized += 1
+            logger.warning(
+                f"[fsm] data пользователя {key.user_id}: {count} элементов при лимите "
+                f"{self.max_data_items} — служебные списки уже урезаны, остальное сохранено как есть"
+            )
+        else:
+            logger.warning(
+                f"[fsm] data пользователя {key.user_id}: {before} элементов при лимите "
+                f"{self.max_data_items}, старые id в {', '.join(_TRIMMABLE)} отброшены (осталось {count})"
+            )
+        return data
+
+    def _store(self, key: StorageKey, entry: _Entry) -> None:
+        # Пустой ключ (после state.clear()) не держим
+        if entry.state is None and not entry.data:
+            self._drop(key)
+
+    # ----- BaseStorage -----
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = self._get_or_create(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._store(key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = self._get(key)
+        return entry.state if entry else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        entry = self._get_or_create(key)
+        entry.data = self._cap(key, data.copy())
+        self._store(key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = self._get(key)
+        return entry.data.copy() if entry else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any = None) -> Any:
+        entry = self._get(storage_key)
+        return copy(entry.data.get(dict_key, default)) if entry else default
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        self._last_sweep = 0.0
+        self._sweep(time.monotonic())
+        return {
+            "keys": len(self._items),
+            "max_keys": self.max_keys,
+            # Оценка по sys.getsizeof: обход всех ключей — только по запросу метрик
+            "data_bytes": sum(_data_size(e.data) for e in self._items.values()),
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "trimmed": self.trimmed,
+            "oversized": self.oversized,
+        }
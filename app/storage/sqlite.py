@@ -0,0 +1,188 @@
+# app/storage/sqlite.py
+from __future__ import annotations
+
+import asyncio
+import pickle
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.logger import logger
+from config.settings import FSM_TTL_S, FSM_FLUSH_DELAY_MS, FSM_CACHE_MAX_SIZE
+from database.requests import load_fsm_record, save_fsm_records, purge_expired_fsm
+
+# Запись в памяти: [state, data, время последней записи (time.time())]
+_Record = List[Any]
+
+# Как часто удалять истёкшие записи из БД
+_PURGE_EVERY_S = 3600.0
+# Пауза перед повтором, если запись в БД не удалась
+_RETRY_DELAY_S = 1.0
+
+
+def _key_str(key: StorageKey) -> str:
+    return (
+        f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:"
+        f"{key.business_connection_id or ''}:{key.destiny}"
+    )
+
+
+def _dumps(data: Dict[str, Any]) -> Optional[bytes]:
+    # pickle сохраняет типы как есть (AttachmentType, кортежи и т.п.) —
+    # хендлеры получают те же объекты, что и с MemoryStorage
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL) if data else None
+
+
+def _loads(blob: Optional[bytes]) -> Dict[str, Any]:
+    return pickle.loads(blob) if blob else {}
+
+
+class SqliteStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_states основной БД: незавершённые
+    регистрации, черновики заявок с вложениями и т.п. переживают рестарт.
+
+    - Чтение — из LRU-кеша в памяти (FSM_CACHE_MAX_SIZE записей),
+      в БД идём только за ключом, которого кеш ещё не видел.
+    - Запись отложенная: set_state / set_data помечают ключ, через
+      FSM_FLUSH_DELAY_MS все помеченные ключи пишутся одной транзакцией.
+      Цепочка update_data + save_msg в одном хендлере — одна запись в БД.
+    - Запись живёт FSM_TTL_S с последнего изменения, потом считается
+      пустой; истёкшие строки периодически удаляются.
+
+    Для нескольких процессов бота: FSM_CACHE_MAX_SIZE=0 и
+    FSM_FLUSH_DELAY_MS=0 — каждое чтение и запись идут в БД.
+    """
+
+    def __init__(
+        self,
+        ttl: float = FSM_TTL_S,
+        flush_delay_ms: int = FSM_FLUSH_DELAY_MS,
+        cache_max_size: int = FSM_CACHE_MAX_SIZE,
+    ):
+        self.ttl = ttl
+        self.flush_delay = max(0, flush_delay_ms) / 1000
+        self.cache_max_size = max(0, int(cache_max_size))
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Dict[str, _Record] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._last_purge = 0.0
+
+        # Метрики
+        self.loads = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.writes = 0
+
+    # ----- чтение -----
+    def _alive(self, rec: _Record) -> bool:
+        return time.time() - rec[2] < self.ttl
+
+    async def _get(self, key: StorageKey) -> _Record:
+        k = _key_str(key)
+        rec = self._dirty.get(k) or self._cache.get(k)
+        if rec is not None:
+            if self.cache_max_size and k in self._cache:
+                self._cache.move_to_end(k)
+            return rec if self._alive(rec) else [None, {}, time.time()]
+        self.loads += 1
+        row = await load_fsm_record(k)
+        rec = [row[0], _loads(row[1]), time.time()] if row else [None, {}, time.time()]
+        self._remember(k, rec)
+        return rec
+
+    def _remember(self, k: str, rec: _Record) -> None:
+        if not self.cache_max_size:
+            return
+        self._cache[k] = rec
+        self._cache.move_to_end(k)
+        while len(self._cache) > self.cache_max_size:
+            self._cache.popitem(last=False)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(key))[0]
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get(key))[1].copy()
+
+    # ----- запись -----
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        rec = await self._get(key)
+        await self._put(key, state.state if isinstance(state, State) else state, rec[1])
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        rec = await self._get(key)
+        await self._put(key, rec[0], data.copy())
+
+    async def _put(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]) -> None:
+        k = _key_str(key)
+        rec = [state, data, time.time()]
+        self.writes += 1
+        self._remember(k, rec)
+        self._dirty[k] = rec
+        if not self.flush_delay:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self, delay: Optional[float] = None) -> None:
+        await asyncio.sleep(self.flush_delay if delay is None else delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записать все отложенные изменения одной транзакцией."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            expires = datetime.utcnow() + timedelta(seconds=self.ttl)
+            rows: List[Tuple[str, Optional[str], Optional[bytes], datetime]] = [
+                (k, state, _dumps(data), expires) for k, (state, data, _touched) in batch.items()
+            ]
+            try:
+                await save_fsm_records(rows)
+            except Exception as e:
+                logger.exception(f"[fsm] Не удалось сохранить {len(rows)} записей: {e}")
+                # Вернуть в очередь то, что не перезаписано за время попытки
+                for k, rec in batch.items():
+                    self._dirty.setdefault(k, rec)
+                if self._flush_task is None or self._flush_task.done() or self._flush_task is asyncio.current_task():
+                    self._flush_task = asyncio.create_task(self._delayed_flush(_RETRY_DELAY_S))
+                return
+            self.flushes += 1
+            self.rows_written += len(rows)
+
+            now = time.monotonic()
+            if now - self._last_purge >= _PURGE_EVERY_S:
+                self._last_purge = now
+                try:
+                    purged = await purge_expired_fsm()
+                    if purged:
+                        logger.info(f"[fsm] Удалено истёкших состояний: {purged}")
+                except Exception as e:
+                    logger.error(f"[fsm] Не удалось удалить истёкшие состояния: {e}")
+
+    async def close(self) -> None:
+        # Не отменяем: отмена посреди записи потеряла бы пачку
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "loads": self.loads,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
@@ -20,6 +20,7 @@ from config.settings import (
     METER_EXPORT_MINUTE,
 )
 from database.export_queries import get_cold_water_readings_for_export
+from database.read_models import MeterRow
 
 IRKUTSK_TZ = pytz.timezone(IRKUTSK_TZ_NAME)
 
@@ -67,7 +68,7 @@ async def _sleep_until(dt_irkt: datetime) -> None:
         await asyncio.sleep(min(sec, 60))
 
 
-async def _generate_cold_water_csv(readings: list[dict], filename: str) -> Path:
+async def _generate_cold_water_csv(readings: list[MeterRow], filename: str) -> Path:
     """Генерация CSV файла с показаниями холодной воды."""
     temp_dir = tempfile.gettempdir()
     filepath = Path(temp_dir) / f"{filename}.csv"
@@ -82,14 +83,14 @@ async def _generate_cold_water_csv(readings: list[dict], filename: str) -> Path:
 
         # Данные
         for reading in readings:
-            reading_date = reading['reading_date'].strftime('%d.%m.%Y') if reading['reading_date'] else ''
-            created_at = reading['created_at'].strftime('%d.%m.%Y %H:%M') if reading['created_at'] else ''
+            reading_date = reading.reading_date.strftime('%d.%m.%Y') if reading.reading_date else ''
+            created_at = reading.created_at.strftime('%d.%m.%Y %H:%M') if reading.created_at else ''
 
             writer.writerow([
-                reading['user_name'],
-                reading['address'],
-                reading['phone'],
-                reading['value'],
+                reading.name or '—',
+                reading.address,
+                reading.phone or '—',
+                reading.value,
                 reading_date,
                 created_at
             ])
@@ -97,7 +98,7 @@ async def _generate_cold_water_csv(readings: list[dict], filename: str) -> Path:
     return filepath
 
 
-async def _generate_cold_water_xlsx(readings: list[dict], filename: str) -> Path:
+async def _generate_cold_water_xlsx(readings: list[MeterRow], filename: str) -> Path:
     """Генерация Excel файла с показаниями холодной воды."""
     try:
         from openpyxl import Workbook
@@ -124,14 +125,14 @@ async def _generate_cold_water_xlsx(readings: list[dict], filename: str) -> Path
 
     # Данные
     for reading in readings:
-        reading_date = reading['reading_date'].strftime('%d.%m.%Y') if reading['reading_date'] else ''
-        created_at = reading['created_at'].strftime('%d.%m.%Y %H:%M') if reading['created_at'] else ''
+        reading_date = reading.reading_date.strftime('%d.%m.%Y') if reading.reading_date else ''
+        created_at = reading.created_at.strftime('%d.%m.%Y %H:%M') if reading.created_at else ''
 
         ws.append([
-            reading['user_name'],
-            reading['address'],
-            reading['phone'],
-            reading['value'],
+            reading.name or '—',
+            reading.address,
+            reading.phone or '—',
+            reading.value,
             reading_date,
             created_at
         ])
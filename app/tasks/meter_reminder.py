@@ -3,23 +3,42 @@ from __future__ import annotations
 
 import asyncio
 import calendar
+import time
 from datetime import datetime
+from typing import List, Optional, Tuple
 
 import pytz
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 import app.user.keyboards.user_kb as kb
 from app.logger import logger
+from app.middlewares.send_scheduler import send_lane, BULK
 from config.settings import (
     IRKUTSK_TZ_NAME,
     METER_REMIND_HOUR,
     METER_REMIND_MINUTE,
     METER_REMIND_START_DAY,
+    REMIND_CONCURRENCY,
+    REMIND_PAGE_SIZE,
+    REMIND_MAX_ATTEMPTS,
+    REMIND_FLUSH_EVERY,
+)
+from database.requests import (
+    reminder_period,
+    begin_reminder_run,
+    finish_reminder_run,
+    get_unfinished_reminder_run,
+    list_reminder_audience,
+    record_reminder_deliveries,
 )
-from database.requests import list_users_missing_month_meters
 
 IRKUTSK_TZ = pytz.timezone(IRKUTSK_TZ_NAME)
 
+# Запись журнала в конце рассылки: столько попыток, пауза между ними (с)
+_FINAL_FLUSH_ATTEMPTS = 3
+_FINAL_FLUSH_RETRY_S = 1.0
+
 MONTHS_RU = [
     "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
     "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
@@ -92,50 +111,164 @@ async def _sleep_until(dt_irkt: datetime) -> None:
         await asyncio.sleep(min(sec, 60))
 
 
-async def _send_reminders(bot: Bot) -> None:
-    """Отправка напоминаний о холодной воде."""
-    users = await list_users_missing_month_meters()
-    if not users:
-        logger.info("[meter_reminder] Все пользователи передали показания — рассылка пропущена.")
-        return
+class _RunStats:
+    __slots__ = ("total", "sent", "blocked", "failed")
+
+    def __init__(self) -> None:
+        self.total = self.sent = self.blocked = self.failed = 0
+
+    def add(self, status: str) -> None:
+        self.total += 1
+        setattr(self, status, getattr(self, status) + 1)
 
-    any_row = users[0]
-    month, year = any_row["month"], any_row["year"]
+
+def _reminder_text(period: int) -> str:
+    year, month = divmod(period, 100)
     month_name = MONTHS_RU[month] if 1 <= month <= 12 else ""
+    return (
+        f"💧 Напоминание за {month_name} {year}.\n\n"
+        f"У вас не переданы показания холодной воды.\n"
+        f"Пожалуйста, передайте показания в боте."
+    )
 
-    sent_count = 0
-    for user in users:
-        tg_id = user["telegram_id"]
-        cold_ok = user["cold_exists"]
 
-        if cold_ok:
-            continue
+def _is_blocked_error(e: Exception) -> bool:
+    # Бот заблокирован / аккаунт удалён / чат недоступен — повтор не поможет
+    if isinstance(e, TelegramForbiddenError):
+        return True
+    return isinstance(e, TelegramBadRequest) and "chat not found" in str(e).lower()
 
-        text = (
-            f"💧 Напоминание за {month_name} {year}.\n\n"
-            f"У вас не переданы показания холодной воды.\n"
-            f"Пожалуйста, передайте показания в боте."
-        )
 
-        try:
-            await bot.send_message(
-                chat_id=tg_id,
-                text=text,
-                disable_notification=True,
-                reply_markup=kb.type_meter_menu()
-            )
-            sent_count += 1
-            await asyncio.sleep(0.03)
-        except Exception as e:
-            logger.error(f"[meter_reminder] Не удалось отправить напоминание {tg_id}: {e}")
+async def _produce(period: int, queue: "asyncio.Queue[Optional[Tuple[int, int]]]", workers: int) -> None:
+    """Получатели порциями по users.id (keyset), очередь ограничена — память не растёт."""
+    after_id = 0
+    while True:
+        page = await list_reminder_audience(period, after_id, REMIND_PAGE_SIZE, REMIND_MAX_ATTEMPTS)
+        for item in page:
+            await queue.put(item)
+        if len(page) < REMIND_PAGE_SIZE:
+            break
+        after_id = page[-1][0]
+    for _ in range(workers):
+        await queue.put(None)
+
+
+async def _send_reminders(bot: Bot, period: Optional[int] = None) -> None:
+    """
+    Рассылка напоминаний о показаниях за месяц period (по умолчанию — текущий).
+
+    Получатели читаются из БД порциями, отправляют REMIND_CONCURRENCY
+    воркеров (темп задаёт SendScheduler, полоса bulk). Результат каждой
+    отправки пишется в журнал reminder_deliveries пачками — после
+    перезапуска рассылка продолжается с тех, кто ещё не получил
+    напоминание. Заблокировавшие бота попадают в bot_blocked_chats и
+    пропускаются до следующего /start.
+    """
+    period = period or reminder_period()
+    resumed = await begin_reminder_run(period)
+    text = _reminder_text(period)
+    workers = max(1, REMIND_CONCURRENCY)
+    logger.info(
+        f"[meter_reminder] Рассылка за {period}: {'продолжение' if resumed else 'старт'} "
+        f"(воркеров: {workers})"
+    )
 
-    logger.info(f"[meter_reminder] Отправлено {sent_count} напоминаний о холодной воде.")
+    stats = _RunStats()
+    pending: List[Tuple[int, int, str, Optional[str]]] = []
+    flush_lock = asyncio.Lock()
+    queue: asyncio.Queue[Optional[Tuple[int, int]]] = asyncio.Queue(maxsize=workers * 4)
+    started = time.monotonic()
+
+    async def flush(final: bool = False) -> None:
+        # Результаты убираем из pending только после успешной записи:
+        # потерянная строка журнала — повторное напоминание при продолжении
+        async with flush_lock:
+            attempt = 0
+            while pending:
+                batch = pending[:]
+                try:
+                    await record_reminder_deliveries(period, batch)
+                except Exception as e:
+                    attempt += 1
+                    if not final:
+                        # Повторим при следующем flush; рассылка продолжается
+                        logger.error(f"[meter_reminder] Не удалось записать {len(batch)} результатов: {e}")
+                        return
+                    if attempt >= _FINAL_FLUSH_ATTEMPTS:
+                        raise
+                    logger.error(
+                        f"[meter_reminder] Не удалось записать {len(batch)} результатов "
+                        f"(попытка {attempt}/{_FINAL_FLUSH_ATTEMPTS}): {e}"
+                    )
+                    await asyncio.sleep(_FINAL_FLUSH_RETRY_S)
+                    continue
+                del pending[:len(batch)]
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            user_id, tg_id = item
+            try:
+                await bot.send_message(
+                    chat_id=tg_id,
+                    text=text,
+                    disable_notification=True,
+                    reply_markup=kb.type_meter_menu()
+                )
+                status, error = "sent", None
+            except Exception as e:
+                status = "blocked" if _is_blocked_error(e) else "failed"
+                error = str(e)
+                if status == "failed":
+                    logger.error(f"[meter_reminder] Не удалось отправить напоминание {tg_id}: {e}")
+            stats.add(status)
+            pending.append((user_id, tg_id, status, error))
+            if len(pending) >= REMIND_FLUSH_EVERY:
+                await flush()
+
+    # Темп задаёт SendScheduler; bulk-полоса пропускает вперёд ответы жителям
+    with send_lane(BULK):
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    tasks.append(asyncio.create_task(_produce(period, queue, workers)))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Уже отправленное фиксируем и при отмене — иначе повтор разошлёт дубли
+        await asyncio.shield(flush(final=True))
+
+    totals = await finish_reminder_run(period)
+    elapsed = time.monotonic() - started
+    rate = stats.total / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"[meter_reminder] Рассылка за {period} завершена{' (продолжение)' if resumed else ''}: "
+        f"получателей {stats.total}, отправлено {stats.sent}, заблокировали {stats.blocked}, "
+        f"ошибок {stats.failed}, за {elapsed:.1f} с ({rate:.1f} сообщ./с); "
+        f"всего за месяц: {totals['sent']} / {totals['blocked']} / {totals['failed']}"
+    )
 
 
 async def meter_reminder_loop(bot: Bot) -> None:
     """Основной цикл задачи напоминаний."""
     logger.info("[meter_reminder] Фоновая задача запущена")
 
+    # Рассылка, прерванная перезапуском, продолжается сразу
+    try:
+        unfinished = await get_unfinished_reminder_run()
+        if unfinished == reminder_period():
+            await _send_reminders(bot, unfinished)
+        elif unfinished:
+            # Месяц уже сменился — напоминание за прошлый месяц неактуально
+            logger.warning(f"[meter_reminder] Прерванная рассылка за {unfinished} закрыта без продолжения")
+            await finish_reminder_run(unfinished)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.exception(f"[meter_reminder] Не удалось продолжить прерванную рассылку: {e}")
+
     while True:
         try:
             now_irkt = datetime.utcnow().replace(tzinfo=pytz.utc).astimezone(IRKUTSK_TZ)
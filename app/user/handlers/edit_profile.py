@@ -30,7 +30,8 @@ async def quick_edit_profile(call: CallbackQuery, state: FSMContext):
 
 @edit_router.callback_query(cb.filter(F.a == "edit_name"))
 async def quick_edit_name(call: CallbackQuery, state: FSMContext):
-    await clear_chat_history(call.bot, call.message.chat.id, state)
+    # call.message сейчас будет отредактировано — его не удаляем
+    await clear_chat_history(call.bot, call.message.chat.id, state, keep=(call.message.message_id,))
     await state.set_state(EditProfile.new_data)
     await state.update_data(param="name")
     await save_msg(call.message, state)
@@ -47,7 +48,8 @@ async def quick_edit_name(call: CallbackQuery, state: FSMContext):
 
 @edit_router.callback_query(cb.filter(F.a == "edit_phone"))
 async def quick_edit_phone(call: CallbackQuery, state: FSMContext):
-    await clear_chat_history(call.bot, call.message.chat.id, state)
+    # call.message сейчас будет отредактировано — его не удаляем
+    await clear_chat_history(call.bot, call.message.chat.id, state, keep=(call.message.message_id,))
     await state.set_state(EditProfile.new_data)
     await state.update_data(param="phone")
     await save_msg(call.message, state)
@@ -64,7 +66,8 @@ async def quick_edit_phone(call: CallbackQuery, state: FSMContext):
 
 @edit_router.callback_query(cb.filter(F.a == "edit_street"))
 async def quick_edit_street(call: CallbackQuery, state: FSMContext):
-    await clear_chat_history(call.bot, call.message.chat.id, state)
+    # call.message сейчас будет отредактировано — его не удаляем
+    await clear_chat_history(call.bot, call.message.chat.id, state, keep=(call.message.message_id,))
     await state.set_state(EditProfile.new_data)
     await state.update_data(param="street")
     await save_msg(call.message, state)
@@ -82,7 +85,8 @@ async def quick_edit_street(call: CallbackQuery, state: FSMContext):
 
 @edit_router.callback_query(cb.filter(F.a == "edit_house"))
 async def quick_edit_house(call: CallbackQuery, state: FSMContext):
-    await clear_chat_history(call.bot, call.message.chat.id, state)
+    # call.message сейчас будет отредактировано — его не удаляем
+    await clear_chat_history(call.bot, call.message.chat.id, state, keep=(call.message.message_id,))
     await state.set_state(EditProfile.new_data)
     await state.update_data(param="house")
     await save_msg(call.message, state)
@@ -100,7 +104,8 @@ async def quick_edit_house(call: CallbackQuery, state: FSMContext):
 
 @edit_router.callback_query(cb.filter(F.a == "edit_apartment"))
 async def quick_edit_apartment(call: CallbackQuery, state: FSMContext):
-    await clear_chat_history(call.bot, call.message.chat.id, state)
+    # call.message сейчас будет отредактировано — его не удаляем
+    await clear_chat_history(call.bot, call.message.chat.id, state, keep=(call.message.message_id,))
     await state.set_state(EditProfile.new_data)
     await state.update_data(param="apartment")
     await save_msg(call.message, state)
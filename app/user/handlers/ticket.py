@@ -1,5 +1,4 @@
 # app/user/handlers/ticket.py
-import asyncio
 from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
@@ -9,13 +8,13 @@ from aiogram.exceptions import TelegramBadRequest
 from app.message_utils import replace_or_send_message
 import app.user.keyboards.user_kb as kb
 from app.user.keyboards.user_kb import cb
-from app.admin.keyboards.admin_kb import admin_open_button, status_panel_kb
-from app.helpers import clear_chat_history, save_msg
+from app.admin.keyboards.admin_kb import admin_open_button
+from app.helpers import clear_chat_history, save_msg, track_msg_ids
 from app.user.utils.states import TicketStates, AttachmentType
-from app.services.ticket_notifications import send_ticket_email_notification
+from app.services.ticket_notifications import TICKET_TOPIC, TICKET_ADMIN_DM, TICKET_EMAIL
 from database.requests import (
-    create_ticket, cancel_ticket, get_ticket_by_id, get_user_by_tg,
-    add_ticket_attachment, set_ticket_thread, list_user_tickets, count_user_tickets,
+    create_ticket_with_attachments, cancel_ticket, get_ticket_by_id, get_user_by_tg,
+    list_user_tickets,
     get_user_ticket_full, get_ticket_thread_info
 )
 from database.models import TicketStatus
@@ -23,6 +22,8 @@ from app.user.keyboards.user_kb import _status_from_val
 from config.settings import NOTIFICATION_CHANNEL_ID
 from app.admin.acl import get_admin_ids
 from app.logger import logger
+from app.user.middlewares.album import wait_for_album
+from app.middlewares.send_scheduler import send_lane, OPERATIONAL
 
 ticket_router = Router(name="ticket_router")
 
@@ -76,27 +77,6 @@ async def send_service_message(
     return msg
 
 
-async def send_album_completion_message(bot, chat_id: int, state: FSMContext, album_count: int, total_count: int):
-    """Отправляет сообщение после завершения получения альбома."""
-    await asyncio.sleep(0.8)  # Ждём, пока все файлы альбома придут
-
-    # Проверяем, что задача всё ещё актуальна
-    data = await state.get_data()
-    current_task_id = data.get("album_task_id")
-    this_task_id = id(asyncio.current_task())
-
-    if current_task_id != this_task_id:
-        # Задача была отменена или заменена новой
-        return
-
-    text = f"✅ Принят альбом из {album_count} файлов. Всего прикреплено: {total_count}"
-    await send_service_message(
-        bot, chat_id, state, "service_msg_id",
-        text, kb.ticket_attachments_controls()
-    )
-    await state.update_data(album_task_id=None)
-
-
 @ticket_router.callback_query(cb.filter(F.a == "ticket_menu"))
 async def ticket_menu(call: CallbackQuery, state: FSMContext):
     await state.clear()
@@ -125,9 +105,7 @@ async def ticket_create_start(call: CallbackQuery, state: FSMContext):
     await state.update_data(
         attachments=[],
         handled_msg_ids=[],
-        album={"id": None, "count": 0},
-        service_msg_id=None,
-        album_task_id=None
+        service_msg_id=None
     )
 
     text = (
@@ -158,9 +136,7 @@ async def ticket_text_captured(msg: Message, state: FSMContext):
     await state.update_data(
         text=msg.text.strip(),
         attachments=[],  # Сбрасываем вложения при новом тексте
-        handled_msg_ids=[],
-        album={"id": None, "count": 0},
-        album_task_id=None
+        handled_msg_ids=[]
     )
     await state.set_state(TicketStates.attachments)
 
@@ -233,142 +209,103 @@ async def ticket_abort(call: CallbackQuery, state: FSMContext):
     await call.answer()
 
 
-@ticket_router.message(
-    TicketStates.attachments,
-    F.content_type.in_({
-        ContentType.PHOTO, ContentType.VIDEO, ContentType.DOCUMENT,
-        ContentType.AUDIO, ContentType.VOICE
-    })
-)
-async def ticket_collect_attachments(msg: Message, state: FSMContext):
-    data = await state.get_data()
-
-    # Защита от дублей
-    handled = set(data.get("handled_msg_ids", []))
-    if msg.message_id in handled:
-        return
-    handled.add(msg.message_id)
-    if len(handled) > 100:
-        handled = set(list(handled)[-100:])
-
-    attachments = data.get("attachments", [])
-    album = data.get("album", {"id": None, "count": 0})
-    gid = msg.media_group_id
-
-    # Определяем тип вложения
-    attachment = None
+def _attachment_from(msg: Message) -> dict | None:
+    """Вложение заявки из сообщения (фото — в максимальном размере)."""
     if msg.photo:
         f = msg.photo[-1]
-        attachment = {
+        return {
             "type": AttachmentType.PHOTO,
             "file_id": f.file_id,
             "file_unique_id": f.file_unique_id,
             "caption": msg.caption
         }
-    elif msg.video:
-        attachment = {
+    if msg.video:
+        return {
             "type": AttachmentType.VIDEO,
             "file_id": msg.video.file_id,
             "file_unique_id": msg.video.file_unique_id,
             "caption": msg.caption
         }
-    elif msg.document:
-        attachment = {
+    if msg.document:
+        return {
             "type": AttachmentType.DOCUMENT,
             "file_id": msg.document.file_id,
             "file_unique_id": msg.document.file_unique_id,
             "caption": msg.caption
         }
-    elif msg.audio:
-        attachment = {
+    if msg.audio:
+        return {
             "type": AttachmentType.AUDIO,
             "file_id": msg.audio.file_id,
             "file_unique_id": msg.audio.file_unique_id,
             "caption": msg.caption
         }
-    elif msg.voice:
-        attachment = {
+    if msg.voice:
+        return {
             "type": AttachmentType.VOICE,
             "file_id": msg.voice.file_id,
             "file_unique_id": msg.voice.file_unique_id,
             "caption": None
         }
+    return None
 
-    if attachment:
-        attachments.append(attachment)
-        await save_msg(msg, state)
-
-    # Обработка альбомов
-    if gid:
-        # Это файл из альбома
-        if album["id"] != gid:
-            # Новый альбом - если был старый, завершаем его
-            if album["id"] and album["count"] > 0:
-                # Отправляем сообщение о завершении предыдущего альбома
-                old_count = album["count"]
-                text = f"✅ Принят альбом из {old_count} файлов. Всего прикреплено: {len(attachments) - 1}"
-                await send_service_message(
-                    msg.bot, msg.chat.id, state, "service_msg_id",
-                    text, kb.ticket_attachments_controls()
-                )
 
-            album = {"id": gid, "count": 1}
-        else:
-            # Продолжение текущего альбома
-            album["count"] += 1
+# album — все части альбома сразу (app/user/middlewares/album.py);
+# одиночный файл приходит как album=[msg]
+@ticket_router.message(
+    TicketStates.attachments,
+    F.content_type.in_({
+        ContentType.PHOTO, ContentType.VIDEO, ContentType.DOCUMENT,
+        ContentType.AUDIO, ContentType.VOICE
+    }),
+    flags={"album": True}
+)
+async def ticket_collect_attachments(msg: Message, state: FSMContext, album: list[Message]):
+    data = await state.get_data()
 
-        await state.update_data(
-            attachments=attachments,
-            handled_msg_ids=list(handled),
-            album=album
-        )
+    # Защита от дублей
+    handled = list(data.get("handled_msg_ids", []))
+    seen = set(handled)
+    fresh = [m for m in album if m.message_id not in seen]
+    if not fresh:
+        return
+    handled = (handled + [m.message_id for m in fresh])[-100:]
 
-        # Создаём задачу для отправки сообщения после завершения альбома
-        # Каждый новый файл отменяет предыдущую задачу и создаёт новую
-        task = asyncio.create_task(
-            send_album_completion_message(
-                msg.bot, msg.chat.id, state, album["count"], len(attachments)
-            )
-        )
-        await state.update_data(album_task_id=id(task))
+    attachments = data.get("attachments", [])
+    added = [a for a in map(_attachment_from, fresh) if a]
+    attachments.extend(added)
 
+    if len(album) > 1:
+        text = f"✅ Принят альбом из {len(added)} файлов. Всего прикреплено: {len(attachments)}"
     else:
-        # Одиночный файл
-        # Если был незавершённый альбом, завершаем его
-        if album["id"] and album["count"] > 0:
-            old_count = album["count"]
-            text = f"✅ Принят альбом из {old_count} файлов."
-            await send_service_message(
-                msg.bot, msg.chat.id, state, "service_msg_id",
-                text, kb.ticket_attachments_controls()
-            )
-
-        album = {"id": None, "count": 0}
-        await state.update_data(
-            attachments=attachments,
-            handled_msg_ids=list(handled),
-            album=album,
-            album_task_id=None
-        )
-
-        # Отправляем сообщение сразу для одиночного файла
         text = f"✅ Вложение принято. Всего прикреплено: {len(attachments)}"
-        await send_service_message(
-            msg.bot, msg.chat.id, state, "service_msg_id",
-            text, kb.ticket_attachments_controls()
-        )
+
+    # Служебное сообщение меняем без промежуточных записей в state
+    service_msg_id = data.get("service_msg_id")
+    if service_msg_id:
+        try:
+            await msg.bot.delete_message(msg.chat.id, service_msg_id)
+        except Exception:
+            pass
+    sent = await msg.bot.send_message(
+        chat_id=msg.chat.id,
+        text=text,
+        reply_markup=kb.ticket_attachments_controls(),
+        parse_mode="HTML"
+    )
+
+    # Весь альбом — одна запись в state
+    data.update(attachments=attachments, handled_msg_ids=handled, service_msg_id=sent.message_id)
+    track_msg_ids(data, [*(m.message_id for m in fresh), sent.message_id])
+    await state.set_data(data)
 
 
 @ticket_router.callback_query(cb.filter(F.a == "ticket_attachments_done"), TicketStates.attachments)
 async def ticket_attachments_done(call: CallbackQuery, state: FSMContext):
+    # Альбом, который ещё собирается, должен попасть в предпросмотр
+    await wait_for_album(call.message.chat.id)
     data = await state.get_data()
 
-    # Если есть незавершённый альбом, ждём его завершения
-    album = data.get("album", {"id": None, "count": 0})
-    if album.get("id") and album.get("count", 0) > 0:
-        await asyncio.sleep(1)  # Даём время на завершение альбома
-        data = await state.get_data()  # Обновляем data после ожидания
-
     await state.set_state(TicketStates.preview)
 
     profile = await get_user_by_tg(call.from_user.id)
@@ -415,6 +352,8 @@ async def ticket_attachments_done(call: CallbackQuery, state: FSMContext):
     await call.answer()
 
 
+# Заявка коммитится на выходе из create_ticket_with_attachments,
+# и outbox-воркер просыпается, не дожидаясь конца хендлера
 @ticket_router.callback_query(cb.filter(F.a == "ticket_confirm"), TicketStates.preview)
 async def ticket_confirm(call: CallbackQuery, state: FSMContext):
     logger.info(f"User {call.from_user.id} confirming ticket creation")
@@ -429,142 +368,24 @@ async def ticket_confirm(call: CallbackQuery, state: FSMContext):
         await call.answer("Пустой текст", show_alert=True)
         return
 
-    # 2) Создаём заявку
-    ticket = await create_ticket(call.from_user.id, text_body)
-
-    # 3) Профиль/адрес
-    profile = await get_user_by_tg(call.from_user.id)
-    address = ""
-    if profile:
-        address = f"{profile['street']}, д. {profile['house']}"
-        if profile.get("apartment"):
-            address += f", кв. {profile['apartment']}"
-
-    status_emoji = TicketStatus.emoji(ticket.status)
-
-    # Форматируем дату для всех нужд
-    created_at_str = (
-        ticket.created_at.strftime("%d.%m.%Y %H:%M") if ticket.created_at else "—"
-    )
-
-    # 4) Email уведомление инженеру — В ФОНЕ, чтобы не блокировать хендлер
-    # Никаких await тут, иначе снова будем висеть 30+ секунд на нерабочем SMTP.
-    asyncio.create_task(
-        send_ticket_email_notification(
-            ticket_id=ticket.id,
-            user_name=profile["name"] if profile else "—",
-            user_phone=profile["phone"] if profile and profile.get("phone") else "—",
-            address=address or "—",
-            text=ticket.text,
-            created_at=created_at_str,
-        )
-    )
-
-    # 5) Текст для уведомления в Telegram (форум)
-    notify_text = (
-        f"<b>Новая заявка №{ticket.id}</b>\n\n"
-        f"<blockquote><b>Заявитель:</b> {profile['name'] if profile else '—'}"
-        f"{' (@' + profile['username'] + ')' if profile and profile.get('username') else ''}\n"
-        f"<b>Телефон:</b> {profile['phone'] if profile and profile.get('phone') else '—'}\n"
-        f"<b>Адрес:</b> {address or '—'}\n"
-        f"<b>Создано:</b> {created_at_str}\n"
-        f"</blockquote>\n\n"
-        f"<b>Текст:</b>\n<blockquote>{ticket.text}</blockquote>\n\n"
-        f"Установить статус:\nОткрыта: /open\nВ работе: /work\nЗавершена: /done"
+    # 2) Заявка, вложения и задания outbox — одной транзакцией.
+    # Топик, вложения в нём, ЛС админам и email доставит фоновый
+    # outbox-воркер (с повторами, переживает рестарт), поэтому
+    # пользователь получает ответ сразу после коммита.
+    attachments = data.get("attachments", [])
+    outbox = [(TICKET_ADMIN_DM, {"admin_id": admin_id}) for admin_id in get_admin_ids()]
+    outbox.append((TICKET_EMAIL, {}))
+    if NOTIFICATION_CHANNEL_ID:
+        outbox.insert(0, (TICKET_TOPIC, {}))
+    ticket = await create_ticket_with_attachments(
+        call.from_user.id, text_body, attachments, outbox=outbox
     )
-
-    # 6) Текст для админов в ЛС
-    admin_notify_text = (
-        f"<b>Новая заявка №{ticket.id}</b>\n\n"
-        f"<blockquote><b>Заявитель:</b> {profile['name'] if profile else '—'}"
-        f"{' (@' + profile['username'] + ')' if profile and profile.get('username') else ''}\n"
-        f"<b>Телефон:</b> {profile['phone'] if profile and profile.get('phone') else '—'}\n"
-        f"<b>Адрес:</b> {address or '—'}\n"
-        f"<b>Создано:</b> {created_at_str}\n"
-        f"</blockquote>\n"
-        f"<b>Текст:</b>\n<blockquote>{ticket.text}</blockquote>\n\n"
+    logger.info(
+        f"Ticket #{ticket.id} created with {len(attachments)} attachments, "
+        f"{len(outbox)} notifications queued"
     )
 
-    # 7) Форум-топик
-    group_chat_id, thread_id = None, None
-    if NOTIFICATION_CHANNEL_ID:
-        try:
-            topic_title = f"{status_emoji} Заявка №{ticket.id}"
-            topic = await call.bot.create_forum_topic(
-                chat_id=NOTIFICATION_CHANNEL_ID,
-                name=topic_title,
-            )
-            group_chat_id, thread_id = NOTIFICATION_CHANNEL_ID, topic.message_thread_id
-            await set_ticket_thread(ticket.id, group_chat_id, thread_id)
-            await call.bot.send_message(
-                chat_id=group_chat_id,
-                message_thread_id=thread_id,
-                text=notify_text,
-                parse_mode="HTML",
-                reply_markup=status_panel_kb(ticket.id),
-            )
-            logger.info(f"Forum topic created for ticket #{ticket.id}")
-        except Exception as e:
-            logger.error(f"Failed to create forum topic for ticket #{ticket.id}: {e}")
-
-    # 8) Вложения
-    attachments = data.get("attachments", [])
-    if attachments:
-        logger.info(f"Processing {len(attachments)} attachments for ticket #{ticket.id}")
-
-    for a in attachments:
-        try:
-            await add_ticket_attachment(
-                ticket_id=ticket.id,
-                file_id=a["file_id"],
-                file_unique_id=a.get("file_unique_id"),
-                atype=a["type"],
-                caption=a.get("caption"),
-            )
-
-            # Отправляем вложение в топик, если он создан
-            if group_chat_id and thread_id:
-                send_kwargs = {
-                    "chat_id": group_chat_id,
-                    "message_thread_id": thread_id,
-                    "caption": a.get("caption"),
-                }
-
-                if a["type"] == AttachmentType.PHOTO:
-                    await call.bot.send_photo(photo=a["file_id"], **send_kwargs)
-                elif a["type"] == AttachmentType.VIDEO:
-                    await call.bot.send_video(video=a["file_id"], **send_kwargs)
-                elif a["type"] == AttachmentType.DOCUMENT:
-                    await call.bot.send_document(document=a["file_id"], **send_kwargs)
-                elif a["type"] == AttachmentType.AUDIO:
-                    await call.bot.send_audio(audio=a["file_id"], **send_kwargs)
-                elif a["type"] == AttachmentType.VOICE:
-                    await call.bot.send_voice(
-                        voice=a["file_id"],
-                        chat_id=group_chat_id,
-                        message_thread_id=thread_id,
-                    )
-
-        except Exception as e:
-            logger.error(f"Failed to process attachment for ticket #{ticket.id}: {e}")
-
-    # 9) Уведомления админам в ЛС
-    admin_ids = get_admin_ids()
-    if admin_ids:
-        logger.info(f"Sending notifications to {len(admin_ids)} admins")
-
-    for admin_id in admin_ids:
-        try:
-            await call.bot.send_message(
-                admin_id,
-                admin_notify_text,
-                parse_mode="HTML",
-                reply_markup=admin_open_button(call.from_user.id),
-            )
-        except Exception as e:
-            logger.error(f"Failed to notify admin {admin_id}: {e}")
-
-    # 10) Очистка и ответ пользователю в чате
+    # 3) Очистка и ответ пользователю в чате
     await clear_chat_history(call.bot, call.message.chat.id, state)
     await state.clear()
 
@@ -580,7 +401,7 @@ async def ticket_open_active(call: CallbackQuery, callback_data: cb):
     tid = int(callback_data.id)
     t = await get_ticket_by_id(tid)
 
-    if not t or t["status"] not in [TicketStatus.OPEN, TicketStatus.WORK]:
+    if not t or t.status not in [TicketStatus.OPEN, TicketStatus.WORK]:
         await replace_or_send_message(
             bot=call.bot,
             chat_id=call.message.chat.id,
@@ -600,11 +421,11 @@ async def ticket_open_active(call: CallbackQuery, callback_data: cb):
             address += f", кв. {profile['apartment']}"
 
     text = (
-        f"📂 <b>Активная заявка №{t['id']}</b>\n\n"
-        f"<b>Статус:</b> {t.get('status_label', TicketStatus.label(t['status']))}\n"
+        f"📂 <b>Активная заявка №{t.id}</b>\n\n"
+        f"<b>Статус:</b> {t.status_label}\n"
         f"<b>Адрес:</b> {address or '—'}\n"
-        f"<b>Создано:</b> {t['created_at'].strftime('%d.%m.%Y %H:%M') if t['created_at'] else '—'}\n\n"
-        f"<b>Текст:</b>\n{t['text']}"
+        f"<b>Создано:</b> {t.created_at.strftime('%d.%m.%Y %H:%M') if t.created_at else '—'}\n\n"
+        f"<b>Текст:</b>\n{t.text}"
     )
 
     await replace_or_send_message(
@@ -612,7 +433,7 @@ async def ticket_open_active(call: CallbackQuery, callback_data: cb):
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
         text=text,
-        reply_markup=kb.ticket_active_controls(t['id']),
+        reply_markup=kb.ticket_active_controls(t.id),
         parse_mode="HTML"
     )
     await call.answer()
@@ -638,45 +459,47 @@ async def ticket_cancel_active(call: CallbackQuery, callback_data: cb):
     # --- уведомления ---
     notify_text = f"🚫 <b>Заявка №{tid} отменена пользователем.</b>"
 
-    # 1) Пишем именно в ТОПИК, если он привязан
-    try:
-        ti = await get_ticket_thread_info(tid)  # (group_chat_id, thread_id) | None
-        if ti:
-            gchat, thread = ti
-            # Сообщение в ветке
-            await call.bot.send_message(
-                chat_id=gchat,
-                message_thread_id=thread,
-                text=notify_text,
-                parse_mode="HTML"
-            )
-            # Переименуем и закроем топик
-            await _rename_topic(call.bot, gchat, thread, tid, TicketStatus.CANCELLED)
-            try:
-                await call.bot.close_forum_topic(chat_id=gchat, message_thread_id=thread)
-            except Exception:
-                pass
-        else:
-            # если ветка не привязана — отправим хотя бы в корень (как было)
-            if NOTIFICATION_CHANNEL_ID:
-                await call.bot.send_message(NOTIFICATION_CHANNEL_ID, notify_text, parse_mode="HTML")
-    except Exception:
-        # не завалим пользовательский поток, просто проигнорируем
-        pass
-
-    # 2) Уведомление админам в ЛС (как было)
-    admin_ids = get_admin_ids()
-    for admin_id in admin_ids:
+    # Топик и ЛС админам — operational-полоса: не обгоняют ответы жителям
+    with send_lane(OPERATIONAL):
+        # 1) Пишем именно в ТОПИК, если он привязан
         try:
-            await call.bot.send_message(
-                admin_id,
-                notify_text,
-                parse_mode="HTML",
-                reply_markup=admin_open_button(call.from_user.id)
-            )
+            ti = await get_ticket_thread_info(tid)  # (group_chat_id, thread_id) | None
+            if ti:
+                gchat, thread = ti
+                # Сообщение в ветке
+                await call.bot.send_message(
+                    chat_id=gchat,
+                    message_thread_id=thread,
+                    text=notify_text,
+                    parse_mode="HTML"
+                )
+                # Переименуем и закроем топик
+                await _rename_topic(call.bot, gchat, thread, tid, TicketStatus.CANCELLED)
+                try:
+                    await call.bot.close_forum_topic(chat_id=gchat, message_thread_id=thread)
+                except Exception:
+                    pass
+            else:
+                # если ветка не привязана — отправим хотя бы в корень (как было)
+                if NOTIFICATION_CHANNEL_ID:
+                    await call.bot.send_message(NOTIFICATION_CHANNEL_ID, notify_text, parse_mode="HTML")
         except Exception:
+            # не завалим пользовательский поток, просто проигнорируем
             pass
 
+        # 2) Уведомление админам в ЛС (как было)
+        admin_ids = get_admin_ids()
+        for admin_id in admin_ids:
+            try:
+                await call.bot.send_message(
+                    admin_id,
+                    notify_text,
+                    parse_mode="HTML",
+                    reply_markup=admin_open_button(call.from_user.id)
+                )
+            except Exception:
+                pass
+
     # 3) Ответ пользователю
     await replace_or_send_message(
         bot=call.bot,
@@ -695,11 +518,7 @@ async def ticket_add_attachments(call: CallbackQuery, state: FSMContext):
     await state.set_state(TicketStates.attachments)
 
     data = await state.get_data()
-    await state.update_data(
-        attachments=data.get("attachments", []),
-        album={"id": None, "count": 0},
-        album_task_id=None
-    )
+    await state.update_data(attachments=data.get("attachments", []))
 
     count = len(data.get("attachments", []))
     text = (
@@ -756,8 +575,10 @@ async def user_history_list(call: CallbackQuery, callback_data: cb, state: FSMCo
     page = int(callback_data.page or 1)
     per_page = 5
 
-    items = await list_user_tickets(call.from_user.id, status=status, page=page, per_page=per_page)
-    total = await count_user_tickets(call.from_user.id, status=status)
+    result = await list_user_tickets(
+        call.from_user.id, status=status, cursor=callback_data.u, per_page=per_page
+    )
+    items = result["items"]
 
     text = (
         f"📋 Ваши заявки: «{TicketStatus.label(status)}»\nВыберите заявку ниже:"
@@ -770,7 +591,11 @@ async def user_history_list(call: CallbackQuery, callback_data: cb, state: FSMCo
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
         text=text,
-        reply_markup=kb.ticket_history_list_menu(items, status, page, total, per_page),
+        reply_markup=kb.ticket_history_list_menu(
+            items, status, page, result["total"], per_page,
+            next_cursor=result["next_cursor"], prev_cursor=result["prev_cursor"],
+            cursor=callback_data.u,
+        ),
         parse_mode="HTML",
     )
     await call.answer()
@@ -784,27 +609,29 @@ async def user_history_open(call: CallbackQuery, callback_data: cb, state: FSMCo
         return
 
     text = (
-        f"📂 <b>Заявка №{t['id']}</b>\n"
-        f"Статус: <b>{TicketStatus.label(t['status'])}</b>\n"
-        f"Адрес: {t['address'] or '—'}\n"
-        f"Создано: {t['created_at'].strftime('%d.%m.%Y %H:%M') if t['created_at'] else '—'}\n"
-        f"Обновлено: {t['updated_at'].strftime('%d.%m.%Y %H:%M') if t['updated_at'] else '—'}\n\n"
-        f"🗒 <b>Текст:</b>\n{t['text']}"
+        f"📂 <b>Заявка №{t.id}</b>\n"
+        f"Статус: <b>{t.status_label}</b>\n"
+        f"Адрес: {t.address or '—'}\n"
+        f"Создано: {t.created_at.strftime('%d.%m.%Y %H:%M') if t.created_at else '—'}\n"
+        f"Обновлено: {t.updated_at.strftime('%d.%m.%Y %H:%M') if t.updated_at else '—'}\n\n"
+        f"🗒 <b>Текст:</b>\n{t.text}"
     )
     await replace_or_send_message(
         bot=call.bot,
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
         text=text,
-        reply_markup=kb.ticket_history_detail_actions(t['id'], t['status']),
+        reply_markup=kb.ticket_history_detail_actions(
+            t.id, t.status, callback_data.status, callback_data.page, callback_data.u
+        ),
         parse_mode="HTML",
     )
     await call.answer()
 
 @ticket_router.callback_query(cb.filter(F.a == "uh_back"))
 async def user_history_back(call: CallbackQuery, callback_data: cb, state: FSMContext):
-    # возвращаемся к списку для того же статуса, страница 1
-    fake = cb(a="uh_list", id=0, status=callback_data.status, page=1)
+    # возвращаемся на ту же страницу списка (курсор u), с которой открыли заявку
+    fake = cb(a="uh_list", id=0, status=callback_data.status, page=callback_data.page or 1, u=callback_data.u)
     await user_history_list(call, fake, state)
 
 @ticket_router.callback_query(cb.filter(F.a == "uh_cancel"))
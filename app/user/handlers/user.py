@@ -7,7 +7,12 @@ from aiogram.fsm.state import StatesGroup, State
 from app.logger import logger  # noqa: F401
 import app.user.keyboards.user_kb as kb
 from app.user.keyboards.user_kb import cb
-from app.message_utils import replace_or_send_message
+from app.message_utils import (
+    replace_or_send_message,
+    media_item_from_message,
+    plan_media_batches,
+    send_media_batch,
+)
 from app.user.utils.profile import build_profile_text
 from app.helpers import clear_chat_history, save_msg
 from database.requests import (
@@ -102,8 +107,9 @@ async def cancel_reply(message: Message, state: FSMContext):
 
 
 # ==== Любое следующее сообщение пользователя: отправка в топик ====
-@start_router.message(ReplyToDispatcher.waiting_message)
-async def relay_user_message_to_topic(message: Message, state: FSMContext):
+# album — все части альбома разом (app/user/middlewares/album.py)
+@start_router.message(ReplyToDispatcher.waiting_message, flags={"album": True})
+async def relay_user_message_to_topic(message: Message, state: FSMContext, album: list[Message]):
     data = await state.get_data()
     ticket_id = data.get("ticket_id")
     group_chat_id = data.get("group_chat_id")
@@ -129,14 +135,20 @@ async def relay_user_message_to_topic(message: Message, state: FSMContext):
         # не фейлимся, попытаемся просто скопировать само сообщение
         pass
 
-    # Копируем исходное сообщение в топик
+    # Копируем исходное сообщение в топик; альбом — через sendMediaGroup
+    items = [media_item_from_message(m) for m in album]
     try:
-        await message.bot.copy_message(
-            chat_id=group_chat_id,
-            from_chat_id=message.chat.id,
-            message_id=message.message_id,
-            message_thread_id=thread_id
-        )
+        if len(album) > 1 and all(items):
+            for batch in plan_media_batches(items):
+                await send_media_batch(message.bot, group_chat_id, batch, message_thread_id=thread_id)
+        else:
+            for m in album:
+                await message.bot.copy_message(
+                    chat_id=group_chat_id,
+                    from_chat_id=m.chat.id,
+                    message_id=m.message_id,
+                    message_thread_id=thread_id
+                )
         await clear_chat_history(message.bot, message.chat.id, state)
         await message.answer("✅ Отправлено диспетчеру.", reply_markup=kb.back_to_main())
 
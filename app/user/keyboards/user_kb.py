@@ -8,6 +8,7 @@ from enum import Enum
 from typing import Optional
 from datetime import date
 from database.models import TicketStatus
+from database.read_models import TicketRow
 
 class UserCb(CallbackData, prefix="u"):
     a: str
@@ -64,26 +65,47 @@ def ticket_history_filter_menu() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
 
-def ticket_history_list_menu(items: list[dict], status: TicketStatus, page: int, total: int, per_page: int) -> InlineKeyboardMarkup:
+def _pack_with_cursor(data: UserCb) -> str:
+    """callback_data с курсором (u); не влезает в 64 байта — без него (список откроется с начала)."""
+    try:
+        return data.pack()
+    except ValueError:
+        return data.model_copy(update={"u": None}).pack()
+
+
+def ticket_history_list_menu(
+    items: list[TicketRow],
+    status: TicketStatus,
+    page: int,
+    total: int,
+    per_page: int,
+    next_cursor: str | None = None,
+    prev_cursor: str | None = None,
+    cursor: str | None = None,
+) -> InlineKeyboardMarkup:
+    """cursor — курсор текущей страницы: с ним «Назад» из заявки вернёт на неё же."""
     rows = []
     for it in items:
-        created = it["created_at"].strftime("%d.%m %H:%M") if it.get("created_at") else "—"
+        created = it.created_at.strftime("%d.%m %H:%M") if it.created_at else "—"
         rows.append([InlineKeyboardButton(
-            text=f"№{it['id']} • {created}",
-            callback_data=cb(a="uh_open", id=it["id"], status=_status_val_to_str(status), page=page).pack()
+            text=f"№{it.id} • {created}",
+            callback_data=_pack_with_cursor(
+                cb(a="uh_open", id=it.id, status=_status_val_to_str(status), page=page, u=cursor)
+            )
         )])
 
+    # Навигация по курсору (u), номер страницы — только для подписи
     pages = max(1, (total + per_page - 1) // per_page)
     nav = []
-    if page > 1:
+    if prev_cursor:
         nav.append(InlineKeyboardButton(
             text="« Назад",
-            callback_data=cb(a="uh_list", id=0, status=_status_val_to_str(status), page=page - 1).pack()
+            callback_data=cb(a="uh_list", id=0, status=_status_val_to_str(status), page=max(1, page - 1), u=prev_cursor).pack()
         ))
-    if page < pages:
+    if next_cursor:
         nav.append(InlineKeyboardButton(
-            text="Вперёд »",
-            callback_data=cb(a="uh_list", id=0, status=_status_val_to_str(status), page=page + 1).pack()
+            text=f"Вперёд » ({min(page + 1, pages)}/{pages})",
+            callback_data=cb(a="uh_list", id=0, status=_status_val_to_str(status), page=page + 1, u=next_cursor).pack()
         ))
     if nav:
         rows.append(nav)
@@ -95,7 +117,14 @@ def ticket_history_list_menu(items: list[dict], status: TicketStatus, page: int,
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def ticket_history_detail_actions(tid: int, status: TicketStatus) -> InlineKeyboardMarkup:
+def ticket_history_detail_actions(
+    tid: int,
+    status: TicketStatus,
+    list_status: str | None = None,
+    page: int | None = None,
+    cursor: str | None = None,
+) -> InlineKeyboardMarkup:
+    """list_status/page/cursor — страница списка, с которой открыли заявку."""
     rows = []
     if status in (TicketStatus.OPEN, TicketStatus.WORK):
         rows.append([InlineKeyboardButton(text="✍️ Ответить диспетчеру", callback_data=f"user_reply:{tid}")])
@@ -105,7 +134,9 @@ def ticket_history_detail_actions(tid: int, status: TicketStatus) -> InlineKeybo
                     ])
     rows.append([InlineKeyboardButton(
         text="⬅️ Назад",
-        callback_data=cb(a="uh_back", id=0, status=_status_val_to_str(status), page=1).pack()
+        callback_data=_pack_with_cursor(cb(
+            a="uh_back", id=0, status=list_status or _status_val_to_str(status), page=page or 1, u=cursor
+        ))
     )])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
@@ -0,0 +1,129 @@
+# app/user/middlewares/album.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from config.settings import ALBUM_LATENCY_MS
+
+# Больше 10 файлов Telegram в один альбом не кладёт — дальше не ждём
+_ALBUM_MAX = 10
+
+
+class _Album:
+    __slots__ = ("messages", "deadline", "full")
+
+    def __init__(self, first: Message, deadline: float):
+        self.messages: List[Message] = [first]
+        self.deadline = deadline
+        self.full = asyncio.Event()
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Склейка альбомов для хендлеров с флагом album:
+        @router.message(..., flags={"album": True})
+        async def handler(msg: Message, album: list[Message], ...)
+
+    Части одного media_group_id копятся в памяти, пока новые приходят
+    чаще, чем раз в ALBUM_LATENCY_MS (или пока не наберётся 10); хендлер
+    вызывается один раз — на первой части, album — все части по порядку.
+    Остальные части до хендлера не доходят. Одиночное сообщение
+    приходит как album=[msg].
+
+    Вызовы хендлера в одном чате идут строго по очереди, поэтому
+    read-modify-write FSM в хендлере не гоняется с соседним альбомом.
+    wait_for_album(chat_id) — дождаться, пока всё, что уже пришло
+    в чат, будет обработано.
+    """
+
+    def __init__(self, latency_ms: int = ALBUM_LATENCY_MS):
+        super().__init__()
+        self.latency = max(0, latency_ms) / 1000
+        self._albums: Dict[Tuple[int, str], _Album] = {}
+        # Последний поставленный в очередь вызов хендлера в каждом чате
+        self._tails: Dict[int, asyncio.Future] = {}
+
+        # Метрики
+        self.albums = 0
+        self.merged = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not get_flag(data, "album"):
+            return await handler(event, data)
+
+        chat_id = event.chat.id
+        gid = event.media_group_id
+        loop = asyncio.get_running_loop()
+
+        if gid:
+            album = self._albums.get((chat_id, gid))
+            if album is not None:
+                # Часть уже собираемого альбома — отдаём первой части
+                album.messages.append(event)
+                album.deadline = loop.time() + self.latency
+                self.merged += 1
+                if len(album.messages) >= _ALBUM_MAX:
+                    album.full.set()
+                return None
+
+        done = loop.create_future()
+        prev = self._tails.get(chat_id)
+        self._tails[chat_id] = done
+        try:
+            if gid:
+                album = self._albums[(chat_id, gid)] = _Album(event, loop.time() + self.latency)
+                try:
+                    while (delay := album.deadline - loop.time()) > 0 and not album.full.is_set():
+                        try:
+                            await asyncio.wait_for(album.full.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._albums.pop((chat_id, gid), None)
+                self.albums += 1
+                messages = sorted(album.messages, key=lambda m: m.message_id)
+            else:
+                messages = [event]
+
+            if prev is not None and not prev.done():
+                await asyncio.shield(prev)
+
+            data["album"] = messages
+            return await handler(messages[0], data)
+        finally:
+            if not done.done():
+                done.set_result(None)
+            if self._tails.get(chat_id) is done:
+                del self._tails[chat_id]
+
+    def wait(self, chat_id: int) -> Awaitable[None]:
+        """Future, который завершится, когда обработаны все уже пришедшие в чат альбомы."""
+        tail: Optional[asyncio.Future] = self._tails.get(chat_id)
+        if tail is None or tail.done():
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_result(None)
+            return fut
+        # shield: отмена ожидающего не должна отменять очередь чата
+        return asyncio.shield(tail)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_albums": len(self._albums),
+            "busy_chats": len(self._tails),
+            "albums": self.albums,
+            "merged": self.merged,
+        }
+
+
+album_middleware = AlbumMiddleware()
+wait_for_album = album_middleware.wait
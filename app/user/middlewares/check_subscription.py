@@ -5,7 +5,6 @@ from aiogram import BaseMiddleware, Router, F
 from aiogram.types import (
     Message,
     CallbackQuery,
-    ChatMember,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
 )
@@ -13,6 +12,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest
 
 from database.requests import get_or_create_user
+from app.services.membership import membership_cache
 import app.user.keyboards.user_kb as kb
 from app.user.utils.profile import build_profile_text
 from config.settings import REQUIRED_CHANNELS
@@ -23,10 +23,6 @@ check_router = Router(name="check_router")
 WHITELIST_CB = {"check_subs"}
 
 
-def _is_subscribed(m: ChatMember) -> bool:
-    return m.status not in ("left", "kicked")
-
-
 class SubscriptionMiddleware(BaseMiddleware):
     """
     Проверяет подписку пользователя на каналы/чаты из REQUIRED_CHANNELS.
@@ -59,17 +55,13 @@ class SubscriptionMiddleware(BaseMiddleware):
         bot = data["bot"]
         user_id = event.from_user.id
 
-        # 🔒 Проверяем подписку для ЛЮБОГО апдейта (включая /start)
-        for ch in self.channels:
-            try:
-                member = await bot.get_chat_member(ch, user_id)
-                if not _is_subscribed(member):
-                    await self._prompt_subscribe(event, ch, data)
-                    return
-            except Exception:
-                # нет прав/канал приватный/ошибка — считаем неподписанным
-                await self._prompt_subscribe(event, ch, data)
-                return
+        # 🔒 Проверяем подписку для ЛЮБОГО апдейта (включая /start).
+        # Статусы кешируются (membership_cache), каналы проверяются параллельно;
+        # нет прав/канал приватный/ошибка — считаем неподписанным
+        missing = await membership_cache.first_missing(bot, self.channels, user_id)
+        if missing is not None:
+            await self._prompt_subscribe(event, missing, data)
+            return
 
         # ✅ Подписан — пропускаем к хендлеру
         return await handler(event, data)
@@ -124,14 +116,14 @@ class SubscriptionMiddleware(BaseMiddleware):
 
 @check_router.callback_query(F.data == "check_subs")
 async def check_subscriptions(call: CallbackQuery, state: FSMContext):
-    # Повторная проверка подписки
+    # Повторная проверка подписки — мимо кеша, результат обновляет кеш
     for ch in (REQUIRED_CHANNELS if not isinstance(REQUIRED_CHANNELS, str) else (REQUIRED_CHANNELS,)):
         try:
-            m = await call.bot.get_chat_member(ch, call.from_user.id)
-            if m.status == "left":
+            status = await membership_cache.status(call.bot, ch, call.from_user.id, refresh=True)
+            if status == "left":
                 await call.answer("❌ Вы всё ещё не подписаны!", show_alert=True)
                 return
-            if m.status == "kicked":
+            if status == "kicked":
                 await call.answer("❌ Вы были исключены из канала!", show_alert=True)
                 return
         except Exception:
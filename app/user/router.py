@@ -1,7 +1,10 @@
 # app/user/router.py
 from aiogram import Router
 from app.user.middlewares.check_subscription import SubscriptionMiddleware
+from app.user.middlewares.album import album_middleware
 
 user_router = Router(name="user_router")
 user_router.message.middleware(SubscriptionMiddleware())
 user_router.callback_query.middleware(SubscriptionMiddleware())
+# После проверки подписки: склейка альбомов для хендлеров с flags={"album": True}
+user_router.message.middleware(album_middleware)
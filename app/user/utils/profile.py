@@ -1,13 +1,15 @@
-from database.requests import get_user_by_tg, check_month_meters, count_user_tickets_grouped
+from database.requests import get_cabinet_snapshot
 
 MONTHS_RU = ["", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
              "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"]
 
 
 async def build_profile_text(user_id: int) -> str:
-    user_info = await get_user_by_tg(user_id)
-    if not user_info:
+    # Профиль, показания и счётчики заявок — одной сессией
+    snapshot = await get_cabinet_snapshot(user_id)
+    if not snapshot:
         return "⛔ Профиль не найден."
+    user_info = snapshot["profile"]
 
     # --- Адрес ---
     addr = "—"
@@ -22,7 +24,7 @@ async def build_profile_text(user_id: int) -> str:
         addr = ", ".join(parts)
 
     # --- Показания за текущий месяц (ГВС) ---
-    meters = await check_month_meters(user_id)
+    meters = snapshot["meters"]
     period = meters.get("period") or {}
     month = period.get("month", 0)
     year = period.get("year", "—")
@@ -59,7 +61,7 @@ async def build_profile_text(user_id: int) -> str:
         hot_info = "❌ Показания за текущий месяц ещё не переданы."
 
     # --- Статистика заявок ---
-    counters = await count_user_tickets_grouped(user_id)
+    counters = snapshot["tickets"]
     open_cnt = counters.get("OPEN", 0)
     work_cnt = counters.get("WORK", 0)
     done_cnt = counters.get("CANCELLED", 0)
@@ -0,0 +1,80 @@
+# app/utils/export.py
+from __future__ import annotations
+
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Sequence, Union
+
+Rows = Union[AsyncIterable[Any], Iterable[Any]]
+
+
+async def aiter_rows(rows: Rows) -> AsyncIterator[Any]:
+    """Единый async-итератор и для генераторов из БД, и для обычных списков."""
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def write_xlsx_stream(
+    filepath: str,
+    title: str,
+    headers: Sequence[str],
+    rows: AsyncIterable[Sequence[Any]],
+    width_sample: int = 200,
+    max_width: int = 50,
+) -> int:
+    """
+    Потоковая запись XLSX (openpyxl write_only): строки сразу уходят
+    на диск, в памяти остаётся только первая порция для расчёта ширины
+    столбцов (в write_only её нужно задать до первой строки).
+
+    Возвращает количество записанных строк данных.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title)
+
+    it = rows.__aiter__()
+    sample: list[Sequence[Any]] = []
+    exhausted = False
+    while len(sample) < width_sample:
+        try:
+            sample.append(await it.__anext__())
+        except StopAsyncIteration:
+            exhausted = True
+            break
+
+    widths = [len(str(h)) for h in headers]
+    for row in sample:
+        for i, value in enumerate(row):
+            if value is not None and len(str(value)) > widths[i]:
+                widths[i] = len(str(value))
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(width + 2, max_width)
+
+    header_cells = []
+    for h in headers:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for row in sample:
+        ws.append(list(row))
+        count += 1
+    sample.clear()
+
+    if not exhausted:
+        async for row in it:
+            ws.append(list(row))
+            count += 1
+
+    wb.save(filepath)
+    return count
@@ -0,0 +1,133 @@
+# app/webhook.py
+from __future__ import annotations
+
+import asyncio
+import secrets
+import signal
+from contextlib import suppress
+from typing import Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+
+from app.logger import logger
+from config.settings import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_DRAIN_TIMEOUT_S,
+)
+
+
+def webhook_configured() -> bool:
+    return bool(WEBHOOK_BASE_URL)
+
+
+class _WebhookHandler:
+    """
+    POST от Telegram: проверка секрета, ответ 200 сразу, апдейт — в
+    фоновую задачу. Задачи держим сами, чтобы при остановке дождаться их.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret: str):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not secrets.compare_digest(token, self.secret):
+            logger.warning(f"[webhook] Запрос с неверным секретом от {request.remote}")
+            return web.Response(status=401, text="Unauthorized")
+        try:
+            update = await request.json()
+        except ValueError as e:  # json.JSONDecodeError — подкласс ValueError
+            # 500 заставил бы Telegram слать тот же апдейт снова и снова
+            logger.warning(f"[webhook] Некорректное тело запроса: {e}")
+            return web.Response(status=400, text="Bad Request")
+        if not isinstance(update, dict):
+            logger.warning(f"[webhook] Тело запроса не объект JSON: {type(update).__name__}")
+            return web.Response(status=400, text="Bad Request")
+        task = asyncio.create_task(self._feed(update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response()
+
+    async def _feed(self, update: dict) -> None:
+        try:
+            result = await self.dp.feed_raw_update(self.bot, update)
+            if isinstance(result, TelegramMethod):
+                await self.dp.silent_call_request(self.bot, result)
+        except Exception as e:
+            logger.exception(f"[webhook] Ошибка обработки апдейта {update.get('update_id')}: {e}")
+
+    async def drain(self, timeout: float) -> None:
+        """Дождаться апдейтов, которые уже приняты и обрабатываются в фоне."""
+        pending = set(self.tasks)
+        if not pending:
+            return
+        logger.info(f"[webhook] Ожидаем обработку {len(pending)} апдейтов...")
+        done, left = await asyncio.wait(pending, timeout=timeout)
+        if left:
+            logger.warning(f"[webhook] Не дождались {len(left)} апдейтов за {timeout:.0f} с — отменяем")
+            for task in left:
+                task.cancel()
+            await asyncio.gather(*left, return_exceptions=True)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Приём апдейтов через webhook: aiohttp-сервер на WEBHOOK_HOST:WEBHOOK_PORT,
+    Telegram шлёт POST на WEBHOOK_BASE_URL + WEBHOOK_PATH с секретом в
+    X-Telegram-Bot-Api-Secret-Token. Ответ 200 уходит сразу, апдейт
+    обрабатывается в фоне.
+
+    SIGTERM/SIGINT: перестаём принимать соединения, дожидаемся уже
+    принятых апдейтов (до WEBHOOK_DRAIN_TIMEOUT_S), затем выходим.
+    Сессию бота закрывает run.py — после остановки фоновых задач.
+    Webhook у Telegram не снимаем — пока бот перезапускается, апдейты
+    копятся на стороне Telegram и будут доставлены повторно.
+    """
+    secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    handler = _WebhookHandler(dp, bot, secret)
+    app = web.Application()
+    app.router.add_route("POST", WEBHOOK_PATH, handler.handle)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    allowed_updates = dp.resolve_used_update_types()
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await site.start()
+        await bot.set_webhook(
+            url=f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=secret,
+            allowed_updates=allowed_updates,
+        )
+        logger.info(
+            f"[webhook] Слушаем {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}, "
+            f"апдейты: {', '.join(allowed_updates)}"
+        )
+        await stop.wait()
+        logger.info("[webhook] Остановка...")
+    finally:
+        await site.stop()
+        await handler.drain(WEBHOOK_DRAIN_TIMEOUT_S)
+        await runner.cleanup()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+        await dp.emit_shutdown(bot=bot, **workflow_data)
@@ -49,6 +49,65 @@ DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
 # URL для sqlite+aiosqlite
 DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
+# Размер LRU-кеша telegram_id -> пользователь (database/cache.py)
+USER_CACHE_MAX_SIZE = config("USER_CACHE_MAX_SIZE", cast=int, default=5000)
+
+# Профиль SQLite-движка (database/models.py)
+DB_ECHO = config("DB_ECHO", cast=bool, default=False)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", cast=bool, default=False)
+DB_POOL_CLASS = config("DB_POOL_CLASS", default="queue").lower()  # queue | null
+DB_POOL_SIZE = config("DB_POOL_SIZE", cast=int, default=5)
+DB_POOL_MAX_OVERFLOW = config("DB_POOL_MAX_OVERFLOW", cast=int, default=10)
+DB_READ_POOL_SIZE = config("DB_READ_POOL_SIZE", cast=int, default=5)  # @connection(readonly=True)
+# PRAGMA, применяемые к каждому новому соединению; пустое значение — не трогать
+DB_JOURNAL_MODE = config("DB_JOURNAL_MODE", default="WAL")
+DB_SYNCHRONOUS = config("DB_SYNCHRONOUS", default="NORMAL")
+DB_CACHE_SIZE = config("DB_CACHE_SIZE", default="-16000")        # <0 — в КиБ (16 МиБ)
+DB_MMAP_SIZE = config("DB_MMAP_SIZE", default="134217728")       # 128 МиБ
+DB_BUSY_TIMEOUT_MS = config("DB_BUSY_TIMEOUT_MS", default="5000")
+DB_TEMP_STORE = config("DB_TEMP_STORE", default="MEMORY")
+
+# Хранилище FSM: sqlite (app/storage/sqlite.py, переживает рестарт) или memory
+FSM_STORAGE = config("FSM_STORAGE", default="sqlite").strip().lower()
+FSM_TTL_S = config("FSM_TTL_S", cast=float, default=7 * 86400.0)     # незавершённый диалог живёт неделю
+FSM_FLUSH_DELAY_MS = config("FSM_FLUSH_DELAY_MS", cast=int, default=50)  # склейка записей; 0 — писать сразу
+FSM_CACHE_MAX_SIZE = config("FSM_CACHE_MAX_SIZE", cast=int, default=10000)  # 0 — читать из БД каждый раз (несколько процессов)
+# FSM_STORAGE=memory (app/storage/memory.py): лимиты хранилища в памяти
+FSM_MEMORY_MAX_KEYS = config("FSM_MEMORY_MAX_KEYS", cast=int, default=20000)
+FSM_MEMORY_IDLE_TTL_S = config("FSM_MEMORY_IDLE_TTL_S", cast=float, default=86400.0)  # сутки без обращений
+FSM_DATA_MAX_ITEMS = config("FSM_DATA_MAX_ITEMS", cast=int, default=2000)  # ключи + элементы списков на один ключ
+
+# Размер порции при потоковой выгрузке (export_queries / get_meter)
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", cast=int, default=1000)
+
+# Метрики БД и лог медленных запросов (database/metrics.py)
+DB_METRICS_ENABLED = config("DB_METRICS_ENABLED", cast=bool, default=True)
+DB_SLOW_QUERY_MS = config("DB_SLOW_QUERY_MS", cast=float, default=200.0)
+
+# Outbox уведомлений о заявках (app/services/outbox.py)
+OUTBOX_WORKERS = config("OUTBOX_WORKERS", cast=int, default=4)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", cast=int, default=8)
+OUTBOX_RETRY_BASE_S = config("OUTBOX_RETRY_BASE_S", cast=float, default=5.0)     # 5, 10, 20, 40 ... с
+OUTBOX_RETRY_MAX_S = config("OUTBOX_RETRY_MAX_S", cast=float, default=1800.0)
+OUTBOX_POLL_S = config("OUTBOX_POLL_S", cast=float, default=30.0)
+
+# Лимиты отправки сообщений (app/middlewares/send_scheduler.py)
+SEND_GLOBAL_PER_SEC = config("SEND_GLOBAL_PER_SEC", cast=float, default=25.0)   # лимит Telegram ~30/с
+SEND_PRIVATE_PER_SEC = config("SEND_PRIVATE_PER_SEC", cast=float, default=1.0)
+SEND_PRIVATE_BURST = config("SEND_PRIVATE_BURST", cast=float, default=3.0)  # подряд без паузы (ответ + меню)
+SEND_GROUP_PER_MIN = config("SEND_GROUP_PER_MIN", cast=float, default=20.0)
+SEND_MAX_RETRY_AFTER = config("SEND_MAX_RETRY_AFTER", cast=int, default=3)
+# Веса полос приоритета при общем лимите: interactive / operational / bulk
+SEND_WEIGHT_INTERACTIVE = config("SEND_WEIGHT_INTERACTIVE", cast=int, default=8)
+SEND_WEIGHT_OPERATIONAL = config("SEND_WEIGHT_OPERATIONAL", cast=int, default=3)
+SEND_WEIGHT_BULK = config("SEND_WEIGHT_BULK", cast=int, default=1)
+
+# Рассылка напоминаний о показаниях (app/tasks/meter_reminder.py)
+REMIND_CONCURRENCY = config("REMIND_CONCURRENCY", cast=int, default=8)      # одновременных отправок
+REMIND_PAGE_SIZE = config("REMIND_PAGE_SIZE", cast=int, default=500)        # получателей за запрос к БД
+REMIND_MAX_ATTEMPTS = config("REMIND_MAX_ATTEMPTS", cast=int, default=3)    # для failed при повторных запусках
+REMIND_FLUSH_EVERY = config("REMIND_FLUSH_EVERY", cast=int, default=50)     # результатов на запись в журнал
+
 METER_REMIND_DAYS: list[int] = _parse_days_csv(config("METER_REMIND_DAYS", "25"))
 
 # Время напоминания (по Иркутску)
@@ -60,9 +119,29 @@ REQUIRED_CHANNELS: Tuple[Union[str, int], ...] = tuple(
     ch for ch in (_coerce_channel(x) for x in _raw_channels) if ch is not None
 )
 
+# Кеш проверки подписки на REQUIRED_CHANNELS (app/services/membership.py)
+SUBS_CACHE_TTL_S = config("SUBS_CACHE_TTL_S", cast=float, default=300.0)            # подписан
+SUBS_CACHE_NEGATIVE_TTL_S = config("SUBS_CACHE_NEGATIVE_TTL_S", cast=float, default=10.0)  # не подписан
+SUBS_CACHE_MAX_SIZE = config("SUBS_CACHE_MAX_SIZE", cast=int, default=20000)
+# Сверка индекса channel_members с Telegram (пропущенные апдейты chat_member)
+CHANNEL_RECONCILE_INTERVAL_S = config("CHANNEL_RECONCILE_INTERVAL_S", cast=float, default=21600.0)  # 6 ч
+CHANNEL_RECONCILE_PER_SEC = config("CHANNEL_RECONCILE_PER_SEC", cast=float, default=5.0)  # get_chat_member в секунду
+
+# Склейка альбомов вложений заявки (app/user/middlewares/album.py)
+ALBUM_LATENCY_MS = config("ALBUM_LATENCY_MS", cast=int, default=500)  # пауза после последней части альбома
+
 # Телеграм Бот
 BOT_TOKEN = config('BOT_TOKEN')
 
+# Получение апдейтов: polling (по умолчанию) или webhook (app/webhook.py)
+BOT_MODE = config("BOT_MODE", default="polling").strip().lower()
+WEBHOOK_BASE_URL = config("WEBHOOK_BASE_URL", default="").rstrip("/")  # https://bot.example.ru — без него webhook не включится
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/webhook")
+WEBHOOK_SECRET = config("WEBHOOK_SECRET", default="")  # пусто — случайный при каждом старте
+WEBHOOK_HOST = config("WEBHOOK_HOST", default="0.0.0.0")
+WEBHOOK_PORT = config("WEBHOOK_PORT", cast=int, default=8000)  # проброшен в docker-compose
+WEBHOOK_DRAIN_TIMEOUT_S = config("WEBHOOK_DRAIN_TIMEOUT_S", cast=float, default=30.0)
+
 DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
 # ID администраторов
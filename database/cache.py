@@ -0,0 +1,133 @@
+# database/cache.py
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class UserIdentityCache:
+    """
+    Процессный LRU-кеш telegram_id -> краткая карточка пользователя
+    (users.id + небольшие поля профиля).
+
+    Позволяет функциям из database/requests.py не делать отдельный
+    SELECT users ... WHERE telegram_id = ? перед основным запросом.
+    Инвалидируется после коммита в get_or_create_user / update_user_profile.
+
+    Читатель, промахнувшийся мимо кеша, берёт generation() до SELECT и
+    передаёт его в put(): если за время запроса ключ инвалидировали
+    (коммит изменил профиль), устаревшая карточка в кеш не попадёт.
+    """
+
+    def __init__(self, max_size: int = 5000):
+        self.max_size = max(1, int(max_size))
+        self._items: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Поколение ключа: номер последней инвалидации. Давно
+        # инвалидированные ключи забываются, их поколение — _gen_floor
+        self._gen: "OrderedDict[int, int]" = OrderedDict()
+        self._gen_counter = 0
+        self._gen_floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_puts = 0
+
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        item = self._items.get(telegram_id)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(telegram_id)
+        self.hits += 1
+        return item
+
+    def generation(self, telegram_id: int) -> int:
+        return self._gen.get(telegram_id, self._gen_floor)
+
+    def put(self, telegram_id: int, card: Dict[str, Any], generation: Optional[int] = None) -> None:
+        """generation — значение generation() до чтения карточки из БД."""
+        if generation is not None and generation != self.generation(telegram_id):
+            self.stale_puts += 1
+            return
+        self._items[telegram_id] = card
+        self._items.move_to_end(telegram_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._items.pop(telegram_id, None)
+        self._gen_counter += 1
+        self._gen.pop(telegram_id, None)
+        self._gen[telegram_id] = self._gen_counter
+        if len(self._gen) > self.max_size:
+            # Забытый ключ получает поколение не меньше своего последнего,
+            # поэтому начатое до инвалидации чтение всё равно не запишется
+            for _ in range(len(self._gen) // 2):
+                _, gen = self._gen.popitem(last=False)
+                self._gen_floor = max(self._gen_floor, gen)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "stale_puts": self.stale_puts,
+        }
+
+
+class TicketThreadMap:
+    """
+    In-memory индекс топиков форума: (group_chat_id, thread_id) ->
+    {id, status, user_tg_id}. Заполняется при старте (load_ticket_threads)
+    и обновляется после коммита в set_ticket_thread / set_ticket_status,
+    чтобы пересылка сообщений диспетчера не ходила в БД.
+    """
+
+    def __init__(self):
+        self._by_thread: Dict[tuple[int, int], Dict[str, Any]] = {}
+        self._by_ticket: Dict[int, tuple[int, int]] = {}
+        self.loaded = False
+
+    def load(self, rows) -> None:
+        self._by_thread.clear()
+        self._by_ticket.clear()
+        for ticket_id, status, group_chat_id, thread_id, user_tg_id in rows:
+            self.set_thread(ticket_id, group_chat_id, thread_id, status, user_tg_id)
+        self.loaded = True
+
+    def get(self, group_chat_id: int, thread_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_thread.get((int(group_chat_id), int(thread_id)))
+
+    def set_thread(
+        self,
+        ticket_id: int,
+        group_chat_id: int,
+        thread_id: int,
+        status: Any,
+        user_tg_id: Optional[int],
+    ) -> None:
+        old_key = self._by_ticket.pop(ticket_id, None)
+        if old_key:
+            self._by_thread.pop(old_key, None)
+        key = (int(group_chat_id), int(thread_id))
+        self._by_thread[key] = {
+            "id": ticket_id,
+            "status": status,
+            "group_chat_id": key[0],
+            "thread_id": key[1],
+            "user_tg_id": user_tg_id,
+        }
+        self._by_ticket[ticket_id] = key
+
+    def set_status(self, ticket_id: int, status: Any) -> None:
+        key = self._by_ticket.get(ticket_id)
+        if key and key in self._by_thread:
+            self._by_thread[key]["status"] = status
+
+    def __len__(self) -> int:
+        return len(self._by_thread)
@@ -1,13 +1,36 @@
 # database/export_queries.py
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta
-from typing import Literal
-
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import selectinload
-
-from database.models import Ticket, User, MeterReading, TicketStatus, async_session
+from datetime import date
+from typing import AsyncIterator, Literal
+
+from sqlalchemy import select, and_
+
+from database.models import Ticket, User, MeterReading, read_session
+from database.read_models import (
+    TICKET_COLUMNS,
+    TICKET_USER_COLUMNS,
+    METER_EXPORT_COLUMNS,
+    TicketRow,
+    MeterRow,
+    export_address,
+)
+from database.periods import month_range, period_range, in_date_range, in_datetime_range
+from config.settings import EXPORT_CHUNK_SIZE
+
+
+def _tickets_export_query(period, month, year, date_from, date_to):
+    query = (
+        select(*TICKET_COLUMNS, *TICKET_USER_COLUMNS)
+        .join(User, Ticket.user_id == User.id)
+        .order_by(Ticket.created_at.desc())
+    )
+
+    # Применяем фильтры по периоду (полуинтервал дат, без функций над колонкой)
+    rng = period_range(period, month=month, year=year, date_from=date_from, date_to=date_to)
+    if rng:
+        query = query.where(in_datetime_range(Ticket.created_at, rng))
+    return query
 
 
 async def get_tickets_for_export(
@@ -16,7 +39,7 @@ async def get_tickets_for_export(
     year: int | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-) -> list[dict]:
+) -> list[TicketRow]:
     """
     Получение заявок для экспорта с фильтрами по периоду.
     
@@ -28,77 +51,37 @@ async def get_tickets_for_export(
         date_to: Конечная дата (для custom)
         
     Returns:
-        Список словарей с данными заявок
+        Список TicketRow (address — в формате выгрузки)
     """
-    async with async_session() as session:
-        query = (
-            select(Ticket, User)
-            .join(User, Ticket.user_id == User.id)
-            .order_by(Ticket.created_at.desc())
-        )
-
-        today = date.today()
-
-        # Применяем фильтры по периоду
-        if period == "today":
-            query = query.where(func.date(Ticket.created_at) == today)
-
-        elif period == "week":
-            week_start = today - timedelta(days=today.weekday())
-            query = query.where(func.date(Ticket.created_at) >= week_start)
-
-        elif period == "month":
-            month_start = today.replace(day=1)
-            query = query.where(func.date(Ticket.created_at) >= month_start)
+    return [
+        row
+        async for row in stream_tickets_for_export(period, month, year, date_from, date_to)
+    ]
 
-        elif period == "select_month" and month and year:
-            query = query.where(
-                and_(
-                    func.extract("month", Ticket.created_at) == month,
-                    func.extract("year", Ticket.created_at) == year
-                )
-            )
-
-        elif period == "custom" and date_from and date_to:
-            query = query.where(
-                and_(
-                    func.date(Ticket.created_at) >= date_from,
-                    func.date(Ticket.created_at) <= date_to
-                )
-            )
 
-        result = await session.execute(query)
-        rows = result.all()
-
-        tickets = []
-        for ticket, user in rows:
-            # Формируем адрес
-            address_parts = []
-            if user.street:
-                address_parts.append(user.street)
-            if user.house:
-                address_parts.append(f"д. {user.house}")
-            if user.apartment:
-                address_parts.append(f"кв. {user.apartment}")
-            address = ", ".join(address_parts) if address_parts else "—"
-
-            tickets.append({
-                "id": ticket.id,
-                "created_at": ticket.created_at,
-                "address": address,
-                "phone": user.phone or "—",
-                "text": ticket.text or "—",
-                "status": TicketStatus.label(ticket.status),
-                "user_name": user.name or "—",
-            })
-
-        return tickets
+async def stream_tickets_for_export(
+    period: Literal["today", "week", "month", "all", "select_month", "custom"],
+    month: int | None = None,
+    year: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[TicketRow]:
+    """
+    Потоковый вариант get_tickets_for_export: строки читаются порциями
+    по chunk_size, в памяти не больше одной порции.
+    """
+    query = _tickets_export_query(period, month, year, date_from, date_to)
+    async with read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        async for row in result:
+            yield TicketRow.from_row(row, address_fmt=export_address)
 
 
 async def get_cold_water_readings_for_export(
     month: int | None = None,
     year: int | None = None,
-) -> list[dict]:
+) -> list[MeterRow]:
     """
     Получение показаний холодной воды для экспорта.
     
@@ -107,50 +90,25 @@ async def get_cold_water_readings_for_export(
         year: Год (по умолчанию - текущий)
         
     Returns:
-        Список словарей с данными показаний
+        Список MeterRow
     """
     if month is None:
         month = date.today().month
     if year is None:
         year = date.today().year
 
-    async with async_session() as session:
+    async with read_session() as session:
         query = (
-            select(MeterReading, User)
+            select(*METER_EXPORT_COLUMNS)
             .join(User, MeterReading.user_id == User.id)
             .where(
                 and_(
                     MeterReading.meter_type == "cold",
-                    func.extract("month", MeterReading.reading_date) == month,
-                    func.extract("year", MeterReading.reading_date) == year
+                    in_date_range(MeterReading.reading_date, month_range(month, year)),
                 )
             )
             .order_by(User.name, MeterReading.reading_date)
         )
 
         result = await session.execute(query)
-        rows = result.all()
-
-        readings = []
-        for reading, user in rows:
-            # Формируем адрес
-            address_parts = []
-            if user.street:
-                address_parts.append(user.street)
-            if user.house:
-                address_parts.append(f"д. {user.house}")
-            if user.apartment:
-                address_parts.append(f"кв. {user.apartment}")
-            address = ", ".join(address_parts) if address_parts else "—"
-
-            readings.append({
-                "id": reading.id,
-                "user_name": user.name or "—",
-                "address": address,
-                "phone": user.phone or "—",
-                "value": reading.value,
-                "reading_date": reading.reading_date,
-                "created_at": reading.created_at,
-            })
-
-        return readings
\ No newline at end of file
+        return [MeterRow.from_row(row) for row in result.all()]
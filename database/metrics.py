@@ -0,0 +1,216 @@
+# database/metrics.py
+from __future__ import annotations
+
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+from app.logger import logger
+from config.settings import DB_METRICS_ENABLED, DB_SLOW_QUERY_MS
+
+# Границы корзин гистограммы, мс (последняя корзина — всё, что больше)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Имя @connection-функции, внутри которой сейчас выполняются запросы
+current_db_function: ContextVar[Optional[str]] = ContextVar("current_db_function", default=None)
+
+slow_logger = logger.getChild("slow_query")
+
+_WS_RE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами (мс)."""
+
+    __slots__ = ("buckets", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": {
+                (f"<={b}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                for i, b in enumerate(BUCKETS_MS + (BUCKETS_MS[-1],))
+                if (n := self.buckets[i])
+            },
+        }
+
+
+class _FunctionStats:
+    __slots__ = ("latency", "session", "errors")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()   # полное время вызова
+        self.session = LatencyHistogram()   # открытие сессии -> commit
+        self.errors = 0
+
+
+class _StatementStats:
+    __slots__ = ("latency", "rows", "functions")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.functions: set[str] = set()
+
+
+def _normalize(statement: str, limit: int = 300) -> str:
+    s = _WS_RE.sub(" ", statement).strip()
+    return s if len(s) <= limit else s[:limit] + "…"
+
+
+class DbMetrics:
+    """
+    Процессные метрики БД: задержки @connection-функций и отдельных
+    SQL-выражений (через before/after_cursor_execute), число строк,
+    лог медленных запросов с EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, slow_query_ms: float = 200.0, enabled: bool = True):
+        self.slow_query_ms = slow_query_ms
+        self.enabled = enabled
+        self.functions: Dict[str, _FunctionStats] = {}
+        self.statements: Dict[str, _StatementStats] = {}
+        self.slow_queries = 0
+        self.started_at = time.time()
+
+    # ---- @connection ----
+    def record_call(self, name: str, total_ms: float, session_ms: Optional[float], ok: bool) -> None:
+        if not self.enabled:
+            return
+        st = self.functions.get(name)
+        if st is None:
+            st = self.functions[name] = _FunctionStats()
+        st.latency.observe(total_ms)
+        if session_ms is not None:
+            st.session.observe(session_ms)
+        if not ok:
+            st.errors += 1
+
+    # ---- SQLAlchemy events ----
+    def install(self, sync_engine) -> None:
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled:
+            return
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        ms = (time.perf_counter() - starts.pop()) * 1000
+
+        # Адаптер aiosqlite выбирает результат целиком сразу после execute,
+        # поэтому для SELECT число строк видно здесь же; для DML — rowcount.
+        rows = getattr(cursor, "_rows", None)
+        nrows = len(rows) if rows else max(getattr(cursor, "rowcount", 0) or 0, 0)
+
+        key = _normalize(statement)
+        st = self.statements.get(key)
+        if st is None:
+            st = self.statements[key] = _StatementStats()
+        st.latency.observe(ms)
+        st.rows += nrows
+        fn = current_db_function.get()
+        if fn:
+            st.functions.add(fn)
+
+        if ms >= self.slow_query_ms:
+            self.slow_queries += 1
+            self._log_slow(conn, statement, parameters, executemany, ms, nrows, fn)
+
+    def _log_slow(self, conn, statement, parameters, executemany, ms, nrows, fn) -> None:
+        plan = ""
+        if not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            try:
+                # Через сырой DBAPI-курсор: события SQLAlchemy не срабатывают,
+                # рекурсии в after_cursor_execute нет.
+                cur = conn.connection.cursor()
+                try:
+                    cur.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+                    plan = "\n".join(f"    {r[-1]}" for r in cur.fetchall())
+                finally:
+                    cur.close()
+            except Exception as e:
+                plan = f"    (EXPLAIN QUERY PLAN failed: {e})"
+        slow_logger.warning(
+            "Slow query %.1f ms, rows=%s, fn=%s\n  %s\n  params=%r\n%s",
+            ms, nrows, fn or "-", _normalize(statement, 2000), parameters, plan,
+        )
+
+    # ---- чтение ----
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "functions": {
+                name: {
+                    "latency": st.latency.snapshot(),
+                    "session": st.session.snapshot(),
+                    "errors": st.errors,
+                }
+                for name, st in sorted(
+                    self.functions.items(), key=lambda kv: kv[1].latency.total_ms, reverse=True
+                )
+            },
+            "statements": [
+                {
+                    "sql": sql,
+                    "rows": st.rows,
+                    "functions": sorted(st.functions),
+                    **st.latency.snapshot(),
+                }
+                for sql, st in sorted(
+                    self.statements.items(), key=lambda kv: kv[1].latency.total_ms, reverse=True
+                )
+            ],
+        }
+
+    def reset(self) -> None:
+        self.functions.clear()
+        self.statements.clear()
+        self.slow_queries = 0
+        self.started_at = time.time()
+
+
+db_metrics = DbMetrics(slow_query_ms=DB_SLOW_QUERY_MS, enabled=DB_METRICS_ENABLED)
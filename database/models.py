@@ -1,28 +1,98 @@
-import sqlite3
 from enum import Enum
 from typing import Optional, List
 from sqlalchemy import (
-    event, BigInteger, Integer, String, ForeignKey, Date, DateTime, UniqueConstraint, Text
+    event, BigInteger, Integer, String, ForeignKey, Date, DateTime, UniqueConstraint, Text, Index, LargeBinary
 )
 from sqlalchemy import Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, relationship
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.sql import func
-from sqlalchemy.engine import Engine
-from config.settings import DATABASE_URL
+from database.metrics import db_metrics
+from config.settings import (
+    DATABASE_URL,
+    DB_ECHO,
+    DB_POOL_PRE_PING,
+    DB_POOL_CLASS,
+    DB_POOL_SIZE,
+    DB_POOL_MAX_OVERFLOW,
+    DB_READ_POOL_SIZE,
+    DB_JOURNAL_MODE,
+    DB_SYNCHRONOUS,
+    DB_CACHE_SIZE,
+    DB_MMAP_SIZE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_TEMP_STORE,
+)
+
+
+def _engine_options(pool_size: int = DB_POOL_SIZE) -> dict:
+    """Параметры пула из DB_POOL_CLASS / DB_POOL_SIZE."""
+    opts = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_POOL_CLASS == "null":
+        # Новое соединение на каждую сессию (PRAGMA выполняются каждый раз)
+        opts["poolclass"] = NullPool
+    else:
+        opts["pool_size"] = pool_size
+        opts["max_overflow"] = DB_POOL_MAX_OVERFLOW
+    return opts
+
 
 # Движок и сессии
-engine = create_async_engine(DATABASE_URL, echo=True, pool_pre_ping=True)
+engine = create_async_engine(DATABASE_URL, **_engine_options())
 async_session = async_sessionmaker(engine, expire_on_commit=False)
+db_metrics.install(engine.sync_engine)
 
-# SQLite: включить внешние ключи
-@event.listens_for(Engine, "connect")
-def _set_sqlite_pragma(dbapi_connection, connection_record):
-    if isinstance(dbapi_connection, sqlite3.Connection):
-        cur = dbapi_connection.cursor()
-        cur.execute("PRAGMA foreign_keys=ON")
+# Отдельный пул для @connection(readonly=True): соединения с query_only,
+# без BEGIN/COMMIT и без ROLLBACK при возврате в пул
+read_engine = create_async_engine(
+    DATABASE_URL,
+    pool_reset_on_return=None,
+    **_engine_options(DB_READ_POOL_SIZE),
+)
+read_session = async_sessionmaker(read_engine, expire_on_commit=False, autoflush=False)
+db_metrics.install(read_engine.sync_engine)
+
+# Порядок важен: busy_timeout до journal_mode, чтобы смена режима
+# подождала чужую блокировку, а не упала с "database is locked".
+_SQLITE_PRAGMAS = (
+    ("foreign_keys", "ON"),
+    ("busy_timeout", DB_BUSY_TIMEOUT_MS),
+    ("journal_mode", DB_JOURNAL_MODE),
+    ("synchronous", DB_SYNCHRONOUS),
+    ("cache_size", DB_CACHE_SIZE),
+    ("mmap_size", DB_MMAP_SIZE),
+    ("temp_store", DB_TEMP_STORE),
+)
+
+
+# SQLite: внешние ключи + профиль из настроек.
+# Слушаем именно sync_engine: соединение здесь — адаптер aiosqlite,
+# а не sqlite3.Connection, поэтому проверка isinstance не подходит.
+def _apply_pragmas(dbapi_connection, pragmas) -> None:
+    cur = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            value = str(value).strip()
+            if value:
+                cur.execute(f"PRAGMA {name}={value}")
+    finally:
         cur.close()
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, _SQLITE_PRAGMAS)
+
+
+@event.listens_for(read_engine.sync_engine, "connect")
+def _set_sqlite_read_pragma(dbapi_connection, connection_record):
+    # journal_mode задаёт основной движок (WAL хранится в самом файле БД)
+    _apply_pragmas(
+        dbapi_connection,
+        [p for p in _SQLITE_PRAGMAS if p[0] != "journal_mode"] + [("query_only", "ON")],
+    )
+
 class Base(AsyncAttrs, DeclarativeBase):
     pass
 
@@ -91,6 +161,15 @@ class User(Base):
 # Заявки
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Списки заявок по статусу и выгрузки за период
+        Index("ix_tickets_status_created_at", "status", "created_at"),
+        Index("ix_tickets_created_at", "created_at"),
+        # Заявки пользователя по статусу (история, счётчики)
+        Index("ix_tickets_user_status_created_at", "user_id", "status", "created_at"),
+        # Топик форума однозначно указывает на заявку
+        Index("ux_tickets_group_thread", "group_chat_id", "thread_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -135,6 +214,12 @@ class TicketAttachment(Base):
 
 class MeterReading(Base):
     __tablename__ = "meter_readings"
+    __table_args__ = (
+        # Показания пользователя за месяц (кабинет, счётчики, напоминания)
+        Index("ix_meter_readings_user_type_date", "user_id", "meter_type", "reading_date"),
+        # Выгрузки по типу за период
+        Index("ix_meter_readings_type_date", "meter_type", "reading_date"),
+    )
 
     id = mapped_column(Integer, primary_key=True, index=True)
     user_id = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -147,4 +232,96 @@ class MeterReading(Base):
     user = relationship("User", back_populates="meter_readings")
 
     def __repr__(self):
-        return f"<MeterReading(user={self.user_id}, type={self.meter_type}, meter_number={self.meter_number}, value={self.value})>"
\ No newline at end of file
+        return f"<MeterReading(user={self.user_id}, type={self.meter_type}, meter_number={self.meter_number}, value={self.value})>"
+
+
+class MeterSubmission(Base):
+    """
+    Сводка «кто что передал за месяц» поверх meter_readings.
+    Пишется в save_meter_reading в той же транзакции; бит N-1 в
+    meters_bitmap — передан счётчик №N.
+    """
+    __tablename__ = "meter_submissions"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period_yyyymm: Mapped[int] = mapped_column(Integer, primary_key=True)  # 202510
+    meter_type: Mapped[str] = mapped_column(String(10), primary_key=True)  # 'hot' / 'cold'
+    meters_bitmap: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_submitted_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class FsmRecord(Base):
+    """Состояние FSM пользователя (app/storage/sqlite.py): state + сериализованные data."""
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    data: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class ChannelMember(Base):
+    """
+    Индекс подписчиков каналов из REQUIRED_CHANNELS: обновляется по
+    апдейтам chat_member и результатам get_chat_member.
+    """
+    __tablename__ = "channel_members"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)  # telegram_id
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class BotBlockedChat(Base):
+    """Жители, заблокировавшие бота: рассылки их пропускают до следующего /start."""
+    __tablename__ = "bot_blocked_chats"
+
+    telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    blocked_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ReminderRun(Base):
+    """Запуск рассылки напоминаний за месяц; finished_at IS NULL — прерван, будет продолжен."""
+    __tablename__ = "reminder_runs"
+
+    period_yyyymm: Mapped[int] = mapped_column(Integer, primary_key=True)
+    started_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    sent: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    blocked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ReminderDelivery(Base):
+    """Журнал доставки напоминаний за месяц: sent / blocked / failed."""
+    __tablename__ = "reminder_deliveries"
+
+    period_yyyymm: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class OutboxMessage(Base):
+    """
+    Отложенные побочные эффекты (топик форума, вложения, ЛС админам,
+    email). Пишутся в той же транзакции, что и заявка, и доставляются
+    фоновым воркером (app/services/outbox.py) с повторами.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Выборка готовых к отправке
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")  # pending / processing / failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,69 @@
+# database/periods.py
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, literal
+
+# Полуинтервал дат [start, end)
+DateRange = Tuple[date, date]
+
+
+def month_range(month: int, year: int) -> DateRange:
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year: int) -> DateRange:
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def period_range(
+    period: str,
+    month: int | None = None,
+    year: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    today: date | None = None,
+) -> Optional[DateRange]:
+    """
+    Перевести период из выгрузок в полуинтервал [start, end).
+
+    Поддерживаются: today, week, month / current_month, year,
+    select_month (month + year), custom (date_from..date_to включительно).
+    Для "all" и неполных параметров возвращает None — без фильтра.
+    """
+    today = today or date.today()
+
+    if period == "today":
+        return today, today + timedelta(days=1)
+    if period == "week":
+        week_start = today - timedelta(days=today.weekday())
+        return week_start, week_start + timedelta(days=7)
+    if period in ("month", "current_month"):
+        return month_range(today.month, today.year)
+    if period == "year":
+        return year_range(today.year)
+    if period == "select_month" and month and year:
+        return month_range(month, year)
+    if period == "custom" and date_from and date_to:
+        return date_from, date_to + timedelta(days=1)
+    return None
+
+
+def in_date_range(column, rng: DateRange):
+    """Условие для Date-колонки, которое SQLite может обслужить индексом."""
+    start, end = rng
+    return and_(column >= start, column < end)
+
+
+def in_datetime_range(column, rng: DateRange):
+    """
+    Условие для DateTime-колонки. В SQLite дата/время хранится строкой
+    'YYYY-MM-DD HH:MM:SS[.ffffff]', поэтому границы передаём строками
+    'YYYY-MM-DD' — сравнение остаётся точным и использует индекс.
+    """
+    start, end = rng
+    return and_(column >= literal(start.isoformat()), column < literal(end.isoformat()))
@@ -0,0 +1,156 @@
+# database/read_models.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+import pytz
+
+from database.models import Ticket, User, MeterReading, TicketStatus
+
+# ========= Время в Иркутске =========
+# С 2014-10-26 02:00 (местного) Иркутск живёт по UTC+8 без перехода на
+# летнее время, поэтому для всех актуальных дат смещение — константа и
+# pytz (localize + astimezone + strftime) на каждую строку не нужен.
+# Более ранние даты по-прежнему считаются через pytz.
+IRKUTSK_TZ = pytz.timezone("Asia/Irkutsk")
+_IRKT_OFFSET = timedelta(hours=8)
+_IRKT_FIXED_SINCE = datetime(2014, 10, 25, 18, 0)  # UTC
+
+
+def fmt_irkt(dt: Optional[datetime]) -> Optional[str]:
+    """UTC (naive = UTC) -> 'ДД.ММ.ГГГГ ЧЧ:ММ' по Иркутску."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    if dt >= _IRKT_FIXED_SINCE:
+        loc = dt + _IRKT_OFFSET
+    else:
+        loc = pytz.utc.localize(dt).astimezone(IRKUTSK_TZ)
+    return f"{loc.day:02d}.{loc.month:02d}.{loc.year:04d} {loc.hour:02d}:{loc.minute:02d}"
+
+
+def format_address(street: Optional[str], house: Optional[str], apartment: Optional[str]) -> str:
+    """Адрес для карточки заявки: 'Улица, д. N[, кв. M]'."""
+    address = f"{street or ''}, д. {house or ''}"
+    if apartment:
+        address += f", кв. {apartment}"
+    return address
+
+
+def export_address(street: Optional[str], house: Optional[str], apartment: Optional[str]) -> str:
+    """Адрес для выгрузок: 'Улица, д. N, кв. M' (пустые части пропускаются) или '—'."""
+    parts = []
+    if street:
+        parts.append(street)
+    if house:
+        parts.append(f"д. {house}")
+    if apartment:
+        parts.append(f"кв. {apartment}")
+    return ", ".join(parts) if parts else "—"
+
+
+# ========= Колонки =========
+# Выбираем только нужные колонки: без identity map, отслеживания
+# изменений и загрузки связей, как при select(Ticket, User).
+TICKET_COLUMNS = (
+    Ticket.id,
+    Ticket.user_id,
+    Ticket.text,
+    Ticket.status,
+    Ticket.created_at,
+    Ticket.updated_at,
+)
+
+TICKET_USER_COLUMNS = (
+    User.name.label("user_name"),
+    User.telegram_id.label("user_telegram_id"),
+    User.username,
+    User.phone,
+    User.street,
+    User.house,
+    User.apartment,
+)
+
+METER_EXPORT_COLUMNS = (
+    MeterReading.id,
+    MeterReading.meter_number,
+    MeterReading.value,
+    MeterReading.reading_date,
+    MeterReading.created_at,
+    User.name,
+    User.phone,
+    User.street,
+    User.house,
+    User.apartment,
+)
+
+
+@dataclass(slots=True)
+class TicketRow:
+    id: int
+    user_id: int
+    text: str
+    status: TicketStatus
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    created_at_local: Optional[str]
+    updated_at_local: Optional[str]
+    user_name: Optional[str] = None
+    user_telegram_id: Optional[int] = None
+    username: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+
+    @property
+    def status_label(self) -> str:
+        return TicketStatus.label(self.status)
+
+    @classmethod
+    def from_row(cls, row: Any, address_fmt: Callable[..., str] = format_address) -> "TicketRow":
+        """Строка select(*TICKET_COLUMNS[, *TICKET_USER_COLUMNS])."""
+        m = row._mapping
+        with_user = "user_name" in m
+        return cls(
+            m["id"],
+            m["user_id"],
+            m["text"],
+            m["status"],
+            m["created_at"],
+            m["updated_at"],
+            fmt_irkt(m["created_at"]),
+            fmt_irkt(m["updated_at"]),
+            m["user_name"] if with_user else None,
+            m["user_telegram_id"] if with_user else None,
+            m["username"] if with_user else None,
+            m["phone"] if with_user else None,
+            address_fmt(m["street"], m["house"], m["apartment"]) if with_user else None,
+        )
+
+
+@dataclass(slots=True)
+class MeterRow:
+    id: int
+    meter_number: Optional[int]
+    value: Any
+    reading_date: Optional[date]
+    created_at: Optional[datetime]
+    name: Optional[str]
+    phone: Optional[str]
+    street: Optional[str]
+    house: Optional[str]
+    apartment: Optional[str]
+
+    @property
+    def address(self) -> str:
+        return export_address(self.street, self.house, self.apartment)
+
+    @classmethod
+    def from_row(cls, row: Any) -> "MeterRow":
+        """Строка select(*METER_EXPORT_COLUMNS)."""
+        return cls(*row)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
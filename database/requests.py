@@ -1,15 +1,32 @@
 from __future__ import annotations
 
-from typing import Callable, Awaitable, Any, Optional, Dict, List, Tuple
-from datetime import date, datetime
+from typing import AsyncIterator, Callable, Awaitable, Any, Optional, Dict, List, Tuple
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
 from functools import wraps
+import asyncio
+import json
+import time
 
 import pytz
-from sqlalchemy import select, exists, extract, func, and_, distinct
+from sqlalchemy import select, insert, update, delete, exists, func, and_, distinct, case, literal, tuple_, type_coerce, Integer, String
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database.cache import UserIdentityCache, TicketThreadMap
+from database.metrics import db_metrics, current_db_function
+from database.periods import month_range, period_range, in_date_range
+from database.read_models import (
+    TICKET_COLUMNS,
+    TICKET_USER_COLUMNS,
+    METER_EXPORT_COLUMNS,
+    TicketRow,
+    MeterRow,
+    fmt_irkt,
+)
 from database.models import (
     async_session,
+    read_session,
     Admin,
     User,
     Ticket,
@@ -17,8 +34,17 @@ from database.models import (
     TicketAttachment,
     AttachmentType,
     MeterReading,
+    MeterSubmission,
+    OutboxMessage,
+    FsmRecord,
+    ChannelMember,
+    BotBlockedChat,
+    ReminderRun,
+    ReminderDelivery,
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.logger import logger
+from config.settings import USER_CACHE_MAX_SIZE, EXPORT_CHUNK_SIZE
 
 
 # ========= Таймзона =========
@@ -26,43 +52,329 @@ IRKUTSK_TZ = pytz.timezone("Asia/Irkutsk")
 UTC = pytz.utc
 
 
-def _to_irkt(dt: Optional[datetime]) -> Optional[datetime]:
-    """Перевести datetime из UTC (или naive=UTC) в Asia/Irkutsk."""
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        dt = UTC.localize(dt)
-    return dt.astimezone(IRKUTSK_TZ)
-
-
 def _irkt_now() -> datetime:
     """Текущее время в Иркутске (aware)."""
     return datetime.now(UTC).astimezone(IRKUTSK_TZ)
 
 
-def _fmt_irkt(dt: Optional[datetime]) -> Optional[str]:
-    """Человекочитаемая строка в Иркутске."""
-    loc = _to_irkt(dt)
-    return loc.strftime("%d.%m.%Y %H:%M") if loc else None
+# ========= Декоратор подключения к БД =========
+def _after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Выполнить callback только после успешного коммита сессии."""
+    session.info.setdefault("after_commit", []).append(callback)
 
 
-# ========= Декоратор подключения к БД =========
-def connection(func: Callable[..., Awaitable[Any]]):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        async with async_session() as session:
+def _run_after_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            logger.exception("after_commit callback failed: %s", e)
+
+
+# ========= Сессия на апдейт =========
+class _SessionScope:
+    """
+    Одна AsyncSession на весь апдейт (см. app/middlewares/db_session.py).
+    Сессия создаётся лениво — при первом вызове @connection-функции.
+    Каждая пишущая функция коммитится сразу по выходу (вложенные — вместе
+    с внешней): блокировка записи SQLite не держится, пока хендлер ждёт
+    Telegram. Общими остаются соединение и сессия.
+    """
+
+    __slots__ = ("session", "task", "closed", "started", "depth")
+
+    def __init__(self):
+        self.session: Optional[AsyncSession] = None
+        # Фоновые задачи (asyncio.create_task) наследуют contextvar,
+        # но в сессию апдейта входить не должны
+        self.task = asyncio.current_task()
+        self.closed = False
+        self.started = 0.0
+        # Глубина вложенных пишущих вызовов: коммит — на выходе из внешнего
+        self.depth = 0
+
+    def joinable(self) -> bool:
+        return not self.closed and asyncio.current_task() is self.task
+
+    def get_session(self) -> AsyncSession:
+        if self.session is None:
+            self.session = async_session()
+            self.started = time.perf_counter()
+        return self.session
+
+    async def close(self, commit: bool) -> None:
+        self.closed = True
+        session = self.session
+        if session is None:
+            return
+        failed = False
+        try:
+            if commit:
+                await session.commit()
+                _run_after_commit(session)
+            else:
+                await session.rollback()
+        except Exception as e:
+            failed = True
+            logger.exception("DB error on update session commit: %s", e)
+            await session.rollback()
+            raise
+        finally:
+            session.info.pop("after_commit", None)
+            await session.close()
+            ms = (time.perf_counter() - self.started) * 1000
+            db_metrics.record_call("<update session>", ms, None if failed else ms, not failed)
+
+
+_db_scope: ContextVar[Optional[_SessionScope]] = ContextVar("db_scope", default=None)
+
+
+@asynccontextmanager
+async def db_session_scope():
+    """Все @connection-вызовы внутри блока (в той же задаче) идут в одну сессию."""
+    scope = _SessionScope()
+    token = _db_scope.set(scope)
+    ok = False
+    try:
+        yield scope
+        ok = True
+    finally:
+        _db_scope.reset(token)
+        await scope.close(commit=ok)
+
+
+async def _in_write_transaction(session: AsyncSession) -> bool:
+    """
+    Открыта ли в SQLite транзакция с изменениями. pysqlite начинает её
+    только перед DML, а SAVEPOINT вне транзакции сам становится транзакцией
+    и коммитится на RELEASE — поэтому savepoint берём только внутри неё.
+    """
+    conn = await session.connection()
+    raw = conn.sync_connection.connection.dbapi_connection
+    raw = getattr(raw, "_connection", raw)
+    return bool(getattr(raw, "in_transaction", False))
+
+
+async def _rollback_keep_loaded(session: AsyncSession) -> None:
+    """
+    Откат в сессии апдейта. Всё, что вернули прошлые вызовы, уже
+    закоммичено; rollback() пометил бы эти объекты устаревшими, и чтение
+    атрибута в хендлере пошло бы в БД вне greenlet — поэтому сначала
+    отвязываем их от сессии.
+    """
+    session.expunge_all()
+    await session.rollback()
+
+
+async def _call_in_scope(scope: _SessionScope, func, name: str, args, kwargs, readonly: bool = False):
+    session = scope.get_session()
+    hooks = session.info.setdefault("after_commit", [])
+    mark = len(hooks)
+    token = current_db_function.set(name)
+    started = time.perf_counter()
+    ok = False
+    try:
+        if readonly:
+            result = await func(session, *args, **kwargs)
+            ok = True
+            return result
+
+        nested = await session.begin_nested() if await _in_write_transaction(session) else None
+        scope.depth += 1
+        try:
+            result = await func(session, *args, **kwargs)
+            await session.flush()
+            if nested is not None:
+                await nested.commit()
+        except Exception as e:
+            # Откатываем только изменения этого вызова
+            if nested is not None:
+                await nested.rollback()
+            else:
+                await _rollback_keep_loaded(session)
+            del hooks[mark:]
+            logger.exception("DB error in %s: %s", name, e)
+            raise
+        finally:
+            scope.depth -= 1
+
+        if scope.depth == 0:
+            # Граница записи: коммит до того, как хендлер пойдёт в Telegram
             try:
-                result = await func(session, *args, **kwargs)
                 await session.commit()
-                return result
             except Exception as e:
-                await session.rollback()
-                logger.exception("DB error in %s: %s", func.__name__, e)
+                await _rollback_keep_loaded(session)
+                session.info.pop("after_commit", None)
+                logger.exception("DB error on commit in %s: %s", name, e)
                 raise
+            _run_after_commit(session)
+        ok = True
+        return result
+    finally:
+        current_db_function.reset(token)
+        ms = (time.perf_counter() - started) * 1000
+        db_metrics.record_call(name, ms, ms if ok else None, ok)
+
+
+async def _call_readonly(func, name: str, args, kwargs):
+    """Чтение через read_session: без транзакции, коммита и блокировки записи."""
+    token = current_db_function.set(name)
+    started = time.perf_counter()
+    ok = False
+    try:
+        async with read_session() as session:
+            result = await func(session, *args, **kwargs)
+            ok = True
+            return result
+    except Exception as e:
+        logger.exception("DB error in %s: %s", name, e)
+        raise
+    finally:
+        current_db_function.reset(token)
+        ms = (time.perf_counter() - started) * 1000
+        db_metrics.record_call(name, ms, None, ok)
+
+
+def connection(func: Callable[..., Awaitable[Any]] | None = None, *, readonly: bool = False):
+    """
+    @connection — функция получает AsyncSession, коммит после выполнения.
+    @connection(readonly=True) — только чтение: отдельный пул с
+    PRAGMA query_only, без BEGIN/COMMIT. Внутри апдейта, где сессия уже
+    открыта, читает из неё.
+    """
+    if func is None:
+        return lambda f: connection(f, readonly=readonly)
+
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        scope = _db_scope.get()
+        if scope is not None and scope.joinable():
+            if not readonly:
+                return await _call_in_scope(scope, func, name, args, kwargs)
+            if scope.session is not None:
+                return await _call_in_scope(scope, func, name, args, kwargs, readonly=True)
+
+        if readonly:
+            return await _call_readonly(func, name, args, kwargs)
+
+        token = current_db_function.set(name)
+        started = time.perf_counter()
+        session_ms = None
+        ok = False
+        try:
+            async with async_session() as session:
+                try:
+                    result = await func(session, *args, **kwargs)
+                    await session.commit()
+                    session_ms = (time.perf_counter() - started) * 1000
+                    ok = True
+                    _run_after_commit(session)
+                    return result
+                except Exception as e:
+                    await session.rollback()
+                    session.info.pop("after_commit", None)
+                    logger.exception("DB error in %s: %s", name, e)
+                    raise
+        finally:
+            current_db_function.reset(token)
+            db_metrics.record_call(name, (time.perf_counter() - started) * 1000, session_ms, ok)
 
     return wrapper
 
 
+def get_db_stats() -> Dict[str, Any]:
+    """Снимок метрик БД и кешей (для логов/админки)."""
+    stats = db_metrics.snapshot()
+    stats["user_cache"] = user_cache.stats()
+    stats["ticket_threads"] = len(ticket_threads)
+    return stats
+
+
+def dump_db_stats(top: int = 15) -> None:
+    """Вывести в лог сводку по самым «дорогим» функциям и запросам."""
+    stats = get_db_stats()
+    lines = [
+        f"DB stats: uptime={stats['uptime_s']}s, slow_queries={stats['slow_queries']} "
+        f"(>= {stats['slow_query_ms']} ms), user_cache={stats['user_cache']}"
+    ]
+    lines.append("  functions (total / calls / avg / p95 / session p95 / errors):")
+    for name, st in list(stats["functions"].items())[:top]:
+        lat, ses = st["latency"], st["session"]
+        lines.append(
+            f"    {name}: {lat['total_ms']} ms / {lat['count']} / {lat['avg_ms']} / "
+            f"{lat['p95_ms']} / {ses['p95_ms']} / {st['errors']}"
+        )
+    lines.append("  statements (total / calls / avg / p95 / rows):")
+    for st in stats["statements"][:top]:
+        lines.append(
+            f"    {st['total_ms']} ms / {st['count']} / {st['avg_ms']} / {st['p95_ms']} / "
+            f"{st['rows']}  {st['sql'][:160]}"
+        )
+    logger.info("\n".join(lines))
+
+
+# ========= Кеш пользователей (telegram_id -> users.id + профиль) =========
+user_cache = UserIdentityCache(USER_CACHE_MAX_SIZE)
+
+# ========= Индекс топиков форума (thread -> заявка) =========
+ticket_threads = TicketThreadMap()
+
+
+def _user_card(user: Any) -> Dict[str, Any]:
+    """Краткая карточка пользователя для кеша (User или Row с теми же полями)."""
+    return {
+        "id": user.id,
+        "name": user.name,
+        "phone": user.phone,
+        "street": user.street,
+        "house": user.house,
+        "apartment": user.apartment,
+        "username": user.username,
+        "status": user.status,
+    }
+
+
+async def _get_user_card(session: AsyncSession, telegram_id: int) -> Optional[Dict[str, Any]]:
+    """Карточка пользователя: сначала из кеша, иначе один SELECT по users."""
+    card = user_cache.get(telegram_id)
+    if card is not None:
+        return card
+
+    # До SELECT: коммит профиля во время запроса не даст закешировать старое
+    generation = user_cache.generation(telegram_id)
+    row = (
+        await session.execute(
+            select(
+                User.id,
+                User.name,
+                User.phone,
+                User.street,
+                User.house,
+                User.apartment,
+                User.username,
+                User.status,
+            ).where(User.telegram_id == telegram_id)
+        )
+    ).one_or_none()
+    if not row:
+        return None
+
+    card = _user_card(row)
+    user_cache.put(telegram_id, card, generation)
+    return card
+
+
+async def _get_user_id(session: AsyncSession, telegram_id: int) -> Optional[int]:
+    card = await _get_user_card(session, telegram_id)
+    return card["id"] if card else None
+
+
+def _invalidate_user(session: AsyncSession, telegram_id: int) -> None:
+    _after_commit(session, lambda: user_cache.invalidate(telegram_id))
+
+
 # ========= Пользователи =========
 @connection
 async def get_or_create_user(
@@ -79,6 +391,15 @@ async def get_or_create_user(
         if username and user.username != username:
             user.username = username
             session.add(user)
+            _invalidate_user(session, telegram_id)
+        # /start после блокировки — снова получатель рассылок. Строка есть
+        # почти никогда: сначала SELECT, чтобы обычный /start не брал
+        # блокировку записи SQLite
+        blocked = await session.scalar(
+            select(BotBlockedChat.telegram_id).where(BotBlockedChat.telegram_id == telegram_id)
+        )
+        if blocked is not None:
+            await session.execute(delete(BotBlockedChat).where(BotBlockedChat.telegram_id == telegram_id))
         return user
 
     user = User(
@@ -93,6 +414,7 @@ async def get_or_create_user(
     )
     session.add(user)
     await session.flush()
+    _invalidate_user(session, telegram_id)
     return user
 
 
@@ -126,38 +448,25 @@ async def update_user_profile(
         user.apartment = apartment.strip() if apartment else None
 
     session.add(user)
+    _invalidate_user(session, telegram_id)
     return user
 
 
-@connection
+@connection(readonly=True)
 async def get_user_by_tg(session: AsyncSession, telegram_id: int) -> Optional[Dict[str, Any]]:
     """Получить информацию о пользователе в виде словаря."""
-    q = select(User).where(User.telegram_id == telegram_id)
-    user: User | None = (await session.execute(q)).scalar_one_or_none()
-
-    if not user:
-        return None
-
-    return {
-        "id": user.id,
-        "name": user.name,
-        "phone": user.phone,
-        "street": user.street,
-        "house": user.house,
-        "apartment": user.apartment,
-        "username": user.username,
-        "status": user.status,
-    }
+    card = await _get_user_card(session, telegram_id)
+    return dict(card) if card else None
 
 
-@connection
+@connection(readonly=True)
 async def get_user_row_by_tg(session: AsyncSession, telegram_id: int) -> Optional[User]:
     q = select(User).where(User.telegram_id == telegram_id)
     return (await session.execute(q)).scalar_one_or_none()
 
 
 # ========= Показания счётчиков (НОВАЯ МОДЕЛЬ MeterReading) =========
-@connection
+@connection(readonly=True)
 async def get_meter_history_by_month(
     session: AsyncSession,
     telegram_id: int,
@@ -166,19 +475,16 @@ async def get_meter_history_by_month(
     year: int,
 ) -> List[Dict[str, Any]]:
     """Получить показания счётчика за месяц с номерами счётчиков."""
-    user_query = select(User).where(User.telegram_id == telegram_id)
-    user: User | None = (await session.execute(user_query)).scalar_one_or_none()
-
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return []
 
     meter_query = (
         select(MeterReading)
         .where(
-            MeterReading.user_id == user.id,
+            MeterReading.user_id == user_id,
             MeterReading.meter_type == meter_type,
-            extract("month", MeterReading.reading_date) == month,
-            extract("year", MeterReading.reading_date) == year,
+            in_date_range(MeterReading.reading_date, month_range(month, year)),
         )
         .order_by(
             MeterReading.meter_number.asc(),
@@ -195,12 +501,87 @@ async def get_meter_history_by_month(
             "date": reading.reading_date.strftime("%d.%m.%Y"),
             "value": reading.value,
             "created_at": reading.created_at,
-            "created_at_local": _fmt_irkt(reading.created_at),
+            "created_at_local": fmt_irkt(reading.created_at),
         }
         for reading in readings
     ]
 
 
+# ========= Сводка передачи показаний (meter_submissions) =========
+def _period(d: date) -> int:
+    return d.year * 100 + d.month
+
+
+def _meter_bit(meter_number: Optional[int]) -> int:
+    # Как и COUNT(DISTINCT meter_number): показания без номера не считаем
+    return 1 << (meter_number - 1) if meter_number and 0 < meter_number < 63 else 0
+
+
+async def _mark_submission(
+    session: AsyncSession,
+    user_id: int,
+    meter_type: str,
+    meter_number: Optional[int],
+    reading_date: date,
+    submitted_at: datetime,
+) -> None:
+    stmt = sqlite_insert(MeterSubmission).values(
+        user_id=user_id,
+        period_yyyymm=_period(reading_date),
+        meter_type=meter_type,
+        meters_bitmap=_meter_bit(meter_number),
+        last_submitted_at=submitted_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MeterSubmission.user_id, MeterSubmission.period_yyyymm, MeterSubmission.meter_type],
+        set_={
+            "meters_bitmap": MeterSubmission.meters_bitmap.op("|")(stmt.excluded.meters_bitmap),
+            "last_submitted_at": stmt.excluded.last_submitted_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+@connection
+async def backfill_meter_submissions(session: AsyncSession, force: bool = False) -> int:
+    """
+    Разовое заполнение meter_submissions из meter_readings (если сводка
+    пуста или force=True). Пересчитывает битмапы целиком, идемпотентно.
+    """
+    if not force and await session.scalar(select(exists().select_from(MeterSubmission))):
+        return 0
+
+    period = func.cast(func.strftime("%Y%m", MeterReading.reading_date), Integer)
+    bit = case(
+        (and_(MeterReading.meter_number > 0, MeterReading.meter_number < 63),
+         literal(1).op("<<")(MeterReading.meter_number - 1)),
+        else_=0,
+    )
+    src = (
+        select(
+            MeterReading.user_id,
+            period,
+            MeterReading.meter_type,
+            func.sum(distinct(bit)),
+            func.max(MeterReading.created_at),
+        )
+        .where(MeterReading.user_id.is_not(None))
+        .group_by(MeterReading.user_id, period, MeterReading.meter_type)
+    )
+    stmt = sqlite_insert(MeterSubmission).from_select(
+        ["user_id", "period_yyyymm", "meter_type", "meters_bitmap", "last_submitted_at"], src
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MeterSubmission.user_id, MeterSubmission.period_yyyymm, MeterSubmission.meter_type],
+        set_={
+            "meters_bitmap": stmt.excluded.meters_bitmap,
+            "last_submitted_at": stmt.excluded.last_submitted_at,
+        },
+    )
+    result = await session.execute(stmt)
+    return result.rowcount or 0
+
+
 @connection
 async def save_meter_reading(
     session: AsyncSession,
@@ -222,15 +603,13 @@ async def save_meter_reading(
         reading_date: Дата показаний
         meter_number: Номер счётчика (1-3)
     """
-    user_query = select(User).where(User.telegram_id == telegram_id)
-    user: User | None = (await session.execute(user_query)).scalar_one_or_none()
-
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         logger.error(f"User {telegram_id} not found")
         return False
 
     new_reading = MeterReading(
-        user_id=user.id,
+        user_id=user_id,
         meter_type=meter_type,
         meter_number=meter_number,
         value=value,
@@ -238,6 +617,7 @@ async def save_meter_reading(
         created_at=_irkt_now(),
     )
     session.add(new_reading)
+    await _mark_submission(session, user_id, meter_type, meter_number, reading_date, new_reading.created_at)
     logger.info(
         f"Saved new meter reading for user {telegram_id}: "
         f"{meter_type} #{meter_number} = {value} ({reading_date})"
@@ -247,7 +627,7 @@ async def save_meter_reading(
 
 
 
-@connection
+@connection(readonly=True)
 async def get_user_meters_count_for_month(
     session: AsyncSession,
     telegram_id: int,
@@ -265,23 +645,21 @@ async def get_user_meters_count_for_month(
     Returns:
         Количество уникальных счётчиков
     """
-    user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return 0
 
-    count = await session.scalar(
-        select(func.count(distinct(MeterReading.meter_number)))
-        .where(
-            MeterReading.user_id == user.id,
-            MeterReading.meter_type == "hot",
-            extract("year", MeterReading.reading_date) == year,
-            extract("month", MeterReading.reading_date) == month,
+    bitmap = await session.scalar(
+        select(MeterSubmission.meters_bitmap).where(
+            MeterSubmission.user_id == user_id,
+            MeterSubmission.period_yyyymm == year * 100 + month,
+            MeterSubmission.meter_type == "hot",
         )
     )
-    return count or 0
+    return (bitmap or 0).bit_count()
 
 
-@connection
+@connection(readonly=True)
 async def check_month_meters(
     session: AsyncSession,
     telegram_id: int,
@@ -305,11 +683,8 @@ async def check_month_meters(
         }]
       }
     """
-    user = (await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )).scalar_one_or_none()
-
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return {
             "period": None,
             "hot": {
@@ -325,13 +700,18 @@ async def check_month_meters(
     m, y = now_irkt.month, now_irkt.year
 
     # Все показания за месяц
-    q_all = (
+    rows = (await session.execute(_hot_month_query(user_id, m, y))).scalars().all()
+    return _month_meters_payload(rows, m, y)
+
+
+def _hot_month_query(user_id: int, month: int, year: int):
+    """Все показания ГВС пользователя за месяц (последние — первыми внутри счётчика)."""
+    return (
         select(MeterReading)
         .where(
-            MeterReading.user_id == user.id,
+            MeterReading.user_id == user_id,
             MeterReading.meter_type == "hot",
-            extract("month", MeterReading.reading_date) == m,
-            extract("year", MeterReading.reading_date) == y,
+            in_date_range(MeterReading.reading_date, month_range(month, year)),
         )
         .order_by(
             MeterReading.meter_number.asc(),
@@ -339,8 +719,10 @@ async def check_month_meters(
             MeterReading.created_at.desc(),
         )
     )
-    rows = (await session.execute(q_all)).scalars().all()
 
+
+def _month_meters_payload(rows, m: int, y: int) -> Dict[str, Any]:
+    """Ответ в формате check_month_meters по уже выбранным строкам."""
     hot_row: Optional[MeterReading] = rows[0] if rows else None
 
     readings = [
@@ -348,7 +730,7 @@ async def check_month_meters(
             "meter_number": r.meter_number or 1,
             "date": r.reading_date.strftime("%d.%m.%Y") if r.reading_date else None,
             "value": r.value,
-            "created_at_local": _fmt_irkt(r.created_at) if r.created_at else None,
+            "created_at_local": fmt_irkt(r.created_at) if r.created_at else None,
         }
         for r in rows
     ]
@@ -359,81 +741,68 @@ async def check_month_meters(
             "exists": bool(hot_row),
             "value": hot_row.value if hot_row else None,
             "date": hot_row.reading_date.strftime("%d.%m.%Y") if hot_row and hot_row.reading_date else None,
-            "created_at_local": _fmt_irkt(hot_row.created_at) if hot_row else None,
+            "created_at_local": fmt_irkt(hot_row.created_at) if hot_row else None,
             "readings": readings,
         },
     }
 
 
 
-@connection
-async def get_all_meter_readings_by_type_and_period(
-    session,
-    meter_type: str,
-    period: str,
-    month: int = None,
-    year: int = None
-) -> list[dict]:
-    """
-    Получить все показания счётчиков по типу и периоду для экспорта.
-    """
-    from sqlalchemy import extract, func, cast, Date as SQLDate
-    
-    # Базовый запрос с приведением типов
-    query = select(
-        MeterReading.id,
-        MeterReading.meter_number,
-        MeterReading.value,
-        MeterReading.reading_date.label("reading_date"),
-        MeterReading.created_at.label("created_at"),
-        User.name,
-        User.phone,
-        User.street,
-        User.house,
-        User.apartment
-    ).join(
+def _meter_export_query(meter_type: str, period: str, month: int = None, year: int = None):
+    query = select(*METER_EXPORT_COLUMNS).join(
         User, MeterReading.user_id == User.id
     ).where(
         MeterReading.meter_type == meter_type
     )
 
-    # Фильтры по периоду
-    now = datetime.now()
-    
-    if period == "current_month":
-        query = query.where(
-            extract('year', MeterReading.reading_date) == now.year,
-            extract('month', MeterReading.reading_date) == now.month
-        )
-    elif period == "select_month" and month and year:
-        query = query.where(
-            extract('year', MeterReading.reading_date) == year,
-            extract('month', MeterReading.reading_date) == month
-        )
-    elif period == "year":
-        query = query.where(
-            extract('year', MeterReading.reading_date) == now.year
-        )
-    # period == "all" - без фильтра
+    # Фильтры по периоду (current_month / select_month / year; "all" - без фильтра)
+    rng = period_range(period, month=month, year=year)
+    if rng:
+        query = query.where(in_date_range(MeterReading.reading_date, rng))
 
     # Сортировка
-    query = query.order_by(
+    return query.order_by(
         MeterReading.reading_date.desc(),
         MeterReading.meter_number.asc()
     )
 
-    result = await session.execute(query)
-    rows = result.fetchall()
 
-    # ✅ Преобразуем в словари
-    data: list[dict] = []
-    for row in rows:
-        data.append(dict(row._mapping))
+@connection(readonly=True)
+async def get_all_meter_readings_by_type_and_period(
+    session,
+    meter_type: str,
+    period: str,
+    month: int = None,
+    year: int = None
+) -> list[MeterRow]:
+    """
+    Получить все показания счётчиков по типу и периоду для экспорта.
+    Для больших периодов — stream_meter_readings_by_type_and_period.
+    """
+    result = await session.execute(_meter_export_query(meter_type, period, month, year))
+    return [MeterRow.from_row(row) for row in result.all()]
 
-    return data
 
+async def stream_meter_readings_by_type_and_period(
+    meter_type: str,
+    period: str,
+    month: int = None,
+    year: int = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[MeterRow]:
+    """
+    То же, что get_all_meter_readings_by_type_and_period, но строки идут
+    порциями по chunk_size (server-side курсор) — память не растёт
+    с размером периода.
+    """
+    query = _meter_export_query(meter_type, period, month, year)
+    async with read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        async for row in result:
+            yield MeterRow.from_row(row)
 
-@connection
+
+@connection(readonly=True)
 async def list_users_missing_month_meters(
     session: AsyncSession,
     when: Optional[datetime] = None,
@@ -446,18 +815,9 @@ async def list_users_missing_month_meters(
     m, y = now_irkt.month, now_irkt.year
 
     u = User
+    sub = MeterSubmission
 
-    # Проверяем наличие хотя бы одного показания ГВС
-    hot_exists = exists(
-        select(MeterReading.id).where(
-            MeterReading.user_id == u.id,
-            MeterReading.meter_type == "hot",
-            extract("month", MeterReading.reading_date) == m,
-            extract("year", MeterReading.reading_date) == y,
-        )
-    )
-
-    # Берём всех активных пользователей без показаний
+    # Anti-join по PK сводки: нет строки за месяц — нет показаний ГВС
     q = (
         select(
             u.id,
@@ -465,10 +825,17 @@ async def list_users_missing_month_meters(
             u.name,
             u.username,
             u.status,
-            hot_exists.label("hot_exists"),
+        )
+        .outerjoin(
+            sub,
+            and_(
+                sub.user_id == u.id,
+                sub.period_yyyymm == y * 100 + m,
+                sub.meter_type == "hot",
+            ),
         )
         .where(u.status != "new")
-        .where(~hot_exists)  # Нет показаний ГВС
+        .where(sub.user_id.is_(None))
     )
 
     rows = (await session.execute(q)).all()
@@ -482,7 +849,7 @@ async def list_users_missing_month_meters(
                 "name": mapp["name"],
                 "username": mapp["username"],
                 "status": mapp["status"],
-                "hot_exists": bool(mapp["hot_exists"]),
+                "hot_exists": False,
                 "cold_exists": False,  # Больше не используется
                 "month": m,
                 "year": y,
@@ -491,18 +858,238 @@ async def list_users_missing_month_meters(
     return out
 
 
-# ========= Заявки =========
+# ========= FSM-хранилище (fsm_states) =========
+@connection(readonly=True)
+async def load_fsm_record(session: AsyncSession, key: str) -> Optional[Tuple[Optional[str], Optional[bytes]]]:
+    """(state, data) по ключу; истёкшая запись — как отсутствующая."""
+    q = select(FsmRecord.state, FsmRecord.data).where(
+        FsmRecord.key == key, FsmRecord.expires_at > datetime.utcnow()
+    )
+    row = (await session.execute(q)).one_or_none()
+    return tuple(row) if row else None
+
+
+@connection
+async def save_fsm_records(
+    session: AsyncSession,
+    rows: List[Tuple[str, Optional[str], Optional[bytes], datetime]],
+) -> None:
+    """
+    Записать пачку [(key, state, data, expires_at), ...] одной транзакцией.
+    Пустые записи (нет ни state, ни data) удаляются.
+    """
+    empty = [key for key, state, data, _exp in rows if state is None and data is None]
+    filled = [
+        {"key": key, "state": state, "data": data, "expires_at": exp}
+        for key, state, data, exp in rows
+        if state is not None or data is not None
+    ]
+    if empty:
+        await session.execute(delete(FsmRecord).where(FsmRecord.key.in_(empty)))
+    if filled:
+        stmt = sqlite_insert(FsmRecord).values(filled)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[FsmRecord.key],
+                set_={
+                    "state": stmt.excluded.state,
+                    "data": stmt.excluded.data,
+                    "expires_at": stmt.excluded.expires_at,
+                },
+            )
+        )
+
+
 @connection
+async def purge_expired_fsm(session: AsyncSession) -> int:
+    res = await session.execute(
+        delete(FsmRecord)
+        .where(FsmRecord.expires_at <= datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount or 0
+
+
+# ========= Подписчики обязательных каналов (channel_members) =========
+@connection(readonly=True)
+async def load_channel_members(session: AsyncSession, chat_ids: List[int]) -> List[Tuple[int, int, str]]:
+    """Весь индекс по каналам chat_ids: [(chat_id, user_id, status), ...]."""
+    if not chat_ids:
+        return []
+    q = select(ChannelMember.chat_id, ChannelMember.user_id, ChannelMember.status).where(
+        ChannelMember.chat_id.in_(chat_ids)
+    )
+    return [tuple(r) for r in (await session.execute(q)).all()]
+
+
+@connection(readonly=True)
+async def list_channel_member_ids(
+    session: AsyncSession, chat_id: int, after_user_id: int = 0, limit: int = 500
+) -> List[Tuple[int, str]]:
+    """Порция индекса канала по user_id (keyset) для сверки: [(user_id, status), ...]."""
+    q = (
+        select(ChannelMember.user_id, ChannelMember.status)
+        .where(ChannelMember.chat_id == chat_id, ChannelMember.user_id > after_user_id)
+        .order_by(ChannelMember.user_id)
+        .limit(limit)
+    )
+    return [tuple(r) for r in (await session.execute(q)).all()]
+
+
+@connection
+async def upsert_channel_members(session: AsyncSession, rows: List[Tuple[int, int, str]]) -> None:
+    """Записать статусы [(chat_id, user_id, status), ...]."""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(ChannelMember).values(
+        [{"chat_id": c, "user_id": u, "status": st, "updated_at": now} for c, u, st in rows]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ChannelMember.chat_id, ChannelMember.user_id],
+            set_={"status": stmt.excluded.status, "updated_at": stmt.excluded.updated_at},
+        )
+    )
+
+
+# ========= Рассылка напоминаний (журнал доставки) =========
+def reminder_period(when: Optional[datetime] = None) -> int:
+    """Месяц рассылки по Иркутску: YYYYMM."""
+    now_irkt = when.astimezone(IRKUTSK_TZ) if when else _irkt_now()
+    return now_irkt.year * 100 + now_irkt.month
+
+
+@connection
+async def begin_reminder_run(session: AsyncSession, period: int) -> bool:
+    """Отметить запуск рассылки за period. True — продолжение прерванного запуска."""
+    existing = (
+        await session.execute(select(ReminderRun.finished_at).where(ReminderRun.period_yyyymm == period))
+    ).one_or_none()
+    if existing is None:
+        session.add(ReminderRun(period_yyyymm=period))
+        return False
+    if existing.finished_at is not None:
+        # Повторный запуск за тот же месяц (вручную): дошлём тем, кого ещё нет в журнале
+        await session.execute(
+            update(ReminderRun).where(ReminderRun.period_yyyymm == period).values(finished_at=None)
+        )
+    return True
+
+
+@connection
+async def finish_reminder_run(session: AsyncSession, period: int) -> Dict[str, int]:
+    """Закрыть запуск; итоги считаются по журналу (с учётом прерванных частей)."""
+    d = ReminderDelivery
+    rows = (
+        await session.execute(
+            select(d.status, func.count()).where(d.period_yyyymm == period).group_by(d.status)
+        )
+    ).all()
+    totals = {"sent": 0, "blocked": 0, "failed": 0}
+    totals.update({status: count for status, count in rows})
+    await session.execute(
+        update(ReminderRun)
+        .where(ReminderRun.period_yyyymm == period)
+        .values(finished_at=datetime.utcnow(), **totals)
+    )
+    return totals
+
+
+@connection(readonly=True)
+async def get_unfinished_reminder_run(session: AsyncSession) -> Optional[int]:
+    q = select(func.max(ReminderRun.period_yyyymm)).where(ReminderRun.finished_at.is_(None))
+    return (await session.execute(q)).scalar_one_or_none()
+
+
+@connection(readonly=True)
+async def list_reminder_audience(
+    session: AsyncSession,
+    period: int,
+    after_user_id: int = 0,
+    limit: int = 500,
+    max_attempts: int = 3,
+) -> List[Tuple[int, int]]:
+    """
+    Следующая порция получателей (users.id > after_user_id, по возрастанию):
+    не передали ГВС за period, не заблокировали бота и ещё не получили
+    напоминание (failed — пока attempts < max_attempts).
+    Возвращает [(user_id, telegram_id), ...].
+    """
+    sub = MeterSubmission
+    d = ReminderDelivery
+    q = (
+        select(User.id, User.telegram_id)
+        .outerjoin(
+            sub,
+            and_(sub.user_id == User.id, sub.period_yyyymm == period, sub.meter_type == "hot"),
+        )
+        .outerjoin(d, and_(d.period_yyyymm == period, d.user_id == User.id))
+        .where(
+            User.id > after_user_id,
+            User.status != "new",
+            sub.user_id.is_(None),
+            (d.user_id.is_(None)) | and_(d.status == "failed", d.attempts < max_attempts),
+            ~exists().where(BotBlockedChat.telegram_id == User.telegram_id),
+        )
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return [tuple(r) for r in (await session.execute(q)).all()]
+
+
+@connection
+async def record_reminder_deliveries(
+    session: AsyncSession,
+    period: int,
+    results: List[Tuple[int, int, str, Optional[str]]],
+) -> None:
+    """
+    Записать результаты одной пачкой: [(user_id, telegram_id, status, error)].
+    blocked дополнительно попадает в bot_blocked_chats.
+    """
+    if not results:
+        return
+    stmt = sqlite_insert(ReminderDelivery).values(
+        [
+            {
+                "period_yyyymm": period,
+                "user_id": user_id,
+                "status": status,
+                "attempts": 1,
+                "last_error": (error or "")[:500] or None,
+                "updated_at": datetime.utcnow(),
+            }
+            for user_id, _tg, status, error in results
+        ]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ReminderDelivery.period_yyyymm, ReminderDelivery.user_id],
+            set_={
+                "status": stmt.excluded.status,
+                "attempts": ReminderDelivery.attempts + 1,
+                "last_error": stmt.excluded.last_error,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
+    blocked = [{"telegram_id": tg} for _uid, tg, status, _e in results if status == "blocked"]
+    if blocked:
+        await session.execute(sqlite_insert(BotBlockedChat).values(blocked).on_conflict_do_nothing())
+
+
+# ========= Заявки =========
+@connection(readonly=True)
 async def get_active_ticket(session: AsyncSession, telegram_id: int) -> Optional[Ticket]:
-    q_user = select(User).where(User.telegram_id == telegram_id)
-    user: User | None = (await session.execute(q_user)).scalar_one_or_none()
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return None
 
     q = (
         select(Ticket)
         .where(
-            Ticket.user_id == user.id,
+            Ticket.user_id == user_id,
             Ticket.status != TicketStatus.CANCELLED,
         )
         .order_by(Ticket.created_at.desc())
@@ -511,15 +1098,13 @@ async def get_active_ticket(session: AsyncSession, telegram_id: int) -> Optional
     return result.scalars().first()
 
 
-@connection
-async def create_ticket(session: AsyncSession, telegram_id: int, text: str) -> Ticket:
-    q_user = select(User).where(User.telegram_id == telegram_id)
-    user: User | None = (await session.execute(q_user)).scalar_one_or_none()
-    if not user:
+async def _new_ticket(session: AsyncSession, telegram_id: int, text: str) -> Ticket:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         raise ValueError("User not found")
 
     ticket = Ticket(
-        user_id=user.id,
+        user_id=user_id,
         text=text.strip(),
         status=TicketStatus.OPEN,
     )
@@ -528,15 +1113,56 @@ async def create_ticket(session: AsyncSession, telegram_id: int, text: str) -> T
     return ticket
 
 
+async def _insert_attachments(session: AsyncSession, ticket_id: int, items: List[Dict[str, Any]]) -> int:
+    """Все вложения одним executemany (элементы — как в state["attachments"])."""
+    rows = [
+        {
+            "ticket_id": ticket_id,
+            "file_id": a["file_id"],
+            "file_unique_id": a.get("file_unique_id"),
+            "type": a["type"],
+            "caption": a.get("caption"),
+        }
+        for a in items
+    ]
+    if rows:
+        await session.execute(insert(TicketAttachment), rows)
+    return len(rows)
+
+
+@connection
+async def create_ticket(session: AsyncSession, telegram_id: int, text: str) -> Ticket:
+    return await _new_ticket(session, telegram_id, text)
+
+
+@connection
+async def create_ticket_with_attachments(
+    session: AsyncSession,
+    telegram_id: int,
+    text: str,
+    attachments: List[Dict[str, Any]] | None = None,
+    outbox: List[Tuple[str, Dict[str, Any]]] | None = None,
+) -> Ticket:
+    """
+    Заявка, её вложения и задания outbox в одной транзакции.
+    outbox — [(kind, payload), ...]; в каждый payload добавляется ticket_id.
+    """
+    ticket = await _new_ticket(session, telegram_id, text)
+    await _insert_attachments(session, ticket.id, attachments or [])
+    if outbox:
+        await _enqueue_outbox(session, [(kind, {**payload, "ticket_id": ticket.id}) for kind, payload in outbox])
+    return ticket
+
+
 @connection
 async def cancel_ticket(session: AsyncSession, telegram_id: int, ticket_id: int) -> bool:
-    user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return False
 
     q_ticket = select(Ticket).where(
         Ticket.id == ticket_id,
-        Ticket.user_id == user.id,
+        Ticket.user_id == user_id,
         Ticket.status.in_([TicketStatus.OPEN, TicketStatus.WORK]),
     )
     ticket = (await session.execute(q_ticket)).scalar_one_or_none()
@@ -545,34 +1171,20 @@ async def cancel_ticket(session: AsyncSession, telegram_id: int, ticket_id: int)
 
     ticket.status = TicketStatus.CANCELLED
     session.add(ticket)
+    _after_commit(session, lambda: ticket_threads.set_status(ticket_id, TicketStatus.CANCELLED))
     return True
 
 
-@connection
-async def get_ticket_by_id(session: AsyncSession, ticket_id: int) -> Optional[Dict[str, Any]]:
-    t: Ticket | None = (await session.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
-        return None
-
-    human_status = getattr(TicketStatus, "label", lambda v: v.name if hasattr(v, "name") else str(v))(t.status)
-
-    return {
-        "id": t.id,
-        "user_id": t.user_id,
-        "text": t.text,
-        "status": t.status,
-        "status_label": human_status,
-        "created_at": t.created_at,
-        "created_at_local": _fmt_irkt(t.created_at),
-        "updated_at": t.updated_at,
-        "updated_at_local": _fmt_irkt(t.updated_at),
-    }
+@connection(readonly=True)
+async def get_ticket_by_id(session: AsyncSession, ticket_id: int) -> Optional[TicketRow]:
+    row = (await session.execute(select(*TICKET_COLUMNS).where(Ticket.id == ticket_id))).one_or_none()
+    return TicketRow.from_row(row) if row else None
 
 
 _admin_cache: list[int] = []
 
 
-@connection
+@connection(readonly=True)
 async def list_admin_ids(session: AsyncSession) -> list[int]:
     """Получить список всех Telegram ID администраторов (с кешом)."""
     global _admin_cache
@@ -584,70 +1196,111 @@ async def list_admin_ids(session: AsyncSession) -> list[int]:
     return _admin_cache
 
 
-@connection
+# ========= Keyset-пагинация списков заявок =========
+# Курсор — позиция (created_at, id) последней/первой заявки на странице,
+# упакованная для callback_data: "a" + цифры created_at + "_" + id
+# (a — следующая страница, более старые; b — предыдущая, более новые).
+# created_at сравниваем как текст в том виде, в каком он лежит в SQLite,
+# чтобы условие совпадало с порядком индекса и работало по нему.
+_CREATED_RAW = type_coerce(Ticket.created_at, String)
+
+
+def _encode_cursor(direction: str, created_raw: str, ticket_id: int) -> str:
+    digits = "".join(ch for ch in str(created_raw) if ch.isdigit())
+    return f"{direction}{digits}_{ticket_id}"
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str, int]]:
+    """'a20251017093000_42' -> ('a', '2025-10-17 09:30:00', 42)."""
+    if not cursor or cursor[0] not in "ab" or "_" not in cursor:
+        return None
+    digits, _, sid = cursor[1:].partition("_")
+    if len(digits) < 14 or not digits.isdigit() or not sid.isdigit():
+        return None
+    raw = f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]} {digits[8:10]}:{digits[10:12]}:{digits[12:14]}"
+    if len(digits) > 14:
+        raw += "." + digits[14:]
+    return cursor[0], raw, int(sid)
+
+
+async def _keyset_page(session: AsyncSession, base_q, where, cursor: Optional[str], per_page: int) -> Dict[str, Any]:
+    """
+    Страница (created_at DESC, id DESC) по курсору + общее количество.
+
+    total считается скалярным подзапросом в том же SELECT: COUNT(*)
+    идёт по покрывающему индексу и не трогает строки таблицы, а основной
+    запрос останавливается на per_page + 1 строке. COUNT(*) OVER ()
+    заставил бы SQLite материализовать все подходящие строки целиком,
+    и глубокие страницы стоили бы как полный проход.
+    """
+    total_q = select(func.count()).select_from(Ticket).where(*where).scalar_subquery()
+    q = base_q.add_columns(_CREATED_RAW.label("created_raw"), total_q.label("total")).where(*where)
+
+    cur = _decode_cursor(cursor)
+    key = tuple_(_CREATED_RAW, Ticket.id)
+    if cur is None:
+        direction = None
+        q = q.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+    else:
+        direction, raw, tid = cur
+        pos = tuple_(literal(raw, String), literal(tid))
+        if direction == "a":
+            q = q.where(key < pos).order_by(Ticket.created_at.desc(), Ticket.id.desc())
+        else:
+            q = q.where(key > pos).order_by(Ticket.created_at.asc(), Ticket.id.asc())
+
+    rows = (await session.execute(q.limit(per_page + 1))).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "b":
+        rows.reverse()
+
+    if rows:
+        total = rows[0].total
+    elif cur is None:
+        total = 0
+    else:
+        total = (await session.execute(select(total_q))).scalar_one()
+
+    first, last = (rows[0], rows[-1]) if rows else (None, None)
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == "b" or has_more:
+            next_cursor = _encode_cursor("a", last.created_raw, last.id)
+        if direction == "a" or (direction == "b" and has_more):
+            prev_cursor = _encode_cursor("b", first.created_raw, first.id)
+    return {"rows": rows, "total": total, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+@connection(readonly=True)
 async def list_tickets(
     session: AsyncSession,
     status: TicketStatus,
-    page: int = 1,
+    cursor: Optional[str] = None,
     per_page: int = 5,
-) -> List[Dict[str, Any]]:
-    offset = max(0, (page - 1) * per_page)
-
-    q = (
-        select(Ticket, User)
-        .join(User, User.id == Ticket.user_id)
-        .where(Ticket.status == status)
-        .order_by(Ticket.created_at.desc())
-        .offset(offset)
-        .limit(per_page)
-    )
-    rows = (await session.execute(q)).all()
-
-    items: List[Dict[str, Any]] = []
-    for t, u in rows:
-        items.append(
-            {
-                "id": t.id,
-                "text": t.text,
-                "status": t.status,
-                "created_at": t.created_at,
-                "created_at_local": _fmt_irkt(t.created_at),
-                "updated_at": t.updated_at,
-                "updated_at_local": _fmt_irkt(t.updated_at),
-                "user_name": u.name,
-                "user_telegram_id": u.telegram_id,
-                "username": u.username,
-            }
-        )
-    return items
+) -> Dict[str, Any]:
+    """Страница заявок по статусу: {items: list[TicketRow], total, next_cursor, prev_cursor}."""
+    base_q = select(*TICKET_COLUMNS, *TICKET_USER_COLUMNS).join(User, User.id == Ticket.user_id)
+    page = await _keyset_page(session, base_q, (Ticket.status == status,), cursor, per_page)
+    page["items"] = [TicketRow.from_row(row) for row in page.pop("rows")]
+    return page
 
 
-@connection
+@connection(readonly=True)
 async def count_tickets(session: AsyncSession, status: TicketStatus) -> int:
     q = select(func.count()).select_from(Ticket).where(Ticket.status == status)
     return (await session.execute(q)).scalar_one()
 
 
-@connection
-async def get_ticket_full(session: AsyncSession, ticket_id: int) -> Optional[Dict[str, Any]]:
-    q = select(Ticket, User).join(User, User.id == Ticket.user_id).where(Ticket.id == ticket_id)
+@connection(readonly=True)
+async def get_ticket_full(session: AsyncSession, ticket_id: int) -> Optional[TicketRow]:
+    q = (
+        select(*TICKET_COLUMNS, *TICKET_USER_COLUMNS)
+        .join(User, User.id == Ticket.user_id)
+        .where(Ticket.id == ticket_id)
+    )
     row = (await session.execute(q)).one_or_none()
-    if not row:
-        return None
-    t, u = row
-    return {
-        "id": t.id,
-        "text": t.text,
-        "status": t.status,
-        "created_at": t.created_at,
-        "created_at_local": _fmt_irkt(t.created_at),
-        "updated_at": t.updated_at,
-        "updated_at_local": _fmt_irkt(t.updated_at),
-        "user_name": u.name,
-        "user_telegram_id": u.telegram_id,
-        "username": u.username,
-        "address": f"{u.street or ''}, д. {u.house or ''}" + (f", кв. {u.apartment}" if u.apartment else ""),
-    }
+    return TicketRow.from_row(row) if row else None
 
 
 @connection
@@ -663,20 +1316,21 @@ async def update_ticket_status(
     old = t.status
     t.status = new_status
     session.add(t)
+    _after_commit(session, lambda: ticket_threads.set_status(ticket_id, new_status))
     u: User | None = (await session.execute(select(User).where(User.id == t.user_id))).scalar_one_or_none()
     return (old, new_status, u.telegram_id if u else 0)
 
 
-@connection
+@connection(readonly=True)
 async def count_user_tickets_grouped(session: AsyncSession, telegram_id: int) -> Dict[str, int]:
     """
     Считает количество заявок пользователя по статусам.
     """
-    user = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
-    if not user:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return {"OPEN": 0, "WORK": 0, "CANCELLED": 0, "active": 0, "total": 0}
 
-    q = select(Ticket.status, func.count(Ticket.id)).where(Ticket.user_id == user.id).group_by(Ticket.status)
+    q = select(Ticket.status, func.count(Ticket.id)).where(Ticket.user_id == user_id).group_by(Ticket.status)
     rows = (await session.execute(q)).all()
 
     counters = {"OPEN": 0, "WORK": 0, "CANCELLED": 0}
@@ -685,6 +1339,10 @@ async def count_user_tickets_grouped(session: AsyncSession, telegram_id: int) ->
         if key in counters:
             counters[key] = cnt
 
+    return _with_totals(counters)
+
+
+def _with_totals(counters: Dict[str, int]) -> Dict[str, int]:
     active = counters["OPEN"] + counters["WORK"]
     total = counters["OPEN"] + counters["WORK"] + counters["CANCELLED"]
 
@@ -693,14 +1351,83 @@ async def count_user_tickets_grouped(session: AsyncSession, telegram_id: int) ->
     return counters
 
 
+@connection(readonly=True)
+async def get_cabinet_snapshot(
+    session: AsyncSession,
+    telegram_id: int,
+    when: Optional[datetime] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Данные для экрана «Личный кабинет» за одну сессию и два SQL-запроса:
+    1) профиль + счётчики заявок по статусам (users LEFT JOIN tickets);
+    2) показания ГВС за текущий месяц (Irkutsk TZ).
+
+    Возвращает None, если пользователь не найден, иначе:
+    - profile: как get_user_by_tg
+    - meters: как check_month_meters
+    - tickets: как count_user_tickets_grouped
+    """
+    def _count(status: TicketStatus):
+        return func.coalesce(func.sum(case((Ticket.status == status, 1), else_=0)), 0)
+
+    generation = user_cache.generation(telegram_id)
+    q_profile = (
+        select(
+            User.id,
+            User.name,
+            User.phone,
+            User.street,
+            User.house,
+            User.apartment,
+            User.username,
+            User.status,
+            _count(TicketStatus.OPEN).label("open_cnt"),
+            _count(TicketStatus.WORK).label("work_cnt"),
+            _count(TicketStatus.CANCELLED).label("done_cnt"),
+        )
+        .outerjoin(Ticket, Ticket.user_id == User.id)
+        .where(User.telegram_id == telegram_id)
+        .group_by(User.id)
+    )
+    row = (await session.execute(q_profile)).one_or_none()
+    if not row:
+        return None
+
+    profile = _user_card(row)
+    user_cache.put(telegram_id, profile, generation)
+
+    now_irkt = (when or datetime.utcnow()).astimezone(IRKUTSK_TZ)
+    m, y = now_irkt.month, now_irkt.year
+    rows = (await session.execute(_hot_month_query(row.id, m, y))).scalars().all()
+
+    return {
+        "profile": dict(profile),
+        "meters": _month_meters_payload(rows, m, y),
+        "tickets": _with_totals({"OPEN": row.open_cnt, "WORK": row.work_cnt, "CANCELLED": row.done_cnt}),
+    }
+
+
 @connection
 async def set_ticket_thread(session: AsyncSession, ticket_id: int, group_chat_id: int, thread_id: int) -> None:
-    t: Ticket | None = (await session.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
+    row = (
+        await session.execute(
+            select(Ticket, User.telegram_id)
+            .join(User, User.id == Ticket.user_id, isouter=True)
+            .where(Ticket.id == ticket_id)
+            .limit(1)
+        )
+    ).one_or_none()
+    if not row:
         return
+    t, author_tg = row
     t.group_chat_id = group_chat_id
     t.thread_id = thread_id
     session.add(t)
+    status = t.status
+    _after_commit(
+        session,
+        lambda: ticket_threads.set_thread(ticket_id, group_chat_id, thread_id, status, author_tg),
+    )
 
 
 @connection
@@ -724,13 +1451,26 @@ async def add_ticket_attachment(
 
 
 @connection
+async def add_ticket_attachments_bulk(
+    session: AsyncSession,
+    ticket_id: int,
+    items: List[Dict[str, Any]],
+) -> int:
+    return await _insert_attachments(session, ticket_id, items)
+
+
+@connection(readonly=True)
 async def get_ticket_attachments(session: AsyncSession, ticket_id: int) -> list[TicketAttachment]:
-    q = select(TicketAttachment).where(TicketAttachment.ticket_id == ticket_id).order_by(TicketAttachment.created_at.asc())
+    q = (
+        select(TicketAttachment)
+        .where(TicketAttachment.ticket_id == ticket_id)
+        .order_by(TicketAttachment.created_at.asc(), TicketAttachment.id.asc())
+    )
     res = await session.execute(q)
     return list(res.scalars().all())
 
 
-@connection
+@connection(readonly=True)
 async def get_ticket_by_thread(session: AsyncSession, chat_id: int, thread_id: int) -> dict | None:
     stmt = (
         select(
@@ -757,12 +1497,50 @@ async def get_ticket_by_thread(session: AsyncSession, chat_id: int, thread_id: i
         "group_chat_id": r["group_chat_id"],
         "thread_id": r["thread_id"],
         "created_at": r["created_at"],
-        "created_at_local": _fmt_irkt(r["created_at"]),
+        "created_at_local": fmt_irkt(r["created_at"]),
         "text": r["text"],
         "user_tg_id": r["user_tg_id"],
     }
 
 
+@connection(readonly=True)
+async def load_ticket_threads(session: AsyncSession) -> int:
+    """Заполнить ticket_threads всеми заявками, у которых есть топик."""
+    rows = (
+        await session.execute(
+            select(
+                Ticket.id,
+                Ticket.status,
+                Ticket.group_chat_id,
+                Ticket.thread_id,
+                User.telegram_id,
+            )
+            .join(User, User.id == Ticket.user_id, isouter=True)
+            .where(Ticket.group_chat_id.is_not(None), Ticket.thread_id.is_not(None))
+        )
+    ).all()
+    ticket_threads.load(rows)
+    return len(ticket_threads)
+
+
+async def find_ticket_by_thread(chat_id: int, thread_id: int) -> dict | None:
+    """
+    Заявка по топику форума без обращения к БД: после load_ticket_threads
+    индекс полный, поэтому промах означает «топик не от заявки».
+    До загрузки индекса — fallback на get_ticket_by_thread.
+    """
+    if ticket_threads.loaded:
+        hit = ticket_threads.get(chat_id, thread_id)
+        return dict(hit) if hit else None
+
+    ticket = await get_ticket_by_thread(chat_id, thread_id)
+    if ticket:
+        ticket_threads.set_thread(
+            ticket["id"], chat_id, thread_id, ticket["status"], ticket["user_tg_id"]
+        )
+    return ticket
+
+
 @connection
 async def set_ticket_status(
     session: AsyncSession,
@@ -785,91 +1563,57 @@ async def set_ticket_status(
     old = t.status
     t.status = new_status
     session.add(t)
+    _after_commit(session, lambda: ticket_threads.set_status(ticket_id, new_status))
 
     return (old, new_status, author_tg or 0)
 
 
-@connection
+@connection(readonly=True)
 async def list_user_tickets(
     session: AsyncSession,
     telegram_id: int,
     status: TicketStatus,
-    page: int = 1,
+    cursor: Optional[str] = None,
     per_page: int = 5,
-) -> List[Dict[str, Any]]:
-    offset = max(0, (page - 1) * per_page)
-
-    u = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
-    if not u:
-        return []
+) -> Dict[str, Any]:
+    """Страница заявок пользователя: {items: list[TicketRow], total, next_cursor, prev_cursor}."""
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
+        return {"items": [], "total": 0, "next_cursor": None, "prev_cursor": None}
 
-    q = (
-        select(Ticket)
-        .where(Ticket.user_id == u.id, Ticket.status == status)
-        .order_by(Ticket.created_at.desc())
-        .offset(offset)
-        .limit(per_page)
-    )
-    rows = (await session.execute(q)).scalars().all()
-
-    items: List[Dict[str, Any]] = []
-    for t in rows:
-        items.append(
-            {
-                "id": t.id,
-                "text": t.text,
-                "status": t.status,
-                "created_at": t.created_at,
-                "created_at_local": _fmt_irkt(t.created_at),
-                "updated_at": t.updated_at,
-                "updated_at_local": _fmt_irkt(t.updated_at),
-            }
-        )
-    return items
+    where = (Ticket.user_id == user_id, Ticket.status == status)
+    page = await _keyset_page(session, select(*TICKET_COLUMNS), where, cursor, per_page)
+    page["items"] = [TicketRow.from_row(row) for row in page.pop("rows")]
+    return page
 
 
-@connection
+@connection(readonly=True)
 async def count_user_tickets(session: AsyncSession, telegram_id: int, status: TicketStatus) -> int:
-    u = (await session.execute(select(User).where(User.telegram_id == telegram_id))).scalar_one_or_none()
-    if not u:
+    user_id = await _get_user_id(session, telegram_id)
+    if not user_id:
         return 0
-    q = select(func.count()).select_from(Ticket).where(Ticket.user_id == u.id, Ticket.status == status)
+    q = select(func.count()).select_from(Ticket).where(Ticket.user_id == user_id, Ticket.status == status)
     return (await session.execute(q)).scalar_one()
 
 
-@connection
+@connection(readonly=True)
 async def get_user_ticket_full(
     session: AsyncSession,
     telegram_id: int,
     ticket_id: int,
-) -> Optional[Dict[str, Any]]:
+) -> Optional[TicketRow]:
     """Карточка заявки только для владельца."""
     row = (
         await session.execute(
-            select(Ticket, User)
+            select(*TICKET_COLUMNS, *TICKET_USER_COLUMNS)
             .join(User, User.id == Ticket.user_id)
             .where(Ticket.id == ticket_id, User.telegram_id == telegram_id)
         )
     ).one_or_none()
-    if not row:
-        return None
-    t, u = row
-    return {
-        "id": t.id,
-        "text": t.text,
-        "status": t.status,
-        "created_at": t.created_at,
-        "created_at_local": _fmt_irkt(t.created_at),
-        "updated_at": t.updated_at,
-        "updated_at_local": _fmt_irkt(t.updated_at),
-        "user_name": u.name,
-        "user_telegram_id": u.telegram_id,
-        "username": u.username,
-        "address": f"{u.street or ''}, д. {u.house or ''}" + (f", кв. {u.apartment}" if u.apartment else ""),
-    }
+    return TicketRow.from_row(row) if row else None
 
 
-@connection
+@connection(readonly=True)
 async def get_ticket_thread_info(session: AsyncSession, ticket_id: int) -> Optional[Tuple[int, int]]:
     """Вернёт (group_chat_id, message_thread_id) для заявки."""
     t: Ticket | None = (
@@ -880,4 +1624,110 @@ async def get_ticket_thread_info(session: AsyncSession, ticket_id: int) -> Optio
     group_chat_id, thread_id = t
     if group_chat_id is None or thread_id is None:
         return None
-    return int(group_chat_id), int(thread_id)
\ No newline at end of file
+    return int(group_chat_id), int(thread_id)
+
+# ========= Outbox (отложенные уведомления) =========
+# Задания пишутся в транзакции вместе с данными, воркер
+# (app/services/outbox.py) забирает их пачками. Время — naive UTC,
+# как и server_default CURRENT_TIMESTAMP в SQLite.
+outbox_ready = asyncio.Event()
+
+
+async def _enqueue_outbox(session: AsyncSession, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+    await session.execute(
+        insert(OutboxMessage),
+        [
+            {"kind": kind, "payload": json.dumps(payload, ensure_ascii=False), "next_attempt_at": datetime.utcnow()}
+            for kind, payload in items
+        ],
+    )
+    _after_commit(session, outbox_ready.set)
+
+
+@connection
+async def enqueue_outbox(session: AsyncSession, kind: str, payload: Dict[str, Any]) -> None:
+    await _enqueue_outbox(session, [(kind, payload)])
+
+
+@connection
+async def claim_outbox_batch(session: AsyncSession, limit: int) -> List[Dict[str, Any]]:
+    """
+    Забрать до limit готовых заданий: pending -> processing одним
+    UPDATE ... RETURNING (без гонки между SELECT и UPDATE).
+    """
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= datetime.utcnow())
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    res = await session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due))
+        .values(status="processing")
+        .returning(OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload, OutboxMessage.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    rows = sorted(res.all(), key=lambda r: r.id)
+    return [
+        {"id": r.id, "kind": r.kind, "payload": json.loads(r.payload), "attempts": r.attempts}
+        for r in rows
+    ]
+
+
+@connection
+async def complete_outbox(session: AsyncSession, outbox_id: int) -> None:
+    await session.execute(
+        delete(OutboxMessage).where(OutboxMessage.id == outbox_id).execution_options(synchronize_session=False)
+    )
+
+
+@connection
+async def fail_outbox(
+    session: AsyncSession,
+    outbox_id: int,
+    error: str,
+    retry_in: Optional[float],
+    payload: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Неудачная попытка. retry_in — через сколько секунд повторить,
+    None — больше не пытаться (status=failed). payload — прогресс,
+    сохранённый обработчиком (например, сколько вложений уже ушло).
+    """
+    values: Dict[str, Any] = {
+        "attempts": OutboxMessage.attempts + 1,
+        "last_error": error[:1000],
+    }
+    if retry_in is None:
+        values["status"] = "failed"
+    else:
+        values["status"] = "pending"
+        values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=retry_in)
+    if payload is not None:
+        values["payload"] = json.dumps(payload, ensure_ascii=False)
+    await session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == outbox_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@connection
+async def reset_stale_outbox(session: AsyncSession) -> int:
+    """processing после рестарта — вернуть в очередь (доставка at-least-once)."""
+    res = await session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.status == "processing")
+        .values(status="pending")
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount or 0
+
+
+@connection(readonly=True)
+async def next_outbox_due(session: AsyncSession) -> Optional[datetime]:
+    q = select(func.min(OutboxMessage.next_attempt_at)).where(OutboxMessage.status == "pending")
+    return (await session.execute(q)).scalar_one_or_none()
@@ -2,28 +2,74 @@
 from app.logger import logger
 
 import asyncio
+import signal
 from contextlib import suppress
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
 
-from config.settings import BOT_TOKEN
+from config.settings import BOT_TOKEN, BOT_MODE, FSM_STORAGE, REQUIRED_CHANNELS
 from app.admin import admin_router
 from app.user import user_router
 from app.group.ticket_forum import forum_router
+from app.group.channel_members import channel_members_router
+from app.middlewares.db_session import DbSessionMiddleware
+from app.middlewares.send_scheduler import send_scheduler
 from app.tasks.meter_reminder import meter_reminder_loop
 from app.tasks.meter_export import meter_export_loop
+from app.services.outbox import outbox_loop
+from app.services.membership import membership_cache, init_membership_index, reconcile_loop
+from app.user.middlewares.album import album_middleware
+from app.webhook import run_webhook, webhook_configured
+from app.storage.sqlite import SqliteStorage
+from app.storage.memory import BoundedMemoryStorage
+import app.services.ticket_notifications  # noqa: F401 — обработчики outbox для заявок
 from database.models import Base, engine
-from database.requests import list_admin_ids
+from database.requests import (
+    list_admin_ids,
+    load_ticket_threads,
+    backfill_meter_submissions,
+    dump_db_stats,
+)
 from app.admin.acl import set_admin_ids
 from app.admin.refresh import refresh_admin_cache_periodically
 
 
+_storage: BaseStorage | None = None
+
+
+def _dump_stats():
+    dump_db_stats()
+    logger.info(f"Планировщик отправки: {send_scheduler.snapshot()}")
+    logger.info(f"Кеш подписок: {membership_cache.stats()}")
+    logger.info(f"Альбомы: {album_middleware.stats()}")
+    if _storage is not None:
+        logger.info(f"FSM ({type(_storage).__name__}): {_storage.stats()}")
+
+
+def _make_storage() -> BaseStorage:
+    global _storage
+    _storage = BoundedMemoryStorage() if FSM_STORAGE == "memory" else SqliteStorage()
+    return _storage
+
+
+def _create_missing_indexes(sync_conn):
+    """create_all не добавляет новые индексы в уже существующие таблицы."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(sync_conn, checkfirst=True)
+            except Exception as e:
+                # Например, дубли (group_chat_id, thread_id) в старых данных
+                logger.error(f"Не удалось создать индекс {index.name}: {e}")
+
+
 async def create_tables():
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_create_missing_indexes)
         logger.info("Таблицы в БД успешно созданы")
     except Exception as e:
         logger.error(f"Ошибка при создании таблиц: {e}")
@@ -32,32 +78,71 @@ async def create_tables():
 async def main():
     await create_tables()
 
+    # Сводка meter_submissions: разово заполняем из meter_readings
+    filled = await backfill_meter_submissions()
+    if filled:
+        logger.info(f"meter_submissions заполнена: {filled} строк")
+
     # Первоначальная загрузка кеша админов
     ids = await list_admin_ids()
     set_admin_ids(ids)
     logger.info(f"Администраторы загружены: {ids}")
 
+    # Индекс топиков форума для ticket_forum
+    threads = await load_ticket_threads()
+    logger.info(f"Топики заявок загружены: {threads}")
+
     # Запускаем периодический рефреш (каждые 12 часов)
     refresh_task = asyncio.create_task(refresh_admin_cache_periodically(12))
 
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
-    
+    # Все исходящие запросы — через общий планировщик лимитов Telegram
+    bot.session.middleware(send_scheduler)
+    dp = Dispatcher(storage=_make_storage())
+
+    # Индекс подписчиков обязательных каналов (апдейты chat_member + сверка)
+    members = await init_membership_index(bot, REQUIRED_CHANNELS)
+    logger.info(f"Индекс подписчиков загружен: {members}")
+
+    # Одна сессия БД на апдейт (для вложенных роутеров тоже)
+    dp.message.middleware(DbSessionMiddleware())
+    dp.callback_query.middleware(DbSessionMiddleware())
+
     dp.include_router(admin_router)
     dp.include_router(user_router)
     dp.include_router(forum_router)
+    dp.include_router(channel_members_router)
 
     # Фоновые задачи
     meter_task = asyncio.create_task(meter_reminder_loop(bot))
     export_task = asyncio.create_task(meter_export_loop())
+    outbox_task = asyncio.create_task(outbox_loop(bot))
+    reconcile_task = asyncio.create_task(reconcile_loop(bot))
+
+    # kill -USR1 <pid> — вывести метрики БД и отправки в лог
+    with suppress(NotImplementedError, AttributeError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, _dump_stats)
 
     try:
-        await dp.start_polling(bot, skip_updates=True)
+        if BOT_MODE == "webhook" and webhook_configured():
+            await run_webhook(dp, bot)
+        else:
+            if BOT_MODE == "webhook":
+                logger.error("BOT_MODE=webhook, но WEBHOOK_BASE_URL не задан — работаем через polling")
+            # Webhook, оставшийся с прошлого запуска, не даст работать getUpdates
+            try:
+                await bot.delete_webhook()
+            except Exception as e:
+                logger.warning(f"Не удалось снять webhook: {e}")
+            await dp.start_polling(bot, skip_updates=True)
     finally:
-        for task in (refresh_task, meter_task, export_task):
+        for task in (refresh_task, meter_task, export_task, outbox_task, reconcile_task):
             task.cancel()
             with suppress(asyncio.CancelledError):
                 await task
+        _dump_stats()
+        # Фоновые задачи остановлены — HTTP-сессия бота больше не нужна
+        await bot.session.close()
 
 
 if __name__ == "__main__":